@@ -4,11 +4,20 @@ CodeLens MCP Server - Standard MCP Protocol Implementation with Hot Reload
 为Claude Code提供项目文档生成的信息和模板服务，支持热重载
 """
 
+import time
+
+# 启动计时起点（--profile-startup 使用）
+_STARTUP_T0 = time.perf_counter()
+
 import sys
 import asyncio
+import contextvars
 import json
 import os
-from typing import Any, Sequence, Optional
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Sequence, Optional, TYPE_CHECKING
 from pathlib import Path
 
 # MCP SDK imports
@@ -16,54 +25,104 @@ from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent
 
-# 导入CodeLens工具
-from src.mcp_tools.doc_guide import DocGuideTool
-from src.mcp_tools.task_init import TaskInitTool
-from src.mcp_tools.task_execute import TaskExecuteTool
-from src.mcp_tools.task_status import TaskStatusTool
-from src.mcp_tools.init_tools import InitTools
-from src.mcp_tools.task_complete import TaskCompleteTool
-from src.mcp_tools.project_overview import ProjectOverviewTool
-from src.mcp_tools.doc_sync import DocSyncTool
-
-# 导入创造模式工具
-from src.mcp_tools.create_guide import CreateGuideTool
-from src.mcp_tools.create_requirement import CreateRequirementTool
-from src.mcp_tools.create_analysis import CreateAnalysisTool
-from src.mcp_tools.create_todo import CreateTodoTool
-
-# 导入热重载功能
-from src.hot_reload import HotReloadManager
+_MCP_IMPORTED_AT = time.perf_counter()
+
+# CodeLens工具注册表（工具定义来自静态清单，模块和实例在首次调用时创建）
+from src.mcp_tools.tool_registry import ToolRegistry
+
+# 热重载功能在 setup_hot_reload 中按需导入（依赖 watchdog）
+if TYPE_CHECKING:
+    from src.hot_reload import HotReloadManager
+
+# 导入配置（工具执行的超时和并发上限）
+from src.config import get_config, PerformanceConfig
+
+# 导入响应治理器（紧凑序列化、响应预算和续取句柄）
+from src.services.response_governor import get_response_governor
+
+# 导入指标注册表（工具调用次数、延迟和错误）
+from src.services.metrics_registry import get_metrics_registry
+
+_MODULES_IMPORTED_AT = time.perf_counter()
 
 # 创建MCP服务器实例
 server = Server("codelens")
 
 # 热重载管理器（全局实例）
-hot_reload_manager: Optional[HotReloadManager] = None
+hot_reload_manager: Optional["HotReloadManager"] = None
 
-def create_tool_instances():
-    """创建工具实例"""
-    return {
-        # 原有的文档模式工具
-        "init_tools": InitTools(),
-        "doc_guide": DocGuideTool(),
-        "task_init": TaskInitTool(),
-        "task_execute": TaskExecuteTool(),
-        "task_status": TaskStatusTool(),
-        "task_complete": TaskCompleteTool(),
-        "project_overview": ProjectOverviewTool(),
-        "doc_sync": DocSyncTool(),
-        
-        # 创造模式工具
-        "create_guide": CreateGuideTool(),
-        "create_requirement": CreateRequirementTool(),
-        "create_analysis": CreateAnalysisTool(),
-        "create_todo": CreateTodoTool()
-    }
+def create_tool_instances() -> ToolRegistry:
+    """创建工具注册表（工具实例在首次调用时创建）"""
+    return ToolRegistry()
 
 # 初始化CodeLens工具
 codelens_tools = create_tool_instances()
 
+# 工具执行线程池和每个工具的并发信号量（首次调用时创建）
+tool_executor: Optional[ThreadPoolExecutor] = None
+tool_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+def get_performance_config() -> PerformanceConfig:
+    """读取性能配置，配置系统不可用时使用默认值"""
+    try:
+        return get_config().performance
+    except Exception:
+        return PerformanceConfig()
+
+def get_tool_executor() -> ThreadPoolExecutor:
+    """获取工具执行线程池"""
+    global tool_executor
+    if tool_executor is None:
+        max_workers = get_performance_config().concurrency.get("max_workers", 8)
+        tool_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="codelens-tool")
+    return tool_executor
+
+def get_tool_semaphore(name: str) -> asyncio.Semaphore:
+    """获取工具的并发信号量"""
+    if name not in tool_semaphores:
+        concurrency = get_performance_config().concurrency
+        tool_semaphores[name] = asyncio.Semaphore(max(1, concurrency.get(name, concurrency.get("per_tool", 2))))
+    return tool_semaphores[name]
+
+def get_tool_timeout(name: str) -> Optional[float]:
+    """工具单次调用的超时秒数（配置为0或负数表示不限制）
+
+    默认所有工具使用 timeouts.tool_call；在 timeouts 中以工具名为键配置的值
+    （与 concurrency 的写法一致）覆盖该工具的超时。
+    """
+    timeouts = get_performance_config().timeouts
+    timeout = timeouts.get(name, timeouts.get("tool_call"))
+    return timeout if timeout and timeout > 0 else None
+
+async def run_tool(name: str, tool_instance: Any, arguments: dict[str, Any]) -> dict:
+    """在线程池中执行工具，不阻塞事件循环
+
+    - 每个工具的并发数受信号量限制，槽位在工作线程真正结束时才释放
+    - 超时从调用开始计算，包括等待并发槽位的时间
+    - 客户端取消或超时时，仍在排队或尚未开始的调用会被取消；已在运行的线程无法中断，
+      其结果被丢弃，但在结束前继续占用并发槽位
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = get_tool_semaphore(name)
+
+    async def acquire_and_run() -> dict:
+        await semaphore.acquire()
+        try:
+            context = contextvars.copy_context()
+            future = get_tool_executor().submit(context.run, tool_instance.execute, arguments)
+        except BaseException:
+            semaphore.release()
+            raise
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(semaphore.release))
+
+        try:
+            return await asyncio.shield(asyncio.wrap_future(future, loop=loop))
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+
+    return await asyncio.wait_for(acquire_and_run(), timeout=get_tool_timeout(name))
+
 def setup_hot_reload():
     """设置热重载功能"""
     global hot_reload_manager
@@ -73,18 +132,22 @@ def setup_hot_reload():
     
     if enable_hot_reload:
         try:
+            from src.hot_reload import HotReloadManager
+
             hot_reload_manager = HotReloadManager(
                 enabled=True,
                 debounce_seconds=0.5,
                 batch_reload_window=2.0
             )
             
-            # 注册工具实例
-            for tool_name, tool_instance in codelens_tools.items():
+            # 注册已创建的工具实例，之后创建的实例通过回调注册
+            for tool_name, tool_instance in codelens_tools.loaded_items():
                 hot_reload_manager.register_tool_instance(tool_name, tool_instance)
+            codelens_tools.add_instance_callback(hot_reload_manager.register_tool_instance)
             
-            # 添加重载回调
+            # 添加重载回调；每批重载后只重建受影响的工具
             hot_reload_manager.add_reload_callback(on_module_reloaded)
+            hot_reload_manager.add_tool_update_callback(refresh_tool_instances)
             
             print("🔥 热重载功能已启用")
             
@@ -98,25 +161,20 @@ def on_module_reloaded(reload_event):
     """模块重载回调"""
     if reload_event.success:
         print(f"✅ 模块热重载成功: {reload_event.module_name}")
-        # 这里可以添加工具实例更新逻辑
-        refresh_tool_instances()
     else:
         print(f"❌ 模块热重载失败: {reload_event.module_name} - {reload_event.error}")
 
-def refresh_tool_instances():
-    """刷新工具实例（重新创建）"""
-    global codelens_tools
+def refresh_tool_instances(tool_names: Optional[List[str]] = None, reloaded_modules: Sequence[str] = ()):
+    """刷新工具实例：只重建受重载影响的工具，并迁移旧实例中仍然有效的状态
+
+    tool_names 为空时刷新全部已创建的工具。
+    """
     try:
-        # 重新创建工具实例
-        new_tools = create_tool_instances()
-        codelens_tools.update(new_tools)
-        
-        # 重新注册到热重载管理器
-        if hot_reload_manager:
-            for tool_name, tool_instance in new_tools.items():
-                hot_reload_manager.register_tool_instance(tool_name, tool_instance)
-        
-        print("🔄 工具实例已刷新")
+        if tool_names is None:
+            tool_names = [name for name, _ in codelens_tools.loaded_items()]
+        swapped = codelens_tools.swap_instances(tool_names, list(reloaded_modules))
+        if swapped:
+            print(f"🔄 工具实例已刷新: {', '.join(swapped)}")
         
     except Exception as e:
         print(f"⚠️  刷新工具实例失败: {e}")
@@ -131,46 +189,153 @@ def convert_tool_definition(tool_def: dict) -> Tool:
 
 @server.list_tools()
 async def list_tools() -> list[Tool]:
-    """列出所有可用的工具"""
-    mcp_tools = []
-    for tool_name, tool_instance in codelens_tools.items():
-        tool_def = tool_instance.get_tool_definition()
-        mcp_tool = convert_tool_definition(tool_def)
-        mcp_tools.append(mcp_tool)
-    return mcp_tools
+    """列出所有可用的工具（读取静态清单，不导入工具模块）
+
+    首次读取清单和清单过期时生成定义都涉及文件读写或模块导入，放到线程池中执行。
+    """
+    definitions = await asyncio.get_running_loop().run_in_executor(get_tool_executor(),
+                                                                   codelens_tools.get_definitions)
+    return [convert_tool_definition(tool_def) for tool_def in definitions]
 
 @server.call_tool()
 async def call_tool(name: str, arguments: dict[str, Any]) -> Sequence[TextContent]:
-    """调用指定的工具"""
+    """调用指定的工具（记录调用次数、延迟和结果）"""
+    metrics = get_metrics_registry()
     if name not in codelens_tools:
+        count_tool_call(name, "unknown_tool")
         raise ValueError(f"Unknown tool: {name}")
-    
+
+    labels = {"tool": name}
+    start = time.perf_counter()
+    metrics.add_gauge("tool_calls_in_flight", 1, labels, help="MCP tool calls currently running")
+    try:
+        return await _call_tool(name, arguments)
+    finally:
+        metrics.add_gauge("tool_calls_in_flight", -1, labels)
+        metrics.observe("tool_call_seconds", time.perf_counter() - start, labels,
+                        help="MCP tool call latency including queueing")
+
+def count_tool_call(name: str, status: str):
+    """按工具和结果计数（ok / error / timeout / exception / unknown_tool）"""
+    get_metrics_registry().inc("tool_calls_total", labels={"tool": name, "status": status},
+                               help="MCP tool calls by tool and status")
+
+async def _call_tool(name: str, arguments: dict[str, Any]) -> Sequence[TextContent]:
+    """执行工具并转换为MCP响应，记录调用结果"""
     try:
+        if name not in codelens_tools.instances:
+            # 首次调用时在线程池中导入模块并创建实例，不阻塞事件循环
+            await asyncio.get_running_loop().run_in_executor(get_tool_executor(), codelens_tools.get, name)
         tool_instance = codelens_tools[name]
-        result = tool_instance.execute(arguments)
+        result = await run_tool(name, tool_instance, arguments)
         
-        # 将结果转换为MCP TextContent格式
+        # 将结果转换为MCP TextContent格式（紧凑序列化，超出预算时截断并附带续取句柄）
         if result.get("success"):
-            content = json.dumps(result, indent=2, ensure_ascii=False)
+            count_tool_call(name, "ok")
+            content = get_response_governor().render(name, result)
             return [TextContent(type="text", text=content)]
         else:
-            error_content = json.dumps({
+            count_tool_call(name, "error")
+            error_content = get_response_governor().render(name, {
                 "error": result.get("error", "Tool execution failed"),
                 "tool": name,
                 "arguments": arguments
-            }, indent=2, ensure_ascii=False)
+            })
             return [TextContent(type="text", text=error_content)]
             
+    except asyncio.TimeoutError:
+        count_tool_call(name, "timeout")
+        error_content = get_response_governor().render(name, {
+            "error": f"Tool execution timed out after {get_tool_timeout(name)} seconds",
+            "tool": name,
+            "arguments": arguments
+        })
+        return [TextContent(type="text", text=error_content)]
     except Exception as e:
-        error_content = json.dumps({
+        count_tool_call(name, "exception")
+        error_content = get_response_governor().render(name, {
             "error": f"Tool execution failed: {str(e)}",
             "tool": name,
             "arguments": arguments
-        }, indent=2, ensure_ascii=False)
+        })
         return [TextContent(type="text", text=error_content)]
 
+def profile_module_import(module_name: str, top: int = 5) -> Dict[str, Any]:
+    """在子进程中用 python -X importtime 测量一个模块的冷启动导入耗时
+
+    返回该模块的累计导入耗时，以及自身耗时最高的若干依赖模块。
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+        cwd=str(Path(__file__).parent),
+        capture_output=True,
+        text=True
+    )
+
+    # 每行格式：import time: <self us> | <cumulative us> | <缩进的模块名>
+    entries = []
+    for line in completed.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)", line)
+        if match:
+            entries.append({
+                "module": match.group(4),
+                "self_us": int(match.group(1)),
+                "cumulative_us": int(match.group(2))
+            })
+
+    cumulative_us = next((entry["cumulative_us"] for entry in entries if entry["module"] == module_name), None)
+    return {
+        "module": module_name,
+        "ok": completed.returncode == 0,
+        "cumulative_ms": round(cumulative_us / 1000, 2) if cumulative_us is not None else None,
+        "modules_imported": len(entries),
+        "top_self_time": [
+            {"module": entry["module"], "self_ms": round(entry["self_us"] / 1000, 2)}
+            for entry in sorted(entries, key=lambda item: item["self_us"], reverse=True)[:top]
+        ]
+    }
+
+def profile_startup() -> Dict[str, Any]:
+    """启动耗时报告：服务器各启动阶段，以及每个工具模块的导入 / 实例化耗时"""
+    list_start = time.perf_counter()
+    definitions = codelens_tools.get_definitions()
+    list_ms = (time.perf_counter() - list_start) * 1000
+    tools_imported_by_listing = [name for name, _ in codelens_tools.loaded_items()]
+
+    config_start = time.perf_counter()
+    get_performance_config()
+    config_ms = (time.perf_counter() - config_start) * 1000
+
+    # 每个工具模块的独立冷启动导入耗时（子进程，不受本进程已导入模块影响）
+    import_profiles: List[Dict[str, Any]] = [
+        profile_module_import(module_name) for module_name, _ in codelens_tools.tool_modules.values()
+    ]
+
+    # 本进程内按顺序加载全部工具（共享依赖只在第一次导入时计时）
+    load_start = time.perf_counter()
+    codelens_tools.load_all()
+    load_ms = (time.perf_counter() - load_start) * 1000
+
+    return {
+        "phases_ms": {
+            "mcp_sdk_import": round((_MCP_IMPORTED_AT - _STARTUP_T0) * 1000, 2),
+            "server_modules_import": round((_MODULES_IMPORTED_AT - _MCP_IMPORTED_AT) * 1000, 2),
+            "list_tools_from_manifest": round(list_ms, 2),
+            "config_load": round(config_ms, 2),
+            "load_all_tools": round(load_ms, 2)
+        },
+        "tools_listed": len(definitions),
+        "tools_imported_by_listing": tools_imported_by_listing,
+        "tool_imports": sorted(import_profiles, key=lambda item: item["cumulative_ms"] or 0, reverse=True),
+        "in_process_tool_timings_ms": codelens_tools.timings
+    }
+
 async def main():
     """主入口函数"""
+    if len(sys.argv) > 1 and sys.argv[1] == "--profile-startup":
+        print(json.dumps(profile_startup(), indent=2, ensure_ascii=False))
+        return
+
     # 设置热重载
     setup_hot_reload()
     
@@ -216,7 +381,9 @@ async def main():
                 "version": "1.0.0.3",
                 "description": "CodeLens MCP Server - With Hot Reload Support",
                 "tools": len(codelens_tools),
-                "hot_reload": hot_reload_status
+                "hot_reload": hot_reload_status,
+                "responses": get_response_governor().get_metrics(),
+                "metrics": get_metrics_registry().snapshot()
             }
             print(json.dumps(info, indent=2))
             return
@@ -235,9 +402,9 @@ async def main():
                 print("❌ 热重载功能未启用")
             return
     
-    # 启动热重载管理器
+    # 启动热重载管理器（在后台线程中启动文件监控，不阻塞服务器初始化）
     if hot_reload_manager:
-        hot_reload_manager.start()
+        asyncio.get_running_loop().run_in_executor(None, hot_reload_manager.start)
     
     try:
         # 启动MCP stdio服务器
@@ -251,6 +418,11 @@ async def main():
         # 停止热重载管理器
         if hot_reload_manager:
             hot_reload_manager.stop()
+        # 停止工具启动的项目监控（doc_sync watch）
+        if "src.services.project_watcher" in sys.modules:
+            sys.modules["src.services.project_watcher"].stop_project_watchers()
+        if tool_executor is not None:
+            tool_executor.shutdown(wait=False, cancel_futures=True)
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -40,6 +40,7 @@ from .config_schema import (
 
 from .config_manager import (
     ConfigManager,
+    ConfigSnapshot,
     get_config_manager,
     get_config,
     get_file_filtering_config,
@@ -57,13 +58,13 @@ def init_config(config_path=None):
     manager = ConfigManager(config_path)
     return manager.load_config()
 
-def reload_config():
+def reload_config(project_path=None):
     """重新加载配置"""
-    return get_config_manager().reload_config()
+    return get_config_manager().reload_config(project_path)
 
-def save_config(config):
+def save_config(config, project_path=None):
     """保存用户配置"""
-    return get_config_manager().save_user_config(config)
+    return get_config_manager().save_user_config(config, project_path)
 
 def validate_config(config_dict):
     """验证配置"""
@@ -87,6 +88,7 @@ __all__ = [
     
     # 配置管理器
     'ConfigManager',
+    'ConfigSnapshot',
     'get_config_manager',
     
     # 便捷函数
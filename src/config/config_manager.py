@@ -5,15 +5,17 @@
 import json
 import os
 import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Any, Optional, List, Union
+from typing import Dict, Any, Mapping, Optional, List, Tuple, Union
 from threading import Lock
 import copy
+from collections import OrderedDict
 
 from .config_schema import (
     CodeLensConfig, ConfigValidator, 
     FileFilteringConfig, FileSizeLimitsConfig, ScanningConfig,
-    MCPToolsConfig, LogLevel
+    MCPToolsConfig, PerformanceConfig, LogLevel, freeze
 )
 
 try:
@@ -31,6 +33,25 @@ except ImportError:
     get_logger = lambda **kwargs: DummyLogger()
 
 
+FileStamp = Optional[Tuple[int, int]]  # (mtime_ns, size)，文件不存在为 None
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """一次加载得到的配置快照（不可变）
+
+    config 和 raw 由所有调用方共享，整体冻结：配置数据类不能赋值，其中的列表和
+    字典是只读的（ReadOnlyList / ReadOnlyDict），修改会抛出 TypeError。需要可修改的
+    副本时使用 copy.deepcopy；需要修改配置时通过 save_user_config /
+    update_config_section 写回文件。
+    """
+    config: CodeLensConfig
+    raw: Mapping[str, Any]
+    generation: int
+    file_stamps: Tuple[Tuple[str, FileStamp], ...]
+    loaded_at: float
+
+
 class ConfigManager:
     """
     配置管理器 - CodeLens统一配置管理中心
@@ -40,8 +61,20 @@ class ConfigManager:
     2. 配置验证和合并
     3. 配置缓存和热重载
     4. 为各个模块提供配置访问接口
+    
+    缓存命中的快速路径不加锁、不记录日志：快照的代数与当前代数一致即有效，
+    配置文件的 stat 检查最多每 STAT_CHECK_INTERVAL 秒做一次，只有这次检查
+    在 _cache_lock 下更新检查时间和LRU顺序。保存配置或调用 invalidate() 会使
+    代数加一，下一次读取时重新加载。
+    
+    用户配置按项目解析：每个项目根目录的 .codelens/config.json 与默认配置合并，
+    合并结果按项目缓存（最多 MAX_PROJECT_CONFIGS 个，最久未使用的先淘汰）。
+    未指定项目时使用进程启动目录（向后兼容）。
     """
     
+    STAT_CHECK_INTERVAL = 0.5  # 秒
+    MAX_PROJECT_CONFIGS = 16
+    
     _instance = None
     _lock = Lock()
     
@@ -68,44 +101,69 @@ class ConfigManager:
             current_dir = Path(__file__).parent
             self.config_path = current_dir / "default_config.json"
         
-        # 用户自定义配置路径
+        # 未指定项目时的用户自定义配置路径
         self.user_config_path = Path.cwd() / ".codelens" / "config.json"
         
-        # 配置缓存
-        self._config_cache: Optional[CodeLensConfig] = None
-        self._raw_config_cache: Optional[Dict[str, Any]] = None
-        self._cache_timestamp: float = 0
-        self._cache_ttl: float = 300  # 5分钟缓存
-        
-        # 配置文件监控
-        self._last_modified: Dict[str, float] = {}
+        # 配置缓存：用户配置文件路径 -> 快照
+        self._snapshots: "OrderedDict[str, ConfigSnapshot]" = OrderedDict()
+        self._generation = 0
+        self._next_stat_check: Dict[str, float] = {}  # 下一次允许 stat 配置文件的时间（monotonic）
+        self._load_lock = Lock()  # 串行化配置加载
+        self._cache_lock = Lock()  # 保护 _snapshots 的顺序/淘汰和 _next_stat_check（在 _load_lock 内获取）
         
         self.logger.info("ConfigManager 初始化完成", {
             "default_config_path": str(self.config_path),
             "user_config_path": str(self.user_config_path),
-            "cache_ttl": self._cache_ttl
+            "stat_check_interval": self.STAT_CHECK_INTERVAL
         })
         
         self._initialized = True
     
-    def load_config(self, force_reload: bool = False) -> CodeLensConfig:
+    def load_config(self, force_reload: bool = False, project_path: Optional[str] = None) -> CodeLensConfig:
         """
         加载配置，支持缓存和热重载
         
         Args:
             force_reload: 是否强制重新加载
+            project_path: 项目根目录（决定使用哪个用户配置），默认为进程启动目录
             
         Returns:
             配置对象
         """
-        operation_id = self.logger.log_operation_start("load_config", force_reload=force_reload)
+        key = self._config_key(project_path)
+        if not force_reload:
+            cached = self._cached_config(key)
+            if cached is not None:
+                return cached
+        
+        with self._load_lock:
+            # 等待锁期间其他线程可能已经完成加载
+            if not force_reload:
+                cached = self._cached_config(key)
+                if cached is not None:
+                    return cached
+            return self._load_snapshot(self.user_config_path_for(project_path))
+    
+    def user_config_path_for(self, project_path: Optional[str] = None) -> Path:
+        """项目的用户配置文件路径"""
+        if project_path is None:
+            return self.user_config_path
+        return Path(self._config_key(project_path))
+    
+    def _config_key(self, project_path: Optional[str] = None) -> str:
+        """缓存键：项目用户配置文件路径的字符串形式（避免在快速路径上构造 Path）"""
+        if project_path is None:
+            return str(self.user_config_path)
+        return os.path.join(os.path.abspath(project_path), ".codelens", "config.json")
+    
+    def _load_snapshot(self, user_config_path: Path) -> CodeLensConfig:
+        """读取、合并并验证配置文件，生成新的快照（需持有 _load_lock）"""
+        key = str(user_config_path)
+        operation_id = self.logger.log_operation_start("load_config", user_config_path=key)
+        generation = self._generation
+        file_stamps = self._file_stamps(user_config_path)
         
         try:
-            # 检查是否需要重新加载
-            if not force_reload and self._is_cache_valid():
-                self.logger.debug("使用缓存配置")
-                return self._config_cache
-            
             self.logger.info("加载配置文件")
             
             # 加载默认配置
@@ -114,8 +172,8 @@ class ConfigManager:
             
             # 加载用户配置（如果存在）
             user_config = {}
-            if self.user_config_path.exists():
-                user_config = self._load_config_file(self.user_config_path)
+            if user_config_path.exists():
+                user_config = self._load_config_file(user_config_path)
                 self.logger.debug("用户配置加载完成", {"keys": len(user_config)})
             
             # 合并配置
@@ -129,14 +187,24 @@ class ConfigManager:
                 # for error in validation_errors:
                 #     self.logger.error(f"配置验证错误: {error}")
             
-            # 创建配置对象
-            config_obj = self._create_config_object(merged_config)
-            
-            # 更新缓存
-            self._config_cache = config_obj
-            self._raw_config_cache = merged_config
-            self._cache_timestamp = time.time()
-            self._update_file_timestamps()
+            # 创建配置对象（冻结后在调用方之间共享）
+            config_obj = freeze(self._create_config_object(merged_config))
+            
+            # 更新缓存（整体替换快照，读取方无需加锁）
+            snapshot = ConfigSnapshot(
+                config=config_obj,
+                raw=freeze(merged_config),
+                generation=generation,
+                file_stamps=file_stamps,
+                loaded_at=time.time()
+            )
+            with self._cache_lock:
+                self._snapshots[key] = snapshot
+                self._snapshots.move_to_end(key)
+                self._next_stat_check[key] = time.monotonic() + self.STAT_CHECK_INTERVAL
+                while len(self._snapshots) > self.MAX_PROJECT_CONFIGS:
+                    evicted_key, _ = self._snapshots.popitem(last=False)
+                    self._next_stat_check.pop(evicted_key, None)
             
             self.logger.log_operation_end("load_config", operation_id, 
                                         config_sections=len(merged_config),
@@ -149,37 +217,54 @@ class ConfigManager:
             self.logger.log_operation_end("load_config", operation_id, success=False, error=str(e))
             
             # 返回默认配置作为后备
-            if self._config_cache:
+            snapshot = self._snapshots.get(key)
+            if snapshot:
                 self.logger.warning("使用缓存配置作为后备")
-                return self._config_cache
+                return snapshot.config
             else:
                 self.logger.warning("使用内置默认配置作为后备")
                 return CodeLensConfig()
     
-    def get_config(self) -> CodeLensConfig:
-        """获取当前配置（优先使用缓存）"""
-        return self.load_config(force_reload=False)
+    def get_config(self, project_path: Optional[str] = None) -> CodeLensConfig:
+        """获取项目的当前配置（优先使用缓存）"""
+        cached = self._cached_config(self._config_key(project_path))
+        if cached is not None:
+            return cached
+        return self.load_config(force_reload=False, project_path=project_path)
     
-    def reload_config(self) -> CodeLensConfig:
+    def get_snapshot(self, project_path: Optional[str] = None) -> Optional[ConfigSnapshot]:
+        """获取项目的配置快照（包含合并后的原始配置字典），加载失败时为 None"""
+        self.get_config(project_path)
+        return self._snapshots.get(self._config_key(project_path))
+    
+    def invalidate(self):
+        """使所有快照失效（例如检测到配置文件变化时），下一次读取重新加载"""
+        with self._load_lock:
+            self._generation += 1
+    
+    def reload_config(self, project_path: Optional[str] = None) -> CodeLensConfig:
         """强制重新加载配置"""
         self.logger.info("强制重新加载配置")
-        return self.load_config(force_reload=True)
+        return self.load_config(force_reload=True, project_path=project_path)
     
-    def save_user_config(self, config: Union[CodeLensConfig, Dict[str, Any]]) -> bool:
+    def save_user_config(self, config: Union[CodeLensConfig, Dict[str, Any]],
+                         project_path: Optional[str] = None) -> bool:
         """
         保存用户自定义配置
         
         Args:
             config: 配置对象或字典
+            project_path: 项目根目录，默认为进程启动目录
             
         Returns:
             是否保存成功
         """
         operation_id = self.logger.log_operation_start("save_user_config")
+        user_config_path = self.user_config_path_for(project_path)
         
         try:
             # 确保用户配置目录存在
-            self.user_config_path.parent.mkdir(parents=True, exist_ok=True)
+            user_config_path.parent.mkdir(parents=True, exist_ok=True)
             
             # 转换配置为字典
             if isinstance(config, CodeLensConfig):
@@ -194,10 +279,10 @@ class ConfigManager:
                 return False
             
             # 保存配置文件
-            with open(self.user_config_path, 'w', encoding='utf-8') as f:
+            with open(user_config_path, 'w', encoding='utf-8') as f:
                 json.dump(config_dict, f, indent=2, ensure_ascii=False)
             
-            self.logger.info("用户配置保存成功", {"path": str(self.user_config_path)})
+            self.logger.info("用户配置保存成功", {"path": str(user_config_path)})
             
             # 清除缓存，强制下次重新加载
             self._invalidate_cache()
@@ -210,40 +295,43 @@ class ConfigManager:
             self.logger.log_operation_end("save_user_config", operation_id, success=False, error=str(e))
             return False
     
-    def get_file_filtering_config(self) -> FileFilteringConfig:
+    def get_file_filtering_config(self, project_path: Optional[str] = None) -> FileFilteringConfig:
         """获取文件过滤配置"""
-        return self.get_config().file_filtering
+        return self.get_config(project_path).file_filtering
     
-    def get_file_size_limits_config(self) -> FileSizeLimitsConfig:
+    def get_file_size_limits_config(self, project_path: Optional[str] = None) -> FileSizeLimitsConfig:
         """获取文件大小限制配置"""
-        return self.get_config().file_size_limits
+        return self.get_config(project_path).file_size_limits
     
-    def get_scanning_config(self) -> ScanningConfig:
+    def get_scanning_config(self, project_path: Optional[str] = None) -> ScanningConfig:
         """获取扫描配置"""
-        return self.get_config().scanning
+        return self.get_config(project_path).scanning
     
-    def get_mcp_tools_config(self) -> MCPToolsConfig:
+    def get_mcp_tools_config(self, project_path: Optional[str] = None) -> MCPToolsConfig:
         """获取MCP工具配置"""
-        return self.get_config().mcp_tools
+        return self.get_config(project_path).mcp_tools
     
-    def get_tool_config(self, tool_name: str) -> Dict[str, Any]:
+    def get_tool_config(self, tool_name: str, project_path: Optional[str] = None) -> Dict[str, Any]:
         """获取特定工具的配置"""
-        mcp_config = self.get_mcp_tools_config()
+        mcp_config = self.get_mcp_tools_config(project_path)
         return getattr(mcp_config, tool_name, {})
     
-    def update_config_section(self, section: str, updates: Dict[str, Any]) -> bool:
+    def update_config_section(self, section: str, updates: Dict[str, Any],
+                              project_path: Optional[str] = None) -> bool:
         """
         更新配置的特定部分
         
         Args:
             section: 配置节名称
             updates: 要更新的配置项
+            project_path: 项目根目录，默认为进程启动目录
             
         Returns:
             是否更新成功
         """
         try:
-            current_config = self._raw_config_cache or {}
+            snapshot = self.get_snapshot(project_path)
+            current_config = copy.deepcopy(dict(snapshot.raw)) if snapshot else {}
             
             if section not in current_config:
                 current_config[section] = {}
@@ -252,43 +340,48 @@ class ConfigManager:
             current_config[section] = self._deep_merge(current_config[section], updates)
             
             # 保存更新后的配置
-            return self.save_user_config(current_config)
+            return self.save_user_config(current_config, project_path)
             
         except Exception as e:
             self.logger.error(f"配置节更新失败: {e}", exc_info=True)
             return False
     
-    def _is_cache_valid(self) -> bool:
-        """检查缓存是否有效"""
-        if not self._config_cache:
-            return False
-        
-        # 检查缓存时间
-        if time.time() - self._cache_timestamp > self._cache_ttl:
-            return False
+    def _cached_config(self, key: str) -> Optional[CodeLensConfig]:
+        """快速路径：快照仍然有效时返回配置对象，否则返回 None（不加锁、不记录日志）
+
+        key 为用户配置文件路径。
+        """
+        snapshot = self._snapshots.get(key)
+        if snapshot is None or snapshot.generation != self._generation:
+            return None
         
-        # 检查文件修改时间
-        for file_path in [self.config_path, self.user_config_path]:
-            if file_path.exists():
-                current_mtime = file_path.stat().st_mtime
-                cached_mtime = self._last_modified.get(str(file_path), 0)
-                if current_mtime > cached_mtime:
-                    return False
+        now = time.monotonic()
+        if now < self._next_stat_check.get(key, 0.0):
+            return snapshot.config
         
-        return True
+        # 节流的有效性检查：每个间隔内最多 stat 一次配置文件，同时刷新LRU顺序
+        if self._file_stamps(Path(key)) != snapshot.file_stamps:
+            return None
+        with self._cache_lock:
+            if self._snapshots.get(key) is snapshot:  # 期间可能已被淘汰或替换
+                self._next_stat_check[key] = now + self.STAT_CHECK_INTERVAL
+                self._snapshots.move_to_end(key)
+        return snapshot.config
     
     def _invalidate_cache(self):
         """使缓存失效"""
-        self._config_cache = None
-        self._raw_config_cache = None
-        self._cache_timestamp = 0
-        self._last_modified.clear()
+        self.invalidate()
     
-    def _update_file_timestamps(self):
-        """更新文件时间戳记录"""
-        for file_path in [self.config_path, self.user_config_path]:
-            if file_path.exists():
-                self._last_modified[str(file_path)] = file_path.stat().st_mtime
+    def _file_stamps(self, user_config_path: Path) -> Tuple[Tuple[str, FileStamp], ...]:
+        """默认配置和用户配置文件的 (mtime_ns, size)"""
+        stamps = []
+        for file_path in (self.config_path, user_config_path):
+            try:
+                stat = os.stat(file_path)
+                stamps.append((str(file_path), (stat.st_mtime_ns, stat.st_size)))
+            except OSError:
+                stamps.append((str(file_path), None))
+        return tuple(stamps)
     
     def _load_config_file(self, file_path: Path) -> Dict[str, Any]:
         """加载单个配置文件"""
@@ -346,14 +439,14 @@ class ConfigManager:
     
     def _create_config_object(self, config_dict: Dict[str, Any]) -> CodeLensConfig:
         """从字典创建配置对象"""
-        # 简化版本：使用默认配置对象并尝试更新字段
-        config = CodeLensConfig()
+        # 简化版本：未配置的部分使用默认值（配置对象是冻结的数据类，收集各部分后一次构造）
+        sections: Dict[str, Any] = {}
         
         try:
             # 文件过滤配置
             if "file_filtering" in config_dict:
                 ff_data = config_dict["file_filtering"]
-                config.file_filtering = FileFilteringConfig(
+                sections["file_filtering"] = FileFilteringConfig(
                     include_extensions=ff_data.get("include_extensions", [".py"]),
                     exclude_patterns=ff_data.get("exclude_patterns", []),
                     exclude_directories=ff_data.get("exclude_directories", []),
@@ -374,7 +467,7 @@ class ConfigManager:
                     overlap_size=chunking_data.get("overlap_size", 50)
                 )
                 
-                config.file_size_limits = FileSizeLimitsConfig(
+                sections["file_size_limits"] = FileSizeLimitsConfig(
                     min_file_size=fsl_data.get("min_file_size", 50),
                     max_file_size=fsl_data.get("max_file_size", 122880),
                     large_file_threshold=fsl_data.get("large_file_threshold", 50000),
@@ -384,7 +477,7 @@ class ConfigManager:
             # 扫描配置
             if "scanning" in config_dict:
                 scan_data = config_dict["scanning"]
-                config.scanning = ScanningConfig(
+                sections["scanning"] = ScanningConfig(
                     max_depth=scan_data.get("max_depth", 6),
                     follow_symlinks=scan_data.get("follow_symlinks", False),
                     include_hidden_files=scan_data.get("include_hidden_files", False)
@@ -393,11 +486,24 @@ class ConfigManager:
             # MCP工具配置
             if "mcp_tools" in config_dict:
                 mcp_data = config_dict["mcp_tools"]
-                config.mcp_tools = MCPToolsConfig(
+                sections["mcp_tools"] = MCPToolsConfig(
                     # 这里可以添加具体的MCP工具配置映射
                 )
             
+            # 性能配置（与默认值合并，未配置的键保持默认）
+            if "performance" in config_dict:
+                perf_data = config_dict["performance"]
+                defaults = PerformanceConfig()
+                sections["performance"] = PerformanceConfig(
+                    memory_limits={**defaults.memory_limits, **perf_data.get("memory_limits", {})},
+                    timeouts={**defaults.timeouts, **perf_data.get("timeouts", {})},
+                    optimization={**defaults.optimization, **perf_data.get("optimization", {})},
+                    concurrency={**defaults.concurrency, **perf_data.get("concurrency", {})},
+                    response_limits={**defaults.response_limits, **perf_data.get("response_limits", {})}
+                )
+            
             # 验证最终配置对象
+            config = CodeLensConfig(**sections)
             validation_errors = config.validate()
             if validation_errors:
                 self.logger.warning("配置对象验证失败", {"errors": validation_errors})
@@ -422,24 +528,24 @@ def get_config_manager() -> ConfigManager:
     return _global_config_manager
 
 
-def get_config() -> CodeLensConfig:
-    """快捷方式：获取当前配置"""
-    return get_config_manager().get_config()
+def get_config(project_path: Optional[str] = None) -> CodeLensConfig:
+    """快捷方式：获取当前配置（project_path 指定时使用该项目的用户配置）"""
+    return get_config_manager().get_config(project_path)
 
 
-def get_file_filtering_config() -> FileFilteringConfig:
+def get_file_filtering_config(project_path: Optional[str] = None) -> FileFilteringConfig:
     """快捷方式：获取文件过滤配置"""
-    return get_config_manager().get_file_filtering_config()
+    return get_config_manager().get_file_filtering_config(project_path)
 
 
-def get_file_size_limits_config() -> FileSizeLimitsConfig:
+def get_file_size_limits_config(project_path: Optional[str] = None) -> FileSizeLimitsConfig:
     """快捷方式：获取文件大小限制配置"""
-    return get_config_manager().get_file_size_limits_config()
+    return get_config_manager().get_file_size_limits_config(project_path)
 
 
-def get_tool_config(tool_name: str) -> Dict[str, Any]:
+def get_tool_config(tool_name: str, project_path: Optional[str] = None) -> Dict[str, Any]:
     """快捷方式：获取工具配置"""
-    return get_config_manager().get_tool_config(tool_name)
+    return get_config_manager().get_tool_config(tool_name, project_path)
 
 
 # 配置常量导出（向后兼容）
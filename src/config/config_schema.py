@@ -2,13 +2,73 @@
 配置文件验证模式和数据类型定义
 定义了所有配置项的数据结构、验证规则和默认值
 """
-from dataclasses import dataclass, field
+import copy
+from dataclasses import dataclass, field, fields, is_dataclass
 from typing import Dict, List, Optional, Union, Any
 from enum import Enum
 import json
 from pathlib import Path
 
 
+class ReadOnlyList(list):
+    """只读列表：配置快照中的列表（仍是 list，可以迭代、拼接、序列化）
+
+    copy.copy / copy.deepcopy 返回普通的可修改副本。
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("配置快照是只读的，请先复制（copy.deepcopy）再修改")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = extend = insert = pop = remove = clear = sort = reverse = _readonly
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return [copy.deepcopy(item, memo) for item in self]
+
+    def __reduce_ex__(self, protocol):
+        return list, (list(self),)
+
+
+class ReadOnlyDict(dict):
+    """只读字典：配置快照中的字典（仍是 dict，可以读取、解包、序列化）
+
+    copy.copy / copy.deepcopy 返回普通的可修改副本。
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("配置快照是只读的，请先复制（copy.deepcopy）再修改")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    pop = popitem = setdefault = update = clear = _readonly
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return {key: copy.deepcopy(value, memo) for key, value in self.items()}
+
+    def __reduce_ex__(self, protocol):
+        return dict, (dict(self),)
+
+
+def freeze(value: Any) -> Any:
+    """把配置值递归转换为只读形式（列表和字典换成只读版本，配置数据类就地冻结其字段）"""
+    if isinstance(value, (ReadOnlyList, ReadOnlyDict)):
+        return value
+    if is_dataclass(value) and not isinstance(value, type):
+        for config_field in fields(value):
+            object.__setattr__(value, config_field.name, freeze(getattr(value, config_field.name)))
+        return value
+    if isinstance(value, dict):
+        return ReadOnlyDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return ReadOnlyList(freeze(item) for item in value)
+    return value
+
+
 class LogLevel(Enum):
     """日志级别枚举"""
     DEBUG = "DEBUG"
@@ -24,7 +84,7 @@ class AnalysisDepth(Enum):
     COMPREHENSIVE = "comprehensive"
 
 
-@dataclass
+@dataclass(frozen=True)
 class FileFilteringConfig:
     """文件过滤配置"""
     include_extensions: List[str] = field(default_factory=lambda: [".py"])
@@ -54,7 +114,7 @@ class FileFilteringConfig:
         return True
 
 
-@dataclass
+@dataclass(frozen=True)
 class ChunkingConfig:
     """文件分片配置"""
     enabled: bool = True
@@ -71,7 +131,7 @@ class ChunkingConfig:
         return True
 
 
-@dataclass
+@dataclass(frozen=True)
 class FileSizeLimitsConfig:
     """文件大小限制配置"""
     min_file_size: int = 50
@@ -88,14 +148,14 @@ class FileSizeLimitsConfig:
         return self.min_file_size <= file_size <= self.max_file_size
 
 
-@dataclass
+@dataclass(frozen=True)
 class ParallelProcessingConfig:
     """并行处理配置"""
     enabled: bool = True
     max_workers: int = 4
 
 
-@dataclass
+@dataclass(frozen=True)
 class ScanningConfig:
     """扫描配置"""
     max_depth: int = 6
@@ -109,13 +169,13 @@ class ScanningConfig:
     })
 
 
-@dataclass
+@dataclass(frozen=True)
 class MCPToolConfig:
     """MCP工具配置基类"""
     pass
 
 
-@dataclass
+@dataclass(frozen=True)
 class DocGuideConfig(MCPToolConfig):
     """doc_guide工具配置"""
     analysis_depth: AnalysisDepth = AnalysisDepth.COMPREHENSIVE
@@ -123,7 +183,7 @@ class DocGuideConfig(MCPToolConfig):
     focus_areas: List[str] = field(default_factory=lambda: ["architecture", "modules", "files", "project"])
 
 
-@dataclass
+@dataclass(frozen=True)
 class TaskInitConfig(MCPToolConfig):
     """task_init工具配置"""
     auto_filter_files: bool = True
@@ -132,7 +192,7 @@ class TaskInitConfig(MCPToolConfig):
     template_validation: bool = True
 
 
-@dataclass
+@dataclass(frozen=True)
 class TaskExecuteConfig(MCPToolConfig):
     """task_execute工具配置"""
     enable_chunking: bool = True
@@ -141,7 +201,7 @@ class TaskExecuteConfig(MCPToolConfig):
     progress_tracking: bool = True
 
 
-@dataclass
+@dataclass(frozen=True)
 class MCPToolsConfig:
     """MCP工具集配置"""
     doc_guide: DocGuideConfig = field(default_factory=DocGuideConfig)
@@ -149,7 +209,7 @@ class MCPToolsConfig:
     task_execute: TaskExecuteConfig = field(default_factory=TaskExecuteConfig)
 
 
-@dataclass
+@dataclass(frozen=True)
 class TemplateConfig:
     """模板配置"""
     validation: Dict[str, bool] = field(default_factory=lambda: {
@@ -164,7 +224,7 @@ class TemplateConfig:
     })
 
 
-@dataclass
+@dataclass(frozen=True)
 class LoggingConfig:
     """日志配置"""
     level: LogLevel = LogLevel.INFO
@@ -181,7 +241,7 @@ class LoggingConfig:
     })
 
 
-@dataclass
+@dataclass(frozen=True)
 class PerformanceConfig:
     """性能配置"""
     memory_limits: Dict[str, str] = field(default_factory=lambda: {
@@ -191,16 +251,31 @@ class PerformanceConfig:
     timeouts: Dict[str, int] = field(default_factory=lambda: {
         "file_scan": 30,
         "analysis": 60,
-        "template_render": 10
+        "template_render": 10,
+        "tool_call": 120
     })
     optimization: Dict[str, bool] = field(default_factory=lambda: {
         "lazy_loading": True,
         "incremental_analysis": True,
         "result_caching": True
     })
+    # MCP工具执行：线程池大小、每个工具默认并发上限，可按工具名单独覆盖
+    concurrency: Dict[str, int] = field(default_factory=lambda: {
+        "max_workers": 8,
+        "per_tool": 2,
+        "task_status": 4,
+        "task_execute": 4,
+        "task_batch": 4
+    })
+    # MCP响应大小预算（字节），可按工具名单独覆盖
+    response_limits: Dict[str, int] = field(default_factory=lambda: {
+        "max_bytes": 80000,
+        "handle_ttl_seconds": 600,
+        "max_handles": 32
+    })
 
 
-@dataclass
+@dataclass(frozen=True)
 class SecurityConfig:
     """安全配置"""
     path_validation: Dict[str, Any] = field(default_factory=lambda: {
@@ -215,7 +290,7 @@ class SecurityConfig:
     })
 
 
-@dataclass
+@dataclass(frozen=True)
 class CodeLensConfig:
     """CodeLens 主配置类"""
     # 元数据
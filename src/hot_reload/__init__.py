@@ -3,7 +3,7 @@
 """
 
 from .hot_reload_manager import HotReloadManager
-from .file_watcher import FileWatcher
+from .file_watcher import FileWatcher, WatchFilter
 from .module_reloader import ModuleReloader
 
-__all__ = ['HotReloadManager', 'FileWatcher', 'ModuleReloader']
\ No newline at end of file
+__all__ = ['HotReloadManager', 'FileWatcher', 'WatchFilter', 'ModuleReloader']
\ No newline at end of file
@@ -1,12 +1,19 @@
 """
-文件监控器 - 监控Python文件变化并触发重载
+文件监控器 - 监控文件变化并通知回调
+
+监控根目录可以是任意目录（CodeLens 自身的源码或被分析的目标项目），每个根目录
+使用自己的 WatchFilter：目标项目由 FileFilteringConfig 生成，热重载使用
+WatchFilter.python_sources()。
 """
 
 import os
 import time
+from bisect import bisect_left
+from collections import OrderedDict
+from fnmatch import fnmatch
 from pathlib import Path
-from typing import Set, List, Callable, Optional
-from threading import Thread, Event
+from typing import Any, Dict, List, Callable, Iterable, Iterator, Optional, Tuple
+from threading import Thread, Event, Lock
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 
@@ -28,112 +35,532 @@ except ImportError:
 
 from src.logging import get_logger
 
+
+class WatchFilter:
+    """监控过滤规则：扩展名白名单 + 排除模式 + 排除目录
+
+    - extensions 为空表示接受所有扩展名
+    - 排除模式按路径中的每一级名称匹配：含通配符的模式用 fnmatch，
+      以 "." 开头的模式同时匹配后缀（如 .pyc），其余模式要求名称完全相同
+    - 排除目录按名称匹配，含路径分隔符的条目（如 src/config）按相对于根目录的路径匹配
+    - __pycache__ 总是跳过，隐藏目录默认跳过；目录在列举时即被剪枝
+    """
+
+    ALWAYS_SKIP_DIRS = {"__pycache__"}
+    VIRTUALENV_DIRS = ("venv", "env", "site-packages", "node_modules")
+
+    def __init__(self, extensions: Optional[Iterable[str]] = (".py",),
+                 exclude_patterns: Iterable[str] = (),
+                 exclude_directories: Iterable[str] = (),
+                 skip_hidden: bool = True):
+        self.skip_hidden = skip_hidden
+        self.extensions = tuple(ext.lower() for ext in extensions or ())
+        self.exclude_patterns = [pattern for pattern in exclude_patterns if pattern]
+        self.exclude_directories = {d for d in exclude_directories if '/' not in d}
+        self._excluded_dir_paths = {os.path.normpath(d) for d in exclude_directories if '/' in d}
+        self._globs = [p for p in self.exclude_patterns if any(ch in p for ch in "*?[")]
+        plain = [p for p in self.exclude_patterns if p not in self._globs]
+        self._names = set(plain)
+        self._suffixes = tuple(p for p in plain if p.startswith("."))
+
+    @classmethod
+    def from_config(cls, filtering_config: Any = None,
+                    extensions: Optional[Iterable[str]] = None) -> "WatchFilter":
+        """由 FileFilteringConfig 生成（extensions 覆盖配置中的扩展名），用于跟踪目标项目"""
+        if filtering_config is None:
+            try:
+                from src.config import get_file_filtering_config
+                filtering_config = get_file_filtering_config()
+            except Exception:
+                return cls(extensions if extensions is not None else (".py",))
+        return cls(extensions if extensions is not None else filtering_config.include_extensions,
+                   filtering_config.exclude_patterns, filtering_config.exclude_directories)
+
+    @classmethod
+    def python_sources(cls) -> "WatchFilter":
+        """热重载使用的源码过滤规则：所有 .py 文件（包括 __init__.py），只剪枝缓存、隐藏目录和虚拟环境
+
+        不使用 FileFilteringConfig：其中的排除规则面向文档生成（例如排除 __init__.py、
+        config、cache 等），用于热重载会漏掉源码变化。
+        """
+        return cls((".py",), exclude_directories=cls.VIRTUALENV_DIRS)
+
+    def include_dir(self, name: str, rel_path: Optional[str] = None) -> bool:
+        """目录是否需要进入（rel_path 为相对于根目录的路径）"""
+        if name in self.ALWAYS_SKIP_DIRS or name in self.exclude_directories:
+            return False
+        if self.skip_hidden and name.startswith('.'):
+            return False
+        if rel_path is not None and rel_path in self._excluded_dir_paths:
+            return False
+        return not self._excluded(name)
+
+    def include_file(self, name: str) -> bool:
+        """文件名是否需要监控"""
+        if self.extensions and not name.lower().endswith(self.extensions):
+            return False
+        return not self._excluded(name)
+
+    def matches(self, rel_path: str) -> bool:
+        """相对于监控根目录的文件路径是否需要监控"""
+        parts = [part for part in rel_path.split(os.sep) if part and part != '.']
+        if not parts or parts[0] == '..':
+            return False
+        return (all(self.include_dir(part, os.path.join(*parts[:index + 1]))
+                    for index, part in enumerate(parts[:-1]))
+                and self.include_file(parts[-1]))
+
+    def walk(self, root: str) -> Iterator[str]:
+        """遍历根目录下所有需要监控的文件"""
+        for dir_path, dir_names, file_names in os.walk(root):
+            rel_dir = os.path.relpath(dir_path, root)
+            dir_names[:] = [name for name in dir_names
+                            if self.include_dir(name, os.path.normpath(os.path.join(rel_dir, name)))]
+            for name in file_names:
+                if self.include_file(name):
+                    yield os.path.join(dir_path, name)
+
+    def _excluded(self, name: str) -> bool:
+        if name in self._names or (self._suffixes and name.endswith(self._suffixes)):
+            return True
+        return any(fnmatch(name, pattern) for pattern in self._globs)
+
+
 class FileChangeHandler(FileSystemEventHandler):
-    """文件变化事件处理器"""
+    """文件变化事件处理器
+
+    防抖记录按时间顺序保存，超过防抖时间的记录不再影响判断，每次事件时从头部
+    清理；记录数同时不超过 MAX_TRACKED_FILES，大批量变化时内存占用有上界。
+    """
+
+    MAX_TRACKED_FILES = 1024
     
-    def __init__(self, callback: Callable[[str], None], debounce_seconds: float = 0.5):
+    def __init__(self, callback: Callable[[str], None], debounce_seconds: float = 0.5,
+                 deleted_callback: Optional[Callable[[str], None]] = None,
+                 root: Optional[str] = None, path_filter: Optional[WatchFilter] = None):
         self.callback = callback
+        self.deleted_callback = deleted_callback
         self.debounce_seconds = debounce_seconds
-        self.last_modified = {}
+        self.root = root
+        self.path_filter = path_filter or WatchFilter()
+        self.last_modified: "OrderedDict[str, float]" = OrderedDict()  # 文件 -> 最近触发时间（最旧在前）
         self.logger = get_logger("FileWatcher", "file_change_detection")
     
     def on_modified(self, event):
-        if isinstance(event, (FileModifiedEvent, FileCreatedEvent)) and event.src_path.endswith('.py'):
+        if isinstance(event, (FileModifiedEvent, FileCreatedEvent)) and self._accepts(event.src_path):
             self._handle_change(event.src_path)
     
     def on_created(self, event):
-        if isinstance(event, FileCreatedEvent) and event.src_path.endswith('.py'):
+        if isinstance(event, FileCreatedEvent) and self._accepts(event.src_path):
             self._handle_change(event.src_path)
     
+    def on_deleted(self, event):
+        if not event.is_directory and self._accepts(event.src_path):
+            self.last_modified.pop(event.src_path, None)
+            self.logger.info(f"检测到文件删除: {event.src_path}")
+            if self.deleted_callback:
+                self.deleted_callback(event.src_path)
+    
     def _handle_change(self, file_path: str):
         """处理文件变化，包含防抖动逻辑"""
-        current_time = time.time()
-        last_time = self.last_modified.get(file_path, 0)
+        current_time = time.monotonic()
+        self._expire_debounce(current_time)
         
-        if current_time - last_time > self.debounce_seconds:
-            self.last_modified[file_path] = current_time
-            self.logger.info(f"检测到文件变化: {file_path}")
-            self.callback(file_path)
+        if file_path in self.last_modified:
+            return
+        
+        self.last_modified[file_path] = current_time
+        if len(self.last_modified) > self.MAX_TRACKED_FILES:
+            self.last_modified.popitem(last=False)
+        self.logger.info(f"检测到文件变化: {file_path}")
+        self.callback(file_path)
+    
+    def _accepts(self, file_path: str) -> bool:
+        """按监控根目录的过滤规则判断事件路径"""
+        if self.root is None:
+            return self.path_filter.include_file(os.path.basename(file_path))
+        return self.path_filter.matches(os.path.relpath(file_path, self.root))
+    
+    def _expire_debounce(self, current_time: float):
+        """丢弃已超过防抖时间的记录"""
+        cutoff = current_time - self.debounce_seconds
+        while self.last_modified:
+            if next(iter(self.last_modified.values())) >= cutoff:
+                break
+            self.last_modified.popitem(last=False)
+
+class _DirState:
+    """轮询快照中的一个目录：目录修改时间 + 按文件名排序的文件列表 + 子目录"""
+
+    __slots__ = ("mtime_ns", "files", "subdirs")
+
+    def __init__(self, mtime_ns: int, files: List[Tuple[str, int, int]], subdirs: List[str]):
+        self.mtime_ns = mtime_ns
+        self.files = files  # [(文件名, mtime_ns, size)]，按文件名排序
+        self.subdirs = subdirs
+
 
 class PollingWatcher:
-    """轮询模式文件监控器（fallback方案）"""
-    
-    def __init__(self, paths: List[str], callback: Callable[[str], None], interval: float = 1.0):
-        self.paths = [Path(p) for p in paths]
+    """轮询模式文件监控器（fallback方案）
+
+    - 每轮先比较目录的修改时间，只有新增/删除/重命名过条目的目录才重新列举
+    - 每个目录保存按文件名排序的快照，与新列表归并比较得到新增、删除和修改
+    - 原地写入不会改变目录修改时间：最近变化过的文件每轮检查，
+      其余文件由定期的完整检查发现（按经过时间而不是轮数）
+    - 连续空闲时轮询间隔按 BACKOFF_FACTOR 增长到 max_interval，完整检查间隔同样从
+      full_sweep_seconds 增长到 max_full_sweep_seconds，检测到变化后两者都恢复；
+      完整检查的耗时占比不超过 MAX_SWEEP_DUTY，文件越多间隔越长，空闲时开销很小
+    - 每个根目录使用自己的 WatchFilter，运行中可以增删根目录
+    """
+
+    DEFAULT_MAX_INTERVAL = 5.0
+    BACKOFF_FACTOR = 1.5
+    FULL_SWEEP_SECONDS = 2.5  # 有变化后完整检查未变化目录中文件的间隔
+    MAX_FULL_SWEEP_SECONDS = 60.0  # 空闲时完整检查间隔的上限
+    MAX_SWEEP_DUTY = 0.01  # 完整检查耗时占经过时间的比例上限
+    HOT_FILE_SECONDS = 600  # 变化过的文件在这段时间内每轮检查
+
+    def __init__(self, paths: List[str], callback: Callable[[str], None], interval: float = 1.0,
+                 max_interval: float = DEFAULT_MAX_INTERVAL,
+                 on_deleted: Optional[Callable[[str], None]] = None,
+                 path_filter: Optional[WatchFilter] = None,
+                 full_sweep_seconds: float = FULL_SWEEP_SECONDS,
+                 max_full_sweep_seconds: float = MAX_FULL_SWEEP_SECONDS):
+        self.path_filter = path_filter or WatchFilter()
+        self.roots: Dict[str, WatchFilter] = {str(p): self.path_filter for p in paths}  # 根目录 -> 过滤规则
         self.callback = callback
+        self.on_deleted = on_deleted
         self.interval = interval
-        self.file_mtimes = {}
+        self.max_interval = max(interval, max_interval)
+        self.current_interval = interval
+        self.full_sweep_seconds = full_sweep_seconds
+        self.max_full_sweep_seconds = max(full_sweep_seconds, max_full_sweep_seconds)
+        self.current_sweep_interval = full_sweep_seconds
+        self._sweep_cost = 0.0  # 上一次完整检查的耗时（秒）
         self.running = False
         self.thread: Optional[Thread] = None
+        self._stop_event = Event()
+        self._dirs: Dict[str, _DirState] = {}
+        self._single_files: Dict[str, Optional[Tuple[int, int]]] = {}  # 直接监控的单个文件
+        self._hot_files: Dict[str, float] = {}  # 最近变化的文件 -> 变化时间
+        self._last_full_sweep = time.monotonic()
+        self._lock = Lock()  # 轮询与增删根目录互斥
         self.logger = get_logger("PollingWatcher", "file_polling")
     
     def start(self):
-        """启动轮询监控"""
+        """启动轮询监控（同步建立初始快照，启动之后的变化都会被检测到）"""
         if not self.running:
+            try:
+                self.snapshot()
+            except Exception as e:
+                self.logger.error(f"建立文件快照时出错: {e}")
+            self._last_full_sweep = time.monotonic()
+            self.current_interval = self.interval
+            self.current_sweep_interval = self.full_sweep_seconds
             self.running = True
+            self._stop_event.clear()
             self.thread = Thread(target=self._poll_loop, daemon=True)
             self.thread.start()
-            self.logger.info(f"启动轮询模式文件监控，间隔: {self.interval}s")
+            self.logger.info(f"启动轮询模式文件监控，间隔: {self.interval}s - {self.max_interval}s")
     
     def stop(self):
         """停止轮询监控"""
         self.running = False
+        self._stop_event.set()
         if self.thread:
             self.thread.join(timeout=1.0)
     
+    def add_path(self, path: str, path_filter: Optional[WatchFilter] = None):
+        """添加根目录并建立其快照（已有文件不触发回调）"""
+        path = str(path)
+        with self._lock:
+            self.roots[path] = path_filter or self.path_filter
+            self._snapshot_root(path)
+    
+    def remove_path(self, path: str):
+        """移除根目录及其快照（不触发删除回调）"""
+        path = str(path)
+        with self._lock:
+            if self.roots.pop(path, None) is None:
+                return
+            self._single_files.pop(path, None)
+            self._remove_tree(path, [])
+            prefix = path + os.sep
+            for file_path in [f for f in self._hot_files if f.startswith(prefix)]:
+                del self._hot_files[file_path]
+    
+    def get_files(self) -> List[str]:
+        """当前快照中的全部文件"""
+        files = [os.path.join(dir_path, entry[0]) for dir_path, state in self._dirs.items()
+                 for entry in state.files]
+        files.extend(path for path, stamp in self._single_files.items() if stamp is not None)
+        return sorted(files)
+
     def _poll_loop(self):
-        """轮询循环"""
-        while self.running:
+        """轮询循环：按自适应间隔检查，完整检查到期时提前唤醒"""
+        while not self._stop_event.wait(self._next_wait()):
             try:
-                self._check_files()
-                time.sleep(self.interval)
+                changes = self.poll_once()
             except Exception as e:
                 self.logger.error(f"轮询检查文件时出错: {e}")
-    
-    def _check_files(self):
-        """检查文件修改时间"""
-        for path in self.paths:
-            if path.is_dir():
-                for py_file in path.rglob("*.py"):
-                    self._check_file(py_file)
-            elif path.is_file() and path.suffix == '.py':
-                self._check_file(path)
-    
-    def _check_file(self, file_path: Path):
-        """检查单个文件的修改时间"""
-        try:
-            mtime = file_path.stat().st_mtime
-            if str(file_path) not in self.file_mtimes:
-                self.file_mtimes[str(file_path)] = mtime
-            elif mtime > self.file_mtimes[str(file_path)]:
-                self.file_mtimes[str(file_path)] = mtime
+                changes = 0
+
+            if changes:
+                self.current_interval = self.interval
+                self.current_sweep_interval = self.full_sweep_seconds
+            else:
+                self.current_interval = min(self.max_interval, self.current_interval * self.BACKOFF_FACTOR)
+                self.current_sweep_interval = min(self.max_full_sweep_seconds,
+                                                  self.current_sweep_interval * self.BACKOFF_FACTOR)
+
+    def _sweep_interval(self) -> float:
+        """当前的完整检查间隔：随空闲退避，且不低于使耗时占比不超过 MAX_SWEEP_DUTY 的间隔"""
+        return max(self.current_sweep_interval, self._sweep_cost / self.MAX_SWEEP_DUTY)
+
+    def _next_wait(self) -> float:
+        sweep_due = self._last_full_sweep + self._sweep_interval() - time.monotonic()
+        return max(0.0, min(self.current_interval, sweep_due))
+
+    def snapshot(self):
+        """建立初始快照（不触发回调）"""
+        with self._lock:
+            self._dirs.clear()
+            self._single_files.clear()
+            for path in list(self.roots):
+                self._snapshot_root(path)
+
+    def _snapshot_root(self, path: str):
+        if os.path.isdir(path):
+            self._scan_tree(path, [], sweep_files=False)
+        else:
+            self._single_files[path] = self._stat_stamp(path)
+
+    def poll_once(self, full_sweep: Optional[bool] = None) -> int:
+        """检查一轮，触发回调并返回变化数（full_sweep 为 True 时检查所有文件）"""
+        tick_at = time.monotonic()
+        if full_sweep is None:
+            full_sweep = tick_at - self._last_full_sweep >= self._sweep_interval()
+        if full_sweep:
+            self._last_full_sweep = tick_at
+        changes: List[Tuple[str, str]] = []  # (事件类型, 文件路径)
+
+        with self._lock:
+            for path in list(self.roots):
+                if path in self._single_files:
+                    self._check_single_file(path, changes)
+                else:
+                    self._scan_tree(path, changes, sweep_files=full_sweep)
+
+            if not full_sweep:
+                self._check_hot_files(changes)
+            else:
+                self._sweep_cost = time.monotonic() - tick_at
+
+        now = time.time()
+        for event_type, file_path in changes:
+            if event_type == "deleted":
+                self._hot_files.pop(file_path, None)
+                self.logger.info(f"检测到文件删除: {file_path}")
+                if self.on_deleted:
+                    self.on_deleted(file_path)
+            else:
+                self._hot_files[file_path] = now
                 self.logger.info(f"检测到文件变化: {file_path}")
-                self.callback(str(file_path))
+                self.callback(file_path)
+        return len(changes)
+
+    def _scan_tree(self, root: str, changes: List[Tuple[str, str]], sweep_files: bool):
+        """从根目录开始检查目录树：修改时间变化的目录重新列举，其余按需检查文件"""
+        path_filter = self.roots[root]
+        stack = [root]
+        while stack:
+            dir_path = stack.pop()
+            state = self._dirs.get(dir_path)
+            try:
+                mtime_ns = os.stat(dir_path).st_mtime_ns
+            except OSError:
+                if state is not None:
+                    self._remove_tree(dir_path, changes)
+                continue
+
+            if state is None or state.mtime_ns != mtime_ns:
+                state = self._rescan_dir(dir_path, mtime_ns, state, changes, root, path_filter)
+            elif sweep_files:
+                self._sweep_dir(dir_path, state, changes)
+            stack.extend(os.path.join(dir_path, name) for name in state.subdirs)
+
+    def _rescan_dir(self, dir_path: str, mtime_ns: int, old_state: Optional[_DirState],
+                    changes: List[Tuple[str, str]], root: str, path_filter: WatchFilter) -> _DirState:
+        """重新列举目录，与旧快照归并比较"""
+        files = []
+        subdirs = []
+        rel_dir = os.path.relpath(dir_path, root)
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            rel_path = os.path.normpath(os.path.join(rel_dir, entry.name))
+                            if path_filter.include_dir(entry.name, rel_path):
+                                subdirs.append(entry.name)
+                        elif path_filter.include_file(entry.name):
+                            stat = entry.stat()
+                            files.append((entry.name, stat.st_mtime_ns, stat.st_size))
+                    except OSError:
+                        continue
         except OSError:
-            # 文件可能被删除
             pass
+        files.sort()
+        subdirs.sort()
+
+        if old_state is not None:
+            self._diff_files(dir_path, old_state.files, files, changes)
+            for name in set(old_state.subdirs) - set(subdirs):
+                self._remove_tree(os.path.join(dir_path, name), changes)
+        else:
+            # 新目录中的文件都是新增（建立初始快照时不触发回调）
+            changes.extend(("created", os.path.join(dir_path, entry[0])) for entry in files)
+
+        state = _DirState(mtime_ns, files, subdirs)
+        self._dirs[dir_path] = state
+        return state
+
+    @staticmethod
+    def _diff_files(dir_path: str, old: List[Tuple[str, int, int]], new: List[Tuple[str, int, int]],
+                    changes: List[Tuple[str, str]]):
+        """归并比较两个按文件名排序的快照"""
+        i = j = 0
+        while i < len(old) or j < len(new):
+            if j >= len(new) or (i < len(old) and old[i][0] < new[j][0]):
+                changes.append(("deleted", os.path.join(dir_path, old[i][0])))
+                i += 1
+            elif i >= len(old) or new[j][0] < old[i][0]:
+                changes.append(("created", os.path.join(dir_path, new[j][0])))
+                j += 1
+            else:
+                if old[i][1:] != new[j][1:]:
+                    changes.append(("modified", os.path.join(dir_path, new[j][0])))
+                i += 1
+                j += 1
+
+    def _sweep_dir(self, dir_path: str, state: _DirState, changes: List[Tuple[str, str]]):
+        """检查未变化目录中每个文件的修改时间（原地写入）"""
+        for index, (name, mtime_ns, size) in enumerate(state.files):
+            stamp = self._stat_stamp(os.path.join(dir_path, name))
+            if stamp is not None and stamp != (mtime_ns, size):
+                state.files[index] = (name,) + stamp
+                changes.append(("modified", os.path.join(dir_path, name)))
+
+    def _check_hot_files(self, changes: List[Tuple[str, str]]):
+        """检查最近变化过的文件（编辑中的文件通常会被反复原地写入）"""
+        cutoff = time.time() - self.HOT_FILE_SECONDS
+        seen = {file_path for _, file_path in changes}
+        for file_path, changed_at in list(self._hot_files.items()):
+            if changed_at < cutoff:
+                del self._hot_files[file_path]
+                continue
+            if file_path in seen:
+                continue
+
+            dir_path, name = os.path.split(file_path)
+            state = self._dirs.get(dir_path)
+            if state is None:
+                continue
+            index = bisect_left(state.files, (name,))
+            if index >= len(state.files) or state.files[index][0] != name:
+                continue
+            stamp = self._stat_stamp(file_path)
+            if stamp is not None and stamp != state.files[index][1:]:
+                state.files[index] = (name,) + stamp
+                changes.append(("modified", file_path))
+
+    def _check_single_file(self, file_path: str, changes: List[Tuple[str, str]]):
+        stamp = self._stat_stamp(file_path)
+        old_stamp = self._single_files[file_path]
+        if stamp == old_stamp:
+            return
+        self._single_files[file_path] = stamp
+        if stamp is None:
+            changes.append(("deleted", file_path))
+        else:
+            changes.append(("created" if old_stamp is None else "modified", file_path))
+
+    def _remove_tree(self, dir_path: str, changes: List[Tuple[str, str]]):
+        """目录被删除：其中所有文件记为删除"""
+        state = self._dirs.pop(dir_path, None)
+        if state is None:
+            return
+        changes.extend(("deleted", os.path.join(dir_path, entry[0])) for entry in state.files)
+        for name in state.subdirs:
+            self._remove_tree(os.path.join(dir_path, name), changes)
+
+    @staticmethod
+    def _stat_stamp(file_path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(file_path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
 
 class FileWatcher:
-    """文件监控器主类"""
+    """文件监控器主类
+
+    - 每个监控根目录有自己的过滤规则，运行中也可以增删根目录
+    - callback / deleted_callback 接收文件路径；add_listener 注册的监听器
+      接收 (事件类型, 文件路径)，事件类型为 "changed" 或 "deleted"
+    """
     
-    def __init__(self, callback: Callable[[str], None], debounce_seconds: float = 0.5):
+    def __init__(self, callback: Optional[Callable[[str], None]] = None, debounce_seconds: float = 0.5,
+                 deleted_callback: Optional[Callable[[str], None]] = None,
+                 path_filter: Optional[WatchFilter] = None):
         self.callback = callback
+        self.deleted_callback = deleted_callback
         self.debounce_seconds = debounce_seconds
+        self.path_filter = path_filter or WatchFilter()
+        self.listeners: List[Callable[[str, str], None]] = []
         self.observer: Optional[Observer] = None
         self.polling_watcher: Optional[PollingWatcher] = None
-        self.watched_paths: Set[str] = set()
+        self.watched_paths: Dict[str, WatchFilter] = {}  # 根目录 -> 过滤规则
+        self._watches: Dict[str, Any] = {}  # 根目录 -> watchdog 监控句柄
         self.logger = get_logger("FileWatcher", "main")
         self.use_watchdog = WATCHDOG_AVAILABLE
         
         if not self.use_watchdog:
             self.logger.warning("watchdog库不可用，使用轮询模式监控文件")
     
-    def add_path(self, path: str):
-        """添加监控路径"""
+    def add_path(self, path: str, path_filter: Optional[WatchFilter] = None):
+        """添加监控路径（运行中添加立即生效）"""
         path = os.path.abspath(path)
-        if path not in self.watched_paths:
-            self.watched_paths.add(path)
-            self.logger.info(f"添加监控路径: {path}")
+        if path in self.watched_paths:
+            return
+        self.watched_paths[path] = path_filter or self.path_filter
+        self.logger.info(f"添加监控路径: {path}")
+        
+        if self.observer is not None:
+            self._schedule_watchdog(path)
+        elif self.polling_watcher is not None:
+            self.polling_watcher.add_path(path, self.watched_paths[path])
+    
+    def remove_path(self, path: str):
+        """移除监控路径"""
+        path = os.path.abspath(path)
+        if self.watched_paths.pop(path, None) is None:
+            return
+        watch = self._watches.pop(path, None)
+        if watch is not None and self.observer is not None:
+            self.observer.unschedule(watch)
+        if self.polling_watcher is not None:
+            self.polling_watcher.remove_path(path)
+        self.logger.info(f"移除监控路径: {path}")
+    
+    def add_listener(self, listener: Callable[[str, str], None]):
+        """注册变化监听器：listener(事件类型, 文件路径)"""
+        self.listeners.append(listener)
+    
+    def remove_listener(self, listener: Callable[[str, str], None]):
+        """注销变化监听器"""
+        if listener in self.listeners:
+            self.listeners.remove(listener)
     
     def start(self):
         """启动文件监控"""
@@ -152,6 +579,7 @@ class FileWatcher:
             self.observer.stop()
             self.observer.join()
             self.observer = None
+            self._watches.clear()
         
         if self.polling_watcher:
             self.polling_watcher.stop()
@@ -159,16 +587,43 @@ class FileWatcher:
         
         self.logger.info("文件监控已停止")
     
+    def flush(self):
+        """立即检查一轮（轮询模式下完整检查所有文件），使此前的变化都已通知到回调"""
+        if self.polling_watcher is not None:
+            self.polling_watcher.poll_once(full_sweep=True)
+    
+    def _on_changed(self, file_path: str):
+        if self.callback:
+            self.callback(file_path)
+        self._notify_listeners("changed", file_path)
+    
+    def _on_deleted(self, file_path: str):
+        if self.deleted_callback:
+            self.deleted_callback(file_path)
+        self._notify_listeners("deleted", file_path)
+    
+    def _notify_listeners(self, event_type: str, file_path: str):
+        for listener in list(self.listeners):
+            try:
+                listener(event_type, file_path)
+            except Exception as e:
+                self.logger.error(f"执行文件变化监听器失败: {e}")
+    
+    def _schedule_watchdog(self, path: str):
+        if not os.path.exists(path):
+            return
+        handler = FileChangeHandler(self._on_changed, self.debounce_seconds, self._on_deleted,
+                                    root=path if os.path.isdir(path) else os.path.dirname(path),
+                                    path_filter=self.watched_paths[path])
+        self._watches[path] = self.observer.schedule(handler, path, recursive=True)
+        self.logger.info(f"Watchdog监控启动: {path}")
+    
     def _start_watchdog(self):
         """启动watchdog模式"""
         try:
             self.observer = Observer()
-            handler = FileChangeHandler(self.callback, self.debounce_seconds)
-            
             for path in self.watched_paths:
-                if os.path.exists(path):
-                    self.observer.schedule(handler, path, recursive=True)
-                    self.logger.info(f"Watchdog监控启动: {path}")
+                self._schedule_watchdog(path)
             
             self.observer.start()
             self.logger.info("Watchdog文件监控已启动")
@@ -176,25 +631,33 @@ class FileWatcher:
         except Exception as e:
             self.logger.error(f"启动watchdog监控失败: {e}")
             self.logger.info("切换到轮询模式")
+            self.observer = None
+            self._watches.clear()
             self.use_watchdog = False
             self._start_polling()
     
     def _start_polling(self):
         """启动轮询模式"""
         self.polling_watcher = PollingWatcher(
-            list(self.watched_paths), 
-            self.callback, 
-            interval=1.0
+            [],
+            self._on_changed,
+            interval=1.0,
+            on_deleted=self._on_deleted,
+            path_filter=self.path_filter
         )
+        for path, path_filter in self.watched_paths.items():
+            self.polling_watcher.roots[path] = path_filter
         self.polling_watcher.start()
 
     def get_monitored_files(self) -> List[str]:
-        """获取当前监控的所有Python文件"""
+        """获取当前监控的所有文件"""
+        if self.polling_watcher is not None:
+            return self.polling_watcher.get_files()
+
         files = []
-        for path in self.watched_paths:
-            path_obj = Path(path)
-            if path_obj.is_dir():
-                files.extend([str(f) for f in path_obj.rglob("*.py")])
-            elif path_obj.is_file() and path_obj.suffix == '.py':
-                files.append(str(path_obj))
-        return files
\ No newline at end of file
+        for path, path_filter in self.watched_paths.items():
+            if os.path.isdir(path):
+                files.extend(path_filter.walk(path))
+            elif os.path.isfile(path):
+                files.append(path)
+        return sorted(files)
@@ -2,15 +2,14 @@
 热重载管理器 - 协调文件监控和模块重载的核心组件
 """
 
-import asyncio
 import time
 from pathlib import Path
 from typing import Dict, List, Set, Optional, Callable, Any
-from threading import Lock
+from threading import Condition, Lock, Thread, current_thread
 from collections import defaultdict
 import weakref
 
-from .file_watcher import FileWatcher
+from .file_watcher import FileWatcher, WatchFilter
 from .module_reloader import ModuleReloader
 from src.logging import get_logger
 
@@ -23,14 +22,22 @@ class ReloadEvent:
         self.timestamp = timestamp
         self.success: Optional[bool] = None
         self.error: Optional[str] = None
+        self.timings: Optional[Dict[str, float]] = None  # 编译/执行耗时（毫秒）
 
 class HotReloadManager:
-    """热重载管理器"""
+    """热重载管理器
+
+    文件变化事件只登记到按模块名去重的待重载表，由唯一的调度线程处理：
+    批次中第一个事件启动一个 batch_reload_window 的计时，窗口内的后续事件
+    并入同一批次；批次在调度线程中串行执行，执行期间到达的事件进入下一批次。
+    """
     
     def __init__(self, 
                  enabled: bool = True,
                  debounce_seconds: float = 0.5,
-                 batch_reload_window: float = 2.0):
+                 batch_reload_window: float = 2.0,
+                 watch_paths: Optional[List[str]] = None,
+                 path_filter: Optional[WatchFilter] = None):
         """
         初始化热重载管理器
         
@@ -38,6 +45,8 @@ class HotReloadManager:
             enabled: 是否启用热重载
             debounce_seconds: 文件变化防抖动时间
             batch_reload_window: 批量重载时间窗口
+            watch_paths: 监控的源码目录（默认为可重载模块前缀对应的目录）
+            path_filter: 过滤规则（默认为 WatchFilter.python_sources()：全部 .py 源文件）
         """
         self.enabled = enabled
         self.debounce_seconds = debounce_seconds
@@ -46,7 +55,9 @@ class HotReloadManager:
         # 核心组件
         self.file_watcher = FileWatcher(
             callback=self._on_file_changed,
-            debounce_seconds=debounce_seconds
+            debounce_seconds=debounce_seconds,
+            deleted_callback=self._on_file_deleted,
+            path_filter=path_filter or WatchFilter.python_sources()
         )
         self.module_reloader = ModuleReloader()
         
@@ -55,33 +66,35 @@ class HotReloadManager:
         self.pending_reloads: Dict[str, ReloadEvent] = {}
         self.reload_history: List[ReloadEvent] = []
         self.lock = Lock()
+        self._batch_ready = Condition(self.lock)
+        self._batch_deadline: Optional[float] = None  # 当前批次窗口的截止时间（monotonic）
+        self._reload_lock = Lock()  # 串行化批量重载和强制重载
+        self.scheduler_stats = {'events': 0, 'coalesced': 0, 'batches': 0}
         
         # 回调函数
         self.reload_callbacks: List[Callable[[ReloadEvent], None]] = []
+        # 工具更新回调：(需要重建的工具名, 本批次重载的模块)
+        self.tool_update_callbacks: List[Callable[[List[str], List[str]], None]] = []
         self.tool_instances: Dict[str, Any] = {}  # 工具实例缓存
         
-        # 批量重载任务
-        self._batch_reload_task: Optional[asyncio.Task] = None
+        # 批量重载调度线程
+        self._scheduler_thread: Optional[Thread] = None
         
         self.logger = get_logger("HotReloadManager", "hot_reload_coordination")
         
-        # 自动添加项目监控路径
-        self._setup_default_watch_paths()
+        # 添加监控路径
+        if watch_paths is None:
+            self._setup_default_watch_paths()
+        else:
+            for path in watch_paths:
+                self.file_watcher.add_path(str(path))
     
     def _setup_default_watch_paths(self):
-        """设置默认的监控路径"""
-        project_root = Path(__file__).parent.parent.parent
-        watch_paths = [
-            project_root / "src" / "mcp_tools",
-            project_root / "src" / "services", 
-            project_root / "src" / "task_engine",
-            project_root / "src" / "templates",
-            project_root / "src" / "logging",
-            project_root / "src" / "hot_reload"
-        ]
-        
-        for path in watch_paths:
-            if path.exists():
+        """监控可重载模块前缀对应的源码目录"""
+        project_root = self.module_reloader.project_root
+        for prefix in self.module_reloader.reloadable_prefixes:
+            path = project_root.joinpath(*prefix.split('.'))
+            if path.is_dir():
                 self.file_watcher.add_path(str(path))
                 self.logger.debug(f"添加默认监控路径: {path}")
     
@@ -94,6 +107,14 @@ class HotReloadManager:
         """添加重载回调函数"""
         self.reload_callbacks.append(callback)
     
+    def add_change_listener(self, listener: Callable[[str, str], None]):
+        """注册文件变化监听器：listener(事件类型, 文件路径)，事件类型为 changed 或 deleted"""
+        self.file_watcher.add_listener(listener)
+    
+    def add_tool_update_callback(self, callback: Callable[[List[str], List[str]], None]):
+        """添加工具更新回调：每批重载后以受影响的工具名和已重载模块调用一次"""
+        self.tool_update_callbacks.append(callback)
+    
     def start(self):
         """启动热重载管理器"""
         if not self.enabled:
@@ -105,8 +126,11 @@ class HotReloadManager:
             return
         
         try:
-            self.file_watcher.start()
             self.is_running = True
+            self._scheduler_thread = Thread(target=self._scheduler_loop,
+                                            name="codelens-hot-reload", daemon=True)
+            self._scheduler_thread.start()
+            self.file_watcher.start()
             self.logger.info("🔥 热重载管理器启动成功")
             
             # 显示监控信息
@@ -114,6 +138,7 @@ class HotReloadManager:
             self.logger.info(f"监控 {len(monitored_files)} 个Python文件")
             
         except Exception as e:
+            self._stop_scheduler()
             self.logger.error(f"启动热重载管理器失败: {e}")
             raise
     
@@ -124,12 +149,7 @@ class HotReloadManager:
         
         try:
             self.file_watcher.stop()
-            
-            # 取消批量重载任务
-            if self._batch_reload_task and not self._batch_reload_task.done():
-                self._batch_reload_task.cancel()
-            
-            self.is_running = False
+            self._stop_scheduler()
             self.logger.info("热重载管理器已停止")
             
         except Exception as e:
@@ -149,144 +169,158 @@ class HotReloadManager:
                 self.logger.debug(f"模块不可重载，跳过: {module_name}")
                 return
             
-            # 创建重载事件
+            # 创建重载事件（同一模块在批次内只保留最新的事件）
             reload_event = ReloadEvent(file_path, module_name, time.time())
             
-            with self.lock:
+            with self._batch_ready:
+                self.scheduler_stats['events'] += 1
+                if module_name in self.pending_reloads:
+                    self.scheduler_stats['coalesced'] += 1
                 self.pending_reloads[module_name] = reload_event
+                if self._batch_deadline is None:
+                    self._batch_deadline = time.monotonic() + self.batch_reload_window
+                    self._batch_ready.notify()
             
             self.logger.info(f"文件变化触发重载: {file_path} -> {module_name}")
             
-            # 启动批量重载
-            self._schedule_batch_reload()
-            
         except Exception as e:
             self.logger.error(f"处理文件变化事件失败: {file_path}, 错误: {e}")
     
-    def _schedule_batch_reload(self):
-        """调度批量重载"""
-        try:
-            # 如果已有批量重载任务在运行，取消它
-            if self._batch_reload_task and not self._batch_reload_task.done():
-                self._batch_reload_task.cancel()
+    def _on_file_deleted(self, file_path: str):
+        """文件删除回调：丢弃待处理的重载和该模块的导入图记录（已加载的模块对象保持不变）"""
+        module_name = self.module_reloader.file_path_to_module_name(file_path)
+        if not module_name:
+            return
+        
+        with self.lock:
+            self.pending_reloads.pop(module_name, None)
+        self.module_reloader.dependency_tracker.clear_dependencies(module_name)
+        self.logger.info(f"文件已删除: {file_path} -> {module_name}")
+    
+    def _scheduler_loop(self):
+        """调度线程：等待批次窗口结束后执行批量重载，直到管理器停止"""
+        while True:
+            with self._batch_ready:
+                while self.is_running:
+                    if self._batch_deadline is None:
+                        self._batch_ready.wait()
+                        continue
+                    remaining = self._batch_deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._batch_ready.wait(remaining)
+                if not self.is_running:
+                    return
+                self._batch_deadline = None
             
-            # 创建新的批量重载任务
-            loop = None
             try:
-                loop = asyncio.get_running_loop()
-            except RuntimeError:
-                # 没有运行的事件循环，在新线程中处理
-                import threading
-                thread = threading.Thread(target=self._perform_batch_reload, daemon=True)
-                thread.start()
-                return
-            
-            # 在现有事件循环中调度
-            self._batch_reload_task = loop.create_task(self._async_batch_reload())
-            
-        except Exception as e:
-            self.logger.error(f"调度批量重载失败: {e}")
+                self._perform_batch_reload()
+            except Exception as e:
+                self.logger.error(f"批量重载失败: {e}")
     
-    async def _async_batch_reload(self):
-        """异步批量重载"""
-        try:
-            await asyncio.sleep(self.batch_reload_window)
-            self._perform_batch_reload()
-        except asyncio.CancelledError:
-            self.logger.debug("批量重载任务被取消")
-        except Exception as e:
-            self.logger.error(f"异步批量重载失败: {e}")
+    def _stop_scheduler(self):
+        """通知调度线程退出并等待（未执行的待重载事件保留在 pending_reloads 中）"""
+        with self._batch_ready:
+            self.is_running = False
+            self._batch_ready.notify_all()
+        
+        thread = self._scheduler_thread
+        if thread and thread.is_alive() and thread is not current_thread():
+            thread.join(timeout=5)
+        self._scheduler_thread = None
     
     def _perform_batch_reload(self):
         """执行批量重载"""
-        with self.lock:
-            if not self.pending_reloads:
-                return
+        with self._reload_lock:
+            with self.lock:
+                if not self.pending_reloads:
+                    return
+                
+                events_to_process = dict(self.pending_reloads)
+                self.pending_reloads.clear()
+                self.scheduler_stats['batches'] += 1
             
-            events_to_process = dict(self.pending_reloads)
-            self.pending_reloads.clear()
-        
-        self.logger.info(f"开始批量重载 {len(events_to_process)} 个模块")
-        
-        # 按依赖顺序重载
-        reload_order = self._calculate_reload_order(list(events_to_process.keys()))
-        
-        for module_name in reload_order:
-            if module_name in events_to_process:
-                event = events_to_process[module_name]
-                self._reload_module(event)
-        
-        # 通知工具实例更新
-        self._update_tool_instances(list(events_to_process.keys()))
-        
-        self.logger.info("批量重载完成")
-    
-    def _calculate_reload_order(self, module_names: List[str]) -> List[str]:
-        """计算重载顺序"""
-        # 简化版：按模块层级排序（深层模块先重载）
-        def module_depth(name: str) -> int:
-            return name.count('.')
-        
-        return sorted(module_names, key=module_depth, reverse=True)
+            self.logger.info(f"开始批量重载 {len(events_to_process)} 个模块")
+            
+            # 按导入图合并重载：变化模块及其传递导入者按拓扑序各重载一次
+            self._reload_modules(list(events_to_process.values()))
+            
+            # 通知受影响的工具实例更新（包括导入了变化模块的工具）
+            self._update_tool_instances(self.module_reloader.last_reloaded)
+            
+            self.logger.info("批量重载完成")
     
-    def _reload_module(self, event: ReloadEvent):
-        """重载单个模块"""
+    def _reload_modules(self, events: List[ReloadEvent]):
+        """重载一批模块并记录每个事件的结果"""
         start_time = time.time()
         
         try:
-            self.logger.info(f"重载模块: {event.module_name}")
-            
             # 清除模块缓存
-            self.module_reloader.clear_module_cache(event.module_name)
+            for event in events:
+                self.module_reloader.clear_module_cache(event.module_name)
             
             # 执行重载
-            success = self.module_reloader.reload_module(event.module_name)
-            
-            event.success = success
-            event.error = None if success else "重载失败"
+            results = self.module_reloader.reload_modules([event.module_name for event in events])
+            report = self.module_reloader.last_batch_report or {}
+            for event in events:
+                event.success = results.get(event.module_name, False)
+                event.error = None if event.success else (report.get("error") or "重载失败")
+                event.timings = report.get("modules", {}).get(event.module_name)
             
-            duration = time.time() - start_time
-            
-            if success:
+        except Exception as e:
+            for event in events:
+                event.success = False
+                event.error = str(e)
+            self.logger.error(f"❌ 模块重载异常: {', '.join(event.module_name for event in events)}, 错误: {e}")
+        
+        duration = time.time() - start_time
+        for event in events:
+            if event.success:
                 self.logger.info(f"✅ 模块重载成功: {event.module_name} ({duration:.2f}s)")
             else:
                 self.logger.error(f"❌ 模块重载失败: {event.module_name}")
-            
-        except Exception as e:
-            event.success = False
-            event.error = str(e)
-            self.logger.error(f"❌ 模块重载异常: {event.module_name}, 错误: {e}")
         
         # 记录到历史
         with self.lock:
-            self.reload_history.append(event)
+            self.reload_history.extend(events)
             # 保持历史记录不超过100条
             if len(self.reload_history) > 100:
                 self.reload_history = self.reload_history[-100:]
         
         # 调用回调函数
-        for callback in self.reload_callbacks:
-            try:
-                callback(event)
-            except Exception as e:
-                self.logger.error(f"执行重载回调失败: {e}")
+        for event in events:
+            for callback in self.reload_callbacks:
+                try:
+                    callback(event)
+                except Exception as e:
+                    self.logger.error(f"执行重载回调失败: {e}")
     
     def _update_tool_instances(self, reloaded_modules: List[str]):
-        """更新工具实例"""
+        """找出类定义所在模块已被重载的工具实例，通知回调只重建这些工具"""
         try:
-            # 这里可以实现更复杂的工具实例更新逻辑
-            # 目前只是记录日志
-            if reloaded_modules:
-                self.logger.info(f"需要更新的工具实例关联模块: {', '.join(reloaded_modules)}")
-            
-            # 清理失效的弱引用
+            reloaded = set(reloaded_modules)
+            affected_tools = []
             dead_refs = []
             for name, ref in self.tool_instances.items():
-                if ref() is None:
+                instance = ref()
+                if instance is None:
+                    # 清理失效的弱引用
                     dead_refs.append(name)
+                elif type(instance).__module__ in reloaded:
+                    affected_tools.append(name)
             
             for name in dead_refs:
                 del self.tool_instances[name]
+            
+            if not affected_tools:
+                return
+            
+            self.logger.info(f"需要更新的工具实例: {', '.join(affected_tools)}")
+            for callback in self.tool_update_callbacks:
+                try:
+                    callback(affected_tools, list(reloaded_modules))
+                except Exception as e:
+                    self.logger.error(f"执行工具更新回调失败: {e}")
                 
         except Exception as e:
             self.logger.error(f"更新工具实例失败: {e}")
@@ -294,7 +328,10 @@ class HotReloadManager:
     def force_reload_all(self) -> Dict[str, bool]:
         """强制重载所有项目模块"""
         self.logger.info("强制重载所有项目模块")
-        return self.module_reloader.reload_all_project_modules()
+        with self._reload_lock:
+            results = self.module_reloader.reload_all_project_modules()
+            self._update_tool_instances(self.module_reloader.last_reloaded)
+        return results
     
     def get_status(self) -> Dict[str, Any]:
         """获取热重载状态"""
@@ -305,10 +342,13 @@ class HotReloadManager:
                     'module': event.module_name,
                     'timestamp': event.timestamp,
                     'success': event.success,
-                    'error': event.error
+                    'error': event.error,
+                    'timings': event.timings
                 }
                 for event in self.reload_history[-10:]
             ]
+            last_batch = self.module_reloader.last_batch_report
+            scheduler = dict(self.scheduler_stats)
         
         monitored_files = []
         if self.is_running:
@@ -320,12 +360,14 @@ class HotReloadManager:
             'pending_reloads': pending_count,
             'monitored_files_count': len(monitored_files),
             'recent_reloads': recent_reloads,
+            'last_batch': last_batch,
+            'scheduler': scheduler,
             'tool_instances_count': len([ref for ref in self.tool_instances.values() if ref() is not None])
         }
     
-    def add_watch_path(self, path: str):
-        """添加监控路径"""
-        self.file_watcher.add_path(path)
+    def add_watch_path(self, path: str, path_filter: Optional[WatchFilter] = None):
+        """添加监控路径（可以是任意目录，运行中添加立即生效）"""
+        self.file_watcher.add_path(path, path_filter)
         self.logger.info(f"添加监控路径: {path}")
     
     def enable(self):
@@ -2,106 +2,209 @@
 模块重载器 - 安全地重新加载Python模块
 """
 
+import ast
 import sys
+import time
 import importlib
 import importlib.util
 from pathlib import Path
-from typing import Set, Dict, List, Optional, Any
+from typing import Set, Dict, Iterable, List, Optional, Any, Tuple
 import traceback
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 from src.logging import get_logger
 
 class DependencyTracker:
-    """模块依赖关系追踪器"""
-    
-    def __init__(self):
+    """模块导入图：解析项目模块的 import / from 语句得到真实的依赖关系
+
+    - dependencies[模块] = 它在导入时依赖的项目模块
+    - reverse_dependencies[模块] = 直接导入它的项目模块
+    - 每个模块的解析结果按源文件 (mtime_ns, size) 缓存，refresh 时只重新解析
+      变化过的文件和新加载的模块
+    - 只统计导入时执行的语句（模块顶层、if/try/class 体内），函数体内的延迟
+      导入在调用时才绑定，不需要随依赖一起重载
+    """
+
+    def __init__(self, project_root: Optional[Path] = None):
+        self.project_root = Path(project_root or Path(__file__).parent.parent.parent).resolve()
         self.dependencies: Dict[str, Set[str]] = defaultdict(set)
         self.reverse_dependencies: Dict[str, Set[str]] = defaultdict(set)
+        self._stamps: Dict[str, Tuple[int, int]] = {}  # 模块 -> 解析时源文件的 (mtime_ns, size)
+        self._source_paths: Dict[str, Optional[Path]] = {}  # __file__ -> 项目内源文件路径（非项目为 None）
         self.logger = get_logger("DependencyTracker", "dependency_analysis")
-    
+
+    def refresh(self):
+        """同步已加载的项目模块：解析新模块和源文件变化的模块，移除已卸载的模块"""
+        loaded = {}
+        for name, module in list(sys.modules.items()):
+            file_path = self._module_source(module)
+            if file_path is not None:
+                loaded[name] = file_path
+
+        for name in [name for name in self._stamps if name not in loaded]:
+            self.clear_dependencies(name)
+
+        for name, file_path in loaded.items():
+            self._update_module(name, file_path)
+
     def track_module(self, module_name: str):
-        """追踪模块的依赖关系"""
-        if module_name not in sys.modules:
+        """（重新）解析单个模块的依赖关系（源文件未变化时直接使用缓存）"""
+        file_path = self._module_source(sys.modules.get(module_name))
+        if file_path is None:
+            self.clear_dependencies(module_name)
             return
-        
-        module = sys.modules[module_name]
-        if not hasattr(module, '__file__') or not module.__file__:
-            return
-        
-        # 清除旧的依赖关系
-        self.clear_dependencies(module_name)
-        
-        # 分析新的依赖关系
-        for name, obj in sys.modules.items():
-            if name == module_name:
-                continue
-            
-            if hasattr(obj, '__file__') and obj.__file__:
-                if self._is_dependent(module, obj):
-                    self.dependencies[module_name].add(name)
-                    self.reverse_dependencies[name].add(module_name)
-    
+        self._update_module(module_name, file_path)
+
     def clear_dependencies(self, module_name: str):
-        """清除模块的依赖关系记录"""
-        # 清除正向依赖
-        for dep in self.dependencies.get(module_name, set()):
+        """清除模块的依赖关系记录（保留其他模块对它的导入边），下次 refresh 时重新解析"""
+        self._stamps.pop(module_name, None)
+        for dep in self.dependencies.pop(module_name, set()):
             self.reverse_dependencies[dep].discard(module_name)
-        self.dependencies[module_name] = set()
-        
-        # 清除反向依赖
-        for rdep in self.reverse_dependencies.get(module_name, set()):
-            self.dependencies[rdep].discard(module_name)
-        self.reverse_dependencies[module_name] = set()
-    
-    def _is_dependent(self, module1: Any, module2: Any) -> bool:
-        """检查module1是否依赖module2"""
-        try:
-            if not hasattr(module1, '__file__') or not hasattr(module2, '__file__'):
-                return False
-            
-            file1 = Path(module1.__file__ or '')
-            file2 = Path(module2.__file__ or '')
-            
-            # 检查是否在同一个包内
-            if file1.parent == file2.parent:
-                return True
-            
-            # 检查是否是子包关系
-            if str(file2.parent) in str(file1.parent):
-                return True
-            
-            return False
-        except Exception:
-            return False
-    
+
+    def get_importers(self, module_names: Iterable[str]) -> Set[str]:
+        """给定模块及其全部（传递）导入者"""
+        affected = set(module_names)
+        stack = list(affected)
+        while stack:
+            for importer in self.reverse_dependencies.get(stack.pop(), ()):
+                if importer not in affected:
+                    affected.add(importer)
+                    stack.append(importer)
+        return affected
+
     def get_reload_order(self, module_name: str) -> List[str]:
-        """获取重载顺序（依赖的模块先重载）"""
+        """获取重载顺序：模块本身及其传递导入者，被依赖的模块先重载"""
+        return self.get_batch_reload_order([module_name])
+
+    def get_batch_reload_order(self, module_names: Iterable[str]) -> List[str]:
+        """多个变化模块的合并重载顺序（每个受影响模块只出现一次）"""
+        affected = self.get_importers(module_names)
+        return self.topological_order(affected)
+
+    def topological_order(self, module_names: Iterable[str]) -> List[str]:
+        """按依赖关系排序（Kahn算法），依赖环中的模块按名称排在最后"""
+        names = set(module_names)
+        indegree = {
+            name: sum(1 for dep in self.dependencies.get(name, ()) if dep in names and dep != name)
+            for name in names
+        }
+        ready = sorted(name for name, degree in indegree.items() if degree == 0)
         order = []
-        visited = set()
-        
-        def dfs(name: str):
-            if name in visited:
-                return
-            visited.add(name)
-            
-            # 先处理依赖
-            for dep in self.dependencies.get(name, set()):
-                if dep in sys.modules:
-                    dfs(dep)
-            
+        while ready:
+            name = ready.pop(0)
             order.append(name)
-        
-        dfs(module_name)
+            for importer in sorted(self.reverse_dependencies.get(name, ())):
+                if importer in indegree and importer != name:
+                    indegree[importer] -= 1
+                    if indegree[importer] == 0:
+                        ready.append(importer)
+
+        if len(order) < len(names):
+            cyclic = sorted(names - set(order))
+            self.logger.warning(f"检测到循环导入，按名称顺序重载: {', '.join(cyclic)}")
+            order.extend(cyclic)
         return order
 
+    def _update_module(self, module_name: str, file_path: Path):
+        try:
+            stat = file_path.stat()
+        except OSError:
+            return
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if self._stamps.get(module_name) == stamp:
+            return
+
+        imports = self._parse_imports(module_name, file_path)
+        self.clear_dependencies(module_name)
+        for dep in imports:
+            if dep != module_name:
+                self.dependencies[module_name].add(dep)
+                self.reverse_dependencies[dep].add(module_name)
+        self._stamps[module_name] = stamp
+
+    def _parse_imports(self, module_name: str, file_path: Path) -> Set[str]:
+        """解析模块导入时执行的 import 语句，返回其中的项目模块"""
+        try:
+            tree = ast.parse(file_path.read_bytes(), filename=str(file_path))
+        except (SyntaxError, ValueError, OSError) as e:
+            self.logger.warning(f"无法解析模块导入: {module_name}, 错误: {e}")
+            return set()
+
+        is_package = file_path.name == '__init__.py'
+        package = module_name if is_package else module_name.rpartition('.')[0]
+        imports = set()
+
+        stack = list(tree.body)
+        while stack:
+            node = stack.pop()
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+                continue
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    self._add_if_project_module(alias.name, imports)
+            elif isinstance(node, ast.ImportFrom):
+                base = self._resolve_relative(node.module, node.level, package)
+                if base is None:
+                    continue
+                for alias in node.names:
+                    # from pkg import name：name 可能是子模块，也可能是 pkg 中的属性
+                    if alias.name == '*' or not self._add_if_project_module(f"{base}.{alias.name}", imports):
+                        self._add_if_project_module(base, imports)
+            else:
+                stack.extend(ast.iter_child_nodes(node))
+        return imports
+
+    @staticmethod
+    def _resolve_relative(module: Optional[str], level: int, package: str) -> Optional[str]:
+        if level == 0:
+            return module
+        parts = package.split('.') if package else []
+        if level - 1 > len(parts):
+            return None
+        base_parts = parts[:len(parts) - (level - 1)]
+        if module:
+            base_parts.append(module)
+        return '.'.join(base_parts) or None
+
+    def _add_if_project_module(self, name: str, imports: Set[str]) -> bool:
+        """name 是项目内的模块时加入 imports"""
+        if name in self._stamps or self._module_source(sys.modules.get(name)) is not None:
+            imports.add(name)
+            return True
+        relative = Path(*name.split('.'))
+        for candidate in (self.project_root / relative.with_suffix('.py'),
+                          self.project_root / relative / '__init__.py'):
+            if candidate.is_file():
+                imports.add(name)
+                return True
+        return False
+
+    def _module_source(self, module: Any) -> Optional[Path]:
+        """项目内模块的源文件路径，非项目模块返回 None"""
+        file_name = getattr(module, '__file__', None)
+        if not file_name or not file_name.endswith('.py'):
+            return None
+        if file_name not in self._source_paths:
+            file_path = Path(file_name).resolve()
+            try:
+                file_path.relative_to(self.project_root)
+            except ValueError:
+                file_path = None
+            self._source_paths[file_name] = file_path
+        return self._source_paths[file_name]
+
 class ModuleReloader:
     """模块重载器"""
+
+    COMPILE_WORKERS = 4  # 预编译线程数
     
     def __init__(self):
-        self.dependency_tracker = DependencyTracker()
-        self.logger = get_logger("ModuleReloader", "module_reload")
         self.project_root = Path(__file__).parent.parent.parent
+        self.dependency_tracker = DependencyTracker(self.project_root)
+        self.logger = get_logger("ModuleReloader", "module_reload")
+        self.last_reloaded: List[str] = []  # 最近一次重载中成功重载的模块（按重载顺序）
+        self.last_batch_report: Optional[Dict[str, Any]] = None  # 最近一次批量重载的编译/执行耗时
         self.reloadable_prefixes = [
             'src.mcp_tools',
             'src.services', 
@@ -186,41 +289,130 @@ class ModuleReloader:
         return self.reload_module(module_name)
     
     def reload_module(self, module_name: str) -> bool:
-        """重载指定模块"""
-        if not self.is_reloadable(module_name):
-            self.logger.debug(f"模块不可重载: {module_name}")
-            return False
-        
-        if module_name not in sys.modules:
-            self.logger.debug(f"模块未加载: {module_name}")
-            return False
-        
+        """重载指定模块及其全部传递导入者"""
+        return self.reload_modules([module_name]).get(module_name, False)
+
+    def reload_modules(self, module_names: List[str]) -> Dict[str, bool]:
+        """原子地重载一批变化的模块
+
+        1. 在线程池中编译全部变化模块的源文件，任何一个编译失败则整批放弃，
+           不执行任何重载
+        2. 合并变化模块的传递导入者，按拓扑序每个模块只重载一次；重载前保存
+           模块命名空间，任何一个模块执行失败时把本批次已重载的模块全部回滚
+        每个模块的编译和执行耗时记录在 last_batch_report 中。
+
+        Returns:
+            每个请求模块的结果（整批成功时为 True）
+        """
+        results = {}
+        requested = []
+        self.last_reloaded = []
+        for module_name in module_names:
+            if not self.is_reloadable(module_name):
+                self.logger.debug(f"模块不可重载: {module_name}")
+                results[module_name] = False
+            elif module_name not in sys.modules:
+                self.logger.debug(f"模块未加载: {module_name}")
+                results[module_name] = False
+            else:
+                requested.append(module_name)
+        if not requested:
+            return results
+
+        report = self.last_batch_report = {
+            "requested": requested,
+            "success": False,
+            "aborted_at": None,
+            "error": None,
+            "modules": {}
+        }
         try:
-            # 追踪依赖关系
-            self.dependency_tracker.track_module(module_name)
-            
-            # 获取重载顺序
-            reload_order = self.dependency_tracker.get_reload_order(module_name)
-            
-            # 过滤不可重载的模块
-            filtered_order = [mod for mod in reload_order if self.is_reloadable(mod)]
-            
-            self.logger.info(f"重载模块链: {' -> '.join(filtered_order)}")
-            
-            # 按顺序重载模块
-            success = True
-            for mod_name in filtered_order:
-                if not self._reload_single_module(mod_name):
-                    success = False
+            # 预编译：语法错误在重载任何模块之前发现
+            compiled = self.compile_modules(requested)
+            for module_name, result in compiled.items():
+                report["modules"][module_name] = {"compile_ms": result["compile_ms"]}
+            failures = {name: result["error"] for name, result in compiled.items() if result["error"]}
+            if failures:
+                report["aborted_at"] = "compile"
+                report["error"] = "; ".join(f"{name}: {error}" for name, error in failures.items())
+                self.logger.error(f"❌ 预编译失败，放弃本批次重载: {report['error']}")
+                results.update({module_name: False for module_name in requested})
+                return results
+
+            # 同步导入图（只重新解析变化过的源文件）
+            self.dependency_tracker.refresh()
+
+            reload_order = [
+                mod for mod in self.dependency_tracker.get_batch_reload_order(requested)
+                if self.is_reloadable(mod)
+            ]
+            self.logger.info(f"重载模块链: {' -> '.join(reload_order)}")
+
+            saved_namespaces: Dict[str, Dict[str, Any]] = {}
+            failed = None
+            for mod_name in reload_order:
+                module = sys.modules.get(mod_name)
+                if module is not None:
+                    saved_namespaces[mod_name] = dict(module.__dict__)
+
+                start = time.perf_counter()
+                ok = self._reload_single_module(mod_name)
+                report["modules"].setdefault(mod_name, {})["exec_ms"] = round(
+                    (time.perf_counter() - start) * 1000, 2)
+                if not ok:
+                    failed = mod_name
                     break
-            
-            return success
-            
+
+            if failed is not None:
+                self._rollback(saved_namespaces)
+                report["aborted_at"] = "exec"
+                report["error"] = f"{failed} failed to execute, {len(saved_namespaces)} modules rolled back"
+                self.logger.error(f"❌ 模块执行失败，已回滚本批次: {report['error']}")
+                results.update({module_name: False for module_name in requested})
+                return results
+
+            self.last_reloaded = reload_order
+            report["success"] = True
+            results.update({module_name: True for module_name in requested})
+            return results
+
         except Exception as e:
-            self.logger.error(f"重载模块失败: {module_name}, 错误: {e}")
+            self.logger.error(f"重载模块失败: {', '.join(requested)}, 错误: {e}")
             self.logger.error(traceback.format_exc())
-            return False
-    
+            report["error"] = str(e)
+            results.update({module_name: False for module_name in requested})
+            return results
+
+    def compile_modules(self, module_names: List[str]) -> Dict[str, Dict[str, Any]]:
+        """在线程池中读取并编译模块源文件（只检查，不执行）"""
+        def compile_one(module_name: str) -> Dict[str, Any]:
+            start = time.perf_counter()
+            error = None
+            try:
+                file_path = sys.modules[module_name].__file__
+                with open(file_path, 'rb') as f:
+                    source = f.read()
+                compile(source, file_path, 'exec', dont_inherit=True)
+            except SyntaxError as e:
+                error = f"{e.msg} (line {e.lineno})"
+            except Exception as e:
+                error = str(e)
+            return {"error": error, "compile_ms": round((time.perf_counter() - start) * 1000, 2)}
+
+        workers = max(1, min(self.COMPILE_WORKERS, len(module_names)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="codelens-compile") as pool:
+            return dict(zip(module_names, pool.map(compile_one, module_names)))
+
+    def _rollback(self, saved_namespaces: Dict[str, Dict[str, Any]]):
+        """恢复模块重载前的命名空间（模块对象本身保持不变，已有引用继续有效）"""
+        for mod_name, namespace in saved_namespaces.items():
+            module = sys.modules.get(mod_name)
+            if module is None:
+                continue
+            module.__dict__.clear()
+            module.__dict__.update(namespace)
+            self.logger.info(f"↩️  已回滚模块: {mod_name}")
+
     def _reload_single_module(self, module_name: str) -> bool:
         """重载单个模块"""
         try:
@@ -294,14 +486,18 @@ class ModuleReloader:
             self.logger.warning(f"清除模块缓存时出错: {module_name}, 错误: {e}")
     
     def reload_all_project_modules(self) -> Dict[str, bool]:
-        """重载所有项目模块"""
+        """重载所有项目模块（按导入图的拓扑序每个模块重载一次）"""
         modules = self.get_loaded_project_modules()
-        results = {}
         
         self.logger.info(f"重载所有项目模块，共 {len(modules)} 个")
         
-        for module_name in modules:
-            results[module_name] = self.reload_module(module_name)
+        self.dependency_tracker.refresh()
+        results = {}
+        self.last_reloaded = []
+        for module_name in self.dependency_tracker.topological_order(modules):
+            results[module_name] = self._reload_single_module(module_name)
+            if results[module_name]:
+                self.last_reloaded.append(module_name)
         
         success_count = sum(1 for result in results.values() if result)
         self.logger.info(f"重载完成: {success_count}/{len(modules)} 成功")
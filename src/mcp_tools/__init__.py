@@ -2,12 +2,18 @@
 """
 CodeLens MCP工具集合
 为Claude Code提供项目文件扫描、文档生成引导、任务管理和状态跟踪功能
+
+工具类在首次访问时才导入对应模块（PEP 562），导入本包不会加载任何工具。
 """
 
-from .doc_guide import DocGuideTool
-from .task_init import TaskInitTool
-from .task_execute import TaskExecuteTool
-from .task_status import TaskStatusTool
+import importlib
+
+_LAZY_EXPORTS = {
+    'DocGuideTool': '.doc_guide',
+    'TaskInitTool': '.task_init',
+    'TaskExecuteTool': '.task_execute',
+    'TaskStatusTool': '.task_status'
+}
 
 __all__ = [
     'DocScanTool',
@@ -16,4 +22,13 @@ __all__ = [
     'TaskInitTool',
     'TaskExecuteTool',
     'TaskStatusTool'
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        module = importlib.import_module(_LAZY_EXPORTS[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
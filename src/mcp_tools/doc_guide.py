@@ -17,6 +17,9 @@ sys.path.insert(0, project_root)
 
 # 必须在sys.path修改后再导入
 from src.services.file_service import FileService  # noqa: E402
+from src.task_engine.eta_estimator import ETAEstimator  # noqa: E402
+from src.services.state_store import StateStore  # noqa: E402
+from src.services.response_governor import ResponseGovernor  # noqa: E402
 from src.logging import get_logger  # noqa: E402
 
 # 导入配置管理器
@@ -25,7 +28,7 @@ try:
     HAS_CONFIG_MANAGER = True
 except ImportError:
     HAS_CONFIG_MANAGER = False
-    get_file_filtering_config = lambda: None
+    get_file_filtering_config = lambda project_path=None: None
 
 
 class ProjectAnalyzer:
@@ -220,7 +223,7 @@ class ProjectAnalyzer:
         # 从配置系统获取屏蔽规则
         if HAS_CONFIG_MANAGER:
             try:
-                filtering_config = get_file_filtering_config()
+                filtering_config = get_file_filtering_config(str(project_path))
                 if filtering_config:
                     # 使用配置系统的过滤规则
                     config_exclude_patterns = filtering_config.exclude_patterns
@@ -513,17 +516,13 @@ class ProjectAnalyzer:
 
     @staticmethod
     def _estimate_duration(file_count: int, arch_count: int) -> str:
-        """估计完成时间"""
-        # 假设每个文件3分钟，每个架构组件10分钟
-        total_minutes = file_count * 3 + arch_count * 10 + 30  # 加30分钟基础时间
-
-        hours = total_minutes // 60
-        minutes = total_minutes % 60
-
-        if hours > 0:
-            return f"{hours} hours {minutes} minutes"
-        else:
-            return f"{minutes} minutes"
+        """估计完成时间（按 文件层 → 架构层 → 项目层 的依赖层次累加）"""
+        seconds = ETAEstimator.estimate_layers([
+            {"type": "file_summary", "count": file_count},
+            {"type": "architecture", "count": arch_count},
+            {"type": "project_readme", "count": 1}
+        ])
+        return ETAEstimator.format_duration(seconds)
 
 
 class DocGuideTool:
@@ -536,19 +535,14 @@ class DocGuideTool:
         self.logger = get_logger(component="DocGuideTool", operation="init")
         self.logger.info("DocGuideTool 初始化完成")
         
-        # 响应大小限制配置
+        # 响应大小限制配置（超出时先做语义简化，最终截断由服务端响应治理器统一处理）
         self.MAX_RESPONSE_TOKENS = 20000  # MCP工具响应的最大token数
-        self.TOKEN_ESTIMATION_RATIO = 4   # 估算：每4个字符约等于1个token
     
     def _estimate_response_size(self, data: Dict[str, Any]) -> int:
         """估算响应数据的token大小"""
         try:
-            import json
-            json_str = json.dumps(data, ensure_ascii=False)
-            char_count = len(json_str)
-            estimated_tokens = char_count // self.TOKEN_ESTIMATION_RATIO
+            estimated_tokens = ResponseGovernor.estimate_tokens(data)
             self.logger.debug("响应大小估算", {
-                "char_count": char_count, 
                 "estimated_tokens": estimated_tokens,
                 "max_tokens": self.MAX_RESPONSE_TOKENS
             })
@@ -778,15 +772,11 @@ class DocGuideTool:
                 "version": "1.0"
             }
             
-            codelens_dir = Path(project_path) / ".codelens"
-            self.logger.debug("创建.codelens目录", {"dir_path": str(codelens_dir)})
-            codelens_dir.mkdir(exist_ok=True)
-            
-            analysis_file = codelens_dir / "analysis.json"
+            store = StateStore.for_project(project_path)
+            analysis_file = store.path("analysis.json")
             self.logger.debug("写入分析文件", {"file_path": str(analysis_file)})
             
-            with open(analysis_file, 'w', encoding='utf-8') as f:
-                json.dump(analysis_data, f, indent=2, ensure_ascii=False)
+            store.write_json(analysis_file.name, analysis_data)
             
             # 准备响应数据
             response_data = {
@@ -2,6 +2,7 @@
 MCP doc_sync 统一工具实现
 智能文档同步工具 - 合并 doc_update_init 和 doc_update 功能
 自动检测项目状态，执行初始化或更新检测，并记录完整变更历史
+启用项目监控后，更新检测只重新计算监控到变化的文件的指纹
 """
 import sys
 import os
@@ -17,11 +18,19 @@ sys.path.insert(0, project_root)
 
 from src.logging import get_logger
 from src.config import get_file_filtering_config, get_file_size_limits_config
+from src.services.state_store import StateStore, VersionConflictError
 
 
 class DocSyncTool:
     """MCP doc_sync 统一工具类 - 智能文档同步"""
 
+    # 扩展名不在检测范围内但仍需跟踪的重要文件
+    IMPORTANT_FILES = {
+        'Dockerfile', 'Makefile', 'requirements.txt',
+        'package.json', 'Cargo.toml', 'go.mod', 'pom.xml'
+    }
+    WATCH_CONSUMER = "doc_sync"
+
     def __init__(self):
         self.tool_name = "doc_sync"
         self.description = "智能文档同步工具 - 自动检测并处理项目文件变更"
@@ -48,6 +57,10 @@ class DocSyncTool:
                     "record_changes": {
                         "type": "boolean",
                         "description": "是否记录变更历史（默认true）"
+                    },
+                    "watch": {
+                        "type": "boolean",
+                        "description": "是否持续监控项目文件变化；监控期间的更新检测只重新计算变化文件的指纹（默认false）"
                     }
                 },
                 "required": []
@@ -80,6 +93,7 @@ class DocSyncTool:
 
             mode = arguments.get("mode", "auto")
             record_changes = arguments.get("record_changes", True)
+            watch = arguments.get("watch", False)
 
             # 确保.codelens目录存在
             codelens_dir = project_path / ".codelens"
@@ -92,13 +106,13 @@ class DocSyncTool:
                 detected_mode = self._detect_mode(project_path)
                 self.logger.info(f"智能检测模式: {detected_mode}")
                 if detected_mode == "init":
-                    result = self._execute_init(project_path, record_changes)
+                    result = self._execute_init(project_path, record_changes, watch)
                 else:
-                    result = self._execute_update(project_path, record_changes)
+                    result = self._execute_update(project_path, record_changes, watch)
             elif mode == "init":
-                result = self._execute_init(project_path, record_changes)
+                result = self._execute_init(project_path, record_changes, watch)
             elif mode == "update":
-                result = self._execute_update(project_path, record_changes)
+                result = self._execute_update(project_path, record_changes, watch)
             else:
                 error_msg = f"不支持的模式: {mode}"
                 self.logger.error(error_msg)
@@ -136,11 +150,13 @@ class DocSyncTool:
         
         return "init"
 
-    def _execute_init(self, project_path: Path, record_changes: bool = True) -> Dict[str, Any]:
+    def _execute_init(self, project_path: Path, record_changes: bool = True,
+                      watch: bool = False) -> Dict[str, Any]:
         """执行初始化操作"""
         self.logger.info("开始执行初始化操作")
         
-        # 扫描项目文件
+        # 扫描项目文件（监控的变化基点先于扫描建立，扫描期间的变化留到下次处理）
+        watcher = self._begin_tracking(project_path, watch)
         current_files = self._scan_project_files(project_path)
         
         # 创建指纹文件
@@ -151,8 +167,9 @@ class DocSyncTool:
         }
         
         fingerprints_file = project_path / ".codelens" / "file_fingerprints.json"
-        with open(fingerprints_file, 'w', encoding='utf-8') as f:
-            json.dump(fingerprints, f, indent=2, ensure_ascii=False)
+        version = StateStore.for_project(project_path).write_json(fingerprints_file.name, fingerprints)
+        if watcher is not None:
+            watcher.set_synced_version(self.WATCH_CONSUMER, version)
         
         # 记录变更历史
         change_info = {
@@ -170,26 +187,33 @@ class DocSyncTool:
             "operation": "init",
             "files_count": len(current_files),
             "message": f"✅ 初始化完成，已记录 {len(current_files)} 个文件的指纹基点",
-            "fingerprints_file": str(fingerprints_file)
+            "fingerprints_file": str(fingerprints_file),
+            "watching": watcher is not None
         })
 
-    def _execute_update(self, project_path: Path, record_changes: bool = True) -> Dict[str, Any]:
+    def _execute_update(self, project_path: Path, record_changes: bool = True,
+                        watch: bool = False) -> Dict[str, Any]:
         """执行更新检测操作"""
         self.logger.info("开始执行更新检测操作")
         
-        fingerprints_file = project_path / ".codelens" / "file_fingerprints.json"
+        store = StateStore.for_project(project_path)
+        fingerprints_file = store.path("file_fingerprints.json")
         
-        if not fingerprints_file.exists():
+        # 加载旧指纹（记录版本，写回时检测并发修改）
+        old_fingerprints, fingerprints_version = store.read_json_versioned(fingerprints_file.name)
+        if old_fingerprints is None:
             return self._error_response("指纹文件不存在，请先执行初始化")
         
-        # 加载旧指纹
-        with open(fingerprints_file, 'r', encoding='utf-8') as f:
-            old_fingerprints = json.load(f)
-        
         old_files = old_fingerprints.get("files", {})
         
-        # 扫描当前文件状态
-        current_files = self._scan_project_files(project_path)
+        # 扫描当前文件状态：监控有效时只处理变化过的文件，否则全量扫描
+        scan_mode = "incremental"
+        watcher = self._project_watcher(project_path, create=watch)
+        current_files = self._incremental_scan(project_path, watcher, old_files, fingerprints_version)
+        if current_files is None:
+            scan_mode = "full"
+            watcher = self._begin_tracking(project_path, watch)
+            current_files = self._scan_project_files(project_path)
         
         # 检测变化
         changed_files, new_files, deleted_files = self._compare_files(old_files, current_files)
@@ -204,8 +228,13 @@ class DocSyncTool:
             "files": current_files
         }
         
-        with open(fingerprints_file, 'w', encoding='utf-8') as f:
-            json.dump(new_fingerprints, f, indent=2, ensure_ascii=False)
+        try:
+            version = store.write_json(fingerprints_file.name, new_fingerprints,
+                                       expected_version=fingerprints_version)
+            if watcher is not None:
+                watcher.set_synced_version(self.WATCH_CONSUMER, version)
+        except VersionConflictError as e:
+            return self._error_response(f"指纹文件在检测期间被其他进程更新，请重新执行: {e}")
         
         # 记录变更历史
         has_changes = bool(changed_files or new_files or deleted_files)
@@ -247,6 +276,8 @@ class DocSyncTool:
                 "deleted": deleted_files
             },
             "suggestion": suggestion,
+            "scan_mode": scan_mode,
+            "watching": watcher is not None,
             "message": f"✅ 更新检测完成，共检测 {len(current_files)} 个文件"
         })
 
@@ -300,18 +331,32 @@ class DocSyncTool:
     def _scan_project_files(self, project_path: Path) -> Dict[str, Dict[str, Any]]:
         """扫描项目文件 - 使用配置系统"""
         current_files = {}
+        rules = self._scan_rules(project_path)
         
-        # 从配置获取过滤规则
-        filtering_config = get_file_filtering_config()
-        size_limits_config = get_file_size_limits_config()
+        # 遍历整个项目目录
+        for file_path in project_path.rglob("*"):
+            if file_path.is_file():
+                try:
+                    relative_path = file_path.relative_to(project_path)
+                    if not self._should_track(relative_path, rules):
+                        continue
+                    
+                    current_files[str(relative_path)] = self._fingerprint(file_path)
+                    
+                except Exception as e:
+                    self.logger.warning(f"跳过文件 {file_path}: {e}")
+        
+        self.logger.info(f"扫描完成，共检测到 {len(current_files)} 个代码文件")
+        return current_files
+
+    def _scan_rules(self, project_path: Path) -> Dict[str, set]:
+        """从项目配置获取过滤规则"""
+        filtering_config = get_file_filtering_config(str(project_path))
         
         # 获取需要忽略的目录
         ignore_dirs = set(filtering_config.exclude_directories)
         ignore_dirs.add('.codelens')  # 总是排除codelens工作目录
         
-        # 获取需要检测的文件扩展名
-        code_extensions = set(filtering_config.include_extensions)
-        
         # 从排除模式中提取扩展名（简化处理）
         ignore_extensions = set()
         for pattern in filtering_config.exclude_patterns:
@@ -323,46 +368,92 @@ class DocSyncTool:
                     ignore_extensions.add(pattern[1:])
         ignore_extensions.add('__pycache__')
         
-        # 遍历整个项目目录
-        for file_path in project_path.rglob("*"):
-            if file_path.is_file():
-                try:
-                    # 检查是否在忽略的目录中
-                    if any(ignore_dir in file_path.parts for ignore_dir in ignore_dirs):
-                        continue
-                    
-                    # 检查文件扩展名
-                    file_suffix = file_path.suffix.lower()
-                    
-                    # 跳过文档文件和其他忽略的文件
-                    if file_suffix in ignore_extensions:
-                        continue
-                    
-                    # 只处理代码文件或者无扩展名的重要文件
-                    if file_suffix not in code_extensions and file_suffix != '':
-                        # 检查是否是重要的无扩展名文件
-                        important_files = {
-                            'Dockerfile', 'Makefile', 'requirements.txt', 
-                            'package.json', 'Cargo.toml', 'go.mod', 'pom.xml'
-                        }
-                        if file_path.name not in important_files:
-                            continue
-                    
-                    # 读取文件内容并计算哈希
-                    content = file_path.read_text(encoding='utf-8')
-                    file_hash = hashlib.md5(content.encode()).hexdigest()
-                    
-                    relative_path = str(file_path.relative_to(project_path))
-                    current_files[relative_path] = {
-                        "hash": file_hash,
-                        "size": file_path.stat().st_size,
-                        "modified_time": datetime.fromtimestamp(file_path.stat().st_mtime).isoformat()
-                    }
-                    
-                except Exception as e:
-                    self.logger.warning(f"跳过文件 {file_path}: {e}")
+        return {
+            "ignore_dirs": ignore_dirs,
+            "code_extensions": set(filtering_config.include_extensions),
+            "ignore_extensions": ignore_extensions
+        }
+
+    def _should_track(self, relative_path: Path, rules: Dict[str, set]) -> bool:
+        """判断项目内的文件（相对路径）是否需要记录指纹"""
+        # 检查是否在忽略的目录中
+        if any(ignore_dir in relative_path.parts for ignore_dir in rules["ignore_dirs"]):
+            return False
+        
+        # 跳过文档文件和其他忽略的文件
+        file_suffix = relative_path.suffix.lower()
+        if file_suffix in rules["ignore_extensions"]:
+            return False
+        
+        # 只处理代码文件或者无扩展名的重要文件
+        if file_suffix not in rules["code_extensions"] and file_suffix != '':
+            return relative_path.name in self.IMPORTANT_FILES
+        return True
+
+    def _fingerprint(self, file_path: Path) -> Dict[str, Any]:
+        """读取文件内容并计算哈希"""
+        content = file_path.read_text(encoding='utf-8')
+        stat = file_path.stat()
+        return {
+            "hash": hashlib.md5(content.encode()).hexdigest(),
+            "size": stat.st_size,
+            "modified_time": datetime.fromtimestamp(stat.st_mtime).isoformat()
+        }
+
+    def _project_watcher(self, project_path: Path, create: bool = False):
+        """获取项目监控器；create 为 True 时不存在则创建并启动"""
+        if not create and "src.services.project_watcher" not in sys.modules:
+            return None  # 本进程从未启用过监控，无需导入监控模块
+        from src.services.project_watcher import get_project_watcher, watch_project
+        if create:
+            return watch_project(str(project_path), self._watch_filter(project_path))
+        return get_project_watcher(str(project_path))
+
+    def _watch_filter(self, project_path: Path):
+        """监控规则：只按排除目录剪枝，其余文件交给 _should_track 判断，保证不漏掉任何被跟踪的文件"""
+        from src.hot_reload.file_watcher import WatchFilter
+        # 指纹扫描按单级目录名排除，含路径分隔符的配置项不参与剪枝
+        ignore_dirs = [d for d in self._scan_rules(project_path)["ignore_dirs"] if '/' not in d]
+        return WatchFilter(extensions=None, exclude_directories=ignore_dirs, skip_hidden=False)
+
+    def _begin_tracking(self, project_path: Path, watch: bool):
+        """全量扫描前重置监控的变化基点，返回监控器（未启用监控时为 None）"""
+        watcher = self._project_watcher(project_path, create=watch)
+        if watcher is not None:
+            watcher.track(self.WATCH_CONSUMER)
+        return watcher
+
+    def _incremental_scan(self, project_path: Path, watcher, old_files: Dict[str, Dict[str, Any]],
+                          fingerprints_version: str):
+        """在旧指纹上只重新计算监控到变化的文件；基点无效时返回 None"""
+        if watcher is None or not watcher.is_tracking(self.WATCH_CONSUMER):
+            return None
+        if watcher.synced_version(self.WATCH_CONSUMER) != fingerprints_version:
+            self.logger.info("指纹文件已被其他进程更新，改为全量扫描")
+            return None
+        changes = watcher.drain_changes(self.WATCH_CONSUMER)
+        if changes is None:
+            self.logger.info("监控到的变化过多，改为全量扫描")
+            return None
+        
+        rules = self._scan_rules(project_path)
+        root = project_path.resolve()
+        current_files = dict(old_files)
+        for changed_path in changes:
+            file_path = Path(changed_path)
+            try:
+                relative_path = file_path.relative_to(root)
+            except ValueError:
+                continue
+            current_files.pop(str(relative_path), None)
+            if not file_path.is_file() or not self._should_track(relative_path, rules):
+                continue
+            try:
+                current_files[str(relative_path)] = self._fingerprint(file_path)
+            except Exception as e:
+                self.logger.warning(f"跳过文件 {file_path}: {e}")
         
-        self.logger.info(f"扫描完成，共检测到 {len(current_files)} 个代码文件")
+        self.logger.info(f"增量扫描完成，重新计算 {len(changes)} 个变化文件的指纹")
         return current_files
 
     def _compare_files(self, old_files: Dict[str, Dict[str, Any]], 
@@ -430,28 +521,15 @@ class DocSyncTool:
             **change_info
         }
         
-        # 读取或创建历史记录
-        if history_file.exists():
-            try:
-                with open(history_file, 'r', encoding='utf-8') as f:
-                    history = json.load(f)
-            except Exception:
-                history = self._create_empty_history()
-        else:
-            history = self._create_empty_history()
-        
-        # 添加新记录
-        history["history"].append(change_record)
-        history["last_updated"] = datetime.now().isoformat()
-        history["total_operations"] = len(history["history"])
-        
-        # 保存历史记录
-        with open(history_file, 'w', encoding='utf-8') as f:
-            json.dump(history, f, indent=2, ensure_ascii=False)
-        
-        # 保存最新变更
-        with open(last_change_file, 'w', encoding='utf-8') as f:
-            json.dump(change_record, f, indent=2, ensure_ascii=False)
+        # 在文件锁内追加历史记录，避免并发调用互相覆盖
+        def append_record(history: Dict[str, Any]):
+            history.setdefault("history", []).append(change_record)
+            history["last_updated"] = datetime.now().isoformat()
+            history["total_operations"] = len(history["history"])
+
+        store = StateStore.for_project(project_path)
+        store.update_json(history_file.name, append_record, self._create_empty_history)
+        store.write_json(last_change_file.name, change_record)
         
         self.logger.info(f"变更历史已记录: {change_record['id']}")
 
@@ -497,6 +575,7 @@ def main():
     parser.add_argument("--mode", choices=["auto", "init", "update", "status"], 
                        default="auto", help="Operation mode")
     parser.add_argument("--no-record", action="store_true", help="Disable change recording")
+    parser.add_argument("--watch", action="store_true", help="Keep watching the project for changes")
 
     args = parser.parse_args()
 
@@ -504,7 +583,8 @@ def main():
     arguments = {
         "project_path": args.project_path,
         "mode": args.mode,
-        "record_changes": not args.no_record
+        "record_changes": not args.no_record,
+        "watch": args.watch
     }
 
     # 执行工具
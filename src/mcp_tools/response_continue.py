@@ -0,0 +1,111 @@
+"""
+MCP response_continue 工具实现
+分段取回因超出响应预算而被截断的工具响应
+"""
+import sys
+import os
+import json
+from typing import Dict, Any
+
+# 添加项目根目录到path以导入其他模块
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, project_root)
+
+from src.logging import get_logger
+from src.services.response_governor import ResponseGovernor, get_response_governor
+
+
+class ResponseContinueTool:
+    """MCP response_continue 工具类 - 续取被截断的响应"""
+
+    def __init__(self, governor: ResponseGovernor = None):
+        self.tool_name = "response_continue"
+        self.description = "分段取回被截断的工具响应（使用响应中 _response.continuation 句柄）"
+        self.governor = governor or get_response_governor()
+        self.logger = get_logger(component="ResponseContinueTool", operation="init")
+        self.logger.info("ResponseContinueTool 初始化完成")
+
+    def get_tool_definition(self) -> Dict[str, Any]:
+        """获取MCP工具定义"""
+        return {
+            "name": self.tool_name,
+            "description": self.description,
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "handle": {
+                        "type": "string",
+                        "description": "被截断响应中的 continuation 句柄"
+                    },
+                    "offset": {
+                        "type": "integer",
+                        "minimum": 0,
+                        "description": "字节偏移（首次为0，之后使用上一段返回的 next_offset）"
+                    },
+                    "include_metrics": {
+                        "type": "boolean",
+                        "description": "是否附带各工具的响应字节统计"
+                    }
+                },
+                "required": []
+            }
+        }
+
+    def execute(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """执行response_continue工具"""
+        handle = arguments.get("handle")
+        include_metrics = arguments.get("include_metrics", False)
+
+        if not handle:
+            if include_metrics:
+                return self._success_response({"metrics": self.governor.get_metrics()})
+            return self._error_response("Continuation handle is required")
+
+        try:
+            data = self.governor.fetch(handle, arguments.get("offset", 0))
+        except KeyError as e:
+            return self._error_response(str(e.args[0]))
+
+        if include_metrics:
+            data["metrics"] = self.governor.get_metrics()
+
+        self.logger.debug("续取响应分段", {
+            "handle": handle,
+            "offset": data["offset"],
+            "remaining_bytes": data["remaining_bytes"]
+        })
+        return self._success_response(data)
+
+    def _success_response(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """成功响应"""
+        return {
+            "success": True,
+            "tool": self.tool_name,
+            "data": data
+        }
+
+    def _error_response(self, message: str) -> Dict[str, Any]:
+        """错误响应"""
+        self.logger.error("生成错误响应", {"error_message": message})
+        return {
+            "success": False,
+            "tool": self.tool_name,
+            "error": message
+        }
+
+
+def create_mcp_tool() -> ResponseContinueTool:
+    """创建MCP工具实例"""
+    return ResponseContinueTool()
+
+
+# 命令行接口，用于测试
+def main():
+    """命令行测试接口"""
+    tool = create_mcp_tool()
+    result = tool.execute({"include_metrics": True})
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+MCP server_metrics 工具实现
+查看服务器进程内的指标：各工具调用次数、延迟分布、错误数，以及热点函数耗时
+"""
+import sys
+import os
+import json
+from typing import Dict, Any
+
+# 添加项目根目录到path以导入其他模块
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, project_root)
+
+from src.logging import get_logger
+from src.services.metrics_registry import MetricsRegistry, get_metrics_registry
+from src.services.response_governor import get_response_governor
+
+
+class ServerMetricsTool:
+    """MCP server_metrics 工具类 - 服务器指标查询"""
+
+    def __init__(self, registry: MetricsRegistry = None):
+        self.tool_name = "server_metrics"
+        self.description = "查看MCP服务器指标：工具调用次数、延迟分位数、错误数和热点函数耗时，可导出Prometheus格式"
+        self.registry = registry or get_metrics_registry()
+        self.logger = get_logger(component="ServerMetricsTool", operation="init")
+        self.logger.info("ServerMetricsTool 初始化完成")
+
+    def get_tool_definition(self) -> Dict[str, Any]:
+        """获取MCP工具定义"""
+        return {
+            "name": self.tool_name,
+            "description": self.description,
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "format": {
+                        "type": "string",
+                        "enum": ["json", "prometheus"],
+                        "description": "输出格式：json（默认）或 Prometheus 文本格式"
+                    },
+                    "prefix": {
+                        "type": "string",
+                        "description": "只返回以该前缀开头的指标（如 tool_call）"
+                    },
+                    "project_path": {
+                        "type": "string",
+                        "description": "提供时将 Prometheus 文本格式写入 <project_path>/.codelens/metrics.prom"
+                    },
+                    "include_responses": {
+                        "type": "boolean",
+                        "description": "是否附带各工具的响应字节统计"
+                    }
+                },
+                "required": []
+            }
+        }
+
+    def execute(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """执行server_metrics工具"""
+        output_format = arguments.get("format", "json")
+        project_path = arguments.get("project_path")
+
+        if output_format not in ("json", "prometheus"):
+            return self._error_response(f"Unsupported format: {output_format}")
+
+        data: Dict[str, Any] = {}
+        if output_format == "prometheus":
+            data["prometheus"] = self.registry.to_prometheus()
+        else:
+            data.update(self.registry.snapshot(arguments.get("prefix")))
+
+        if arguments.get("include_responses", False):
+            data["responses"] = get_response_governor().get_metrics()
+
+        if project_path:
+            if not os.path.isdir(project_path):
+                return self._error_response(f"Project path does not exist: {project_path}")
+            try:
+                data["dump_file"] = str(self.registry.dump_to_project(project_path))
+            except OSError as e:
+                return self._error_response(f"Failed to write metrics file: {e}")
+
+        return self._success_response(data)
+
+    def _success_response(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """成功响应"""
+        return {
+            "success": True,
+            "tool": self.tool_name,
+            "data": data
+        }
+
+    def _error_response(self, message: str) -> Dict[str, Any]:
+        """错误响应"""
+        self.logger.error("生成错误响应", {"error_message": message})
+        return {
+            "success": False,
+            "tool": self.tool_name,
+            "error": message
+        }
+
+
+def create_mcp_tool() -> ServerMetricsTool:
+    """创建MCP工具实例"""
+    return ServerMetricsTool()
+
+
+# 命令行接口，用于测试
+def main():
+    """命令行测试接口"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="CodeLens服务器指标工具")
+    parser.add_argument("--format", choices=["json", "prometheus"], default="json", help="输出格式")
+    parser.add_argument("--prefix", help="指标名前缀过滤")
+    parser.add_argument("--project-path", help="写入 .codelens/metrics.prom 的项目路径")
+
+    args = parser.parse_args()
+
+    tool = create_mcp_tool()
+    arguments = {"format": args.format}
+    if args.prefix:
+        arguments["prefix"] = args.prefix
+    if args.project_path:
+        arguments["project_path"] = args.project_path
+
+    result = tool.execute(arguments)
+    if result.get("success") and args.format == "prometheus":
+        print(result["data"]["prometheus"])
+    else:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+MCP task_batch 工具实现
+在一次调用中串联多个任务操作（完成、领取、获取上下文、查询进度），
+共用一次任务状态加载和一次持久化提交，减少每个文件的协议往返次数
+"""
+import sys
+import os
+import json
+from typing import Dict, Any
+
+# 添加项目根目录到path以导入其他模块
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, project_root)
+
+from src.mcp_tools.task_execute import TaskExecutor
+from src.logging import get_logger
+
+
+class TaskBatchTool:
+    """MCP task_batch 工具类 - 批量任务操作"""
+
+    MAX_OPERATIONS = 50
+
+    def __init__(self):
+        self.tool_name = "task_batch"
+        self.description = "在一次调用中依次执行多个任务操作（完成任务、领取下N个任务、获取任务上下文、查询进度），只加载和提交一次任务状态"
+        self.logger = get_logger(component="TaskBatchTool", operation="init")
+        self.logger.info("TaskBatchTool初始化完成")
+
+    def get_tool_definition(self) -> Dict[str, Any]:
+        """获取MCP工具定义"""
+        return {
+            "name": self.tool_name,
+            "description": self.description,
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "project_path": {
+                        "type": "string",
+                        "description": "项目路径"
+                    },
+                    "worker_id": {
+                        "type": "string",
+                        "description": "工作者标识（claim操作使用，默认按进程号生成）"
+                    },
+                    "operations": {
+                        "type": "array",
+                        "description": "按顺序执行的操作列表；写操作在同一事务内执行，读操作在提交后执行",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "op": {
+                                    "type": "string",
+                                    "enum": ["complete", "claim", "heartbeat", "context", "status"],
+                                    "description": "complete完成任务，claim领取就绪任务，heartbeat续租，"
+                                                   "context获取任务执行上下文，status查询进度"
+                                },
+                                "task_id": {
+                                    "type": "string",
+                                    "description": "complete/heartbeat操作的任务ID"
+                                },
+                                "task_ids": {
+                                    "type": "array",
+                                    "items": {"type": "string"},
+                                    "description": "context操作的任务ID列表（默认为本批次领取的任务）"
+                                },
+                                "success": {
+                                    "type": "boolean",
+                                    "description": "complete操作：任务是否成功"
+                                },
+                                "error_message": {
+                                    "type": "string",
+                                    "description": "complete操作：失败原因"
+                                },
+                                "lease_id": {
+                                    "type": "string",
+                                    "description": "complete/heartbeat操作的租约ID"
+                                },
+                                "count": {
+                                    "type": "integer",
+                                    "minimum": 1,
+                                    "description": "claim操作领取的任务数量"
+                                },
+                                "phase": {
+                                    "type": "string",
+                                    "enum": ["phase_1_files", "phase_2_architecture", "phase_3_project"],
+                                    "description": "claim/status操作限定的阶段"
+                                },
+                                "lease_seconds": {
+                                    "type": "integer",
+                                    "minimum": 1,
+                                    "description": "claim/heartbeat操作的租约有效期（秒）"
+                                }
+                            },
+                            "required": ["op"]
+                        }
+                    },
+                    "stop_on_error": {
+                        "type": "boolean",
+                        "description": "某个写操作失败时跳过其后的所有操作"
+                    },
+                    "context_enhancement": {
+                        "type": "boolean",
+                        "description": "context操作是否启用上下文增强"
+                    }
+                },
+                "required": ["project_path", "operations"]
+            }
+        }
+
+    def execute(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """执行task_batch工具"""
+        project_path = arguments.get("project_path")
+        operations = arguments.get("operations") or []
+
+        if not project_path or not os.path.exists(project_path):
+            return self._error_response("Invalid project path")
+        if not isinstance(operations, list) or not operations:
+            return self._error_response("At least one operation is required")
+        if len(operations) > self.MAX_OPERATIONS:
+            return self._error_response(f"Too many operations (max {self.MAX_OPERATIONS})")
+        if not all(isinstance(operation, dict) for operation in operations):
+            return self._error_response("Each operation must be an object")
+
+        operation_id = self.logger.log_operation_start("execute_task_batch_tool",
+                                                       project_path=project_path,
+                                                       operations=len(operations))
+        try:
+            executor = TaskExecutor(project_path)
+            worker_id = arguments.get("worker_id") or f"worker_{os.getpid()}"
+            result = executor.execute_batch(operations, worker_id,
+                                            stop_on_error=arguments.get("stop_on_error", False),
+                                            context_enhancement=arguments.get("context_enhancement", True))
+
+            self.logger.log_operation_end("execute_task_batch_tool", operation_id, success=True,
+                                          failed=result["failed_count"])
+            return self._success_response(result)
+
+        except Exception as e:
+            self.logger.log_operation_end("execute_task_batch_tool", operation_id, success=False, error=str(e))
+            self.logger.error(f"批量任务操作失败: {str(e)}", exc_info=e)
+            return self._error_response(f"Task batch failed: {str(e)}")
+
+    def _success_response(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """成功响应"""
+        return {
+            "success": True,
+            "tool": self.tool_name,
+            "data": data
+        }
+
+    def _error_response(self, message: str) -> Dict[str, Any]:
+        """错误响应"""
+        self.logger.error("生成错误响应", {"error_message": message})
+        return {
+            "success": False,
+            "tool": self.tool_name,
+            "error": message
+        }
+
+
+def create_mcp_tool() -> TaskBatchTool:
+    """创建MCP工具实例"""
+    return TaskBatchTool()
+
+
+# 命令行接口，用于测试
+def main():
+    """命令行测试接口"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="MCP task_batch tool")
+    parser.add_argument("project_path", help="Project path")
+    parser.add_argument("operations", help="Operations as a JSON array, e.g. '[{\"op\": \"claim\", \"count\": 2}]'")
+    parser.add_argument("--worker-id", help="Worker ID for claim operations")
+    parser.add_argument("--stop-on-error", action="store_true", help="Skip remaining operations after a failure")
+
+    args = parser.parse_args()
+
+    arguments = {
+        "project_path": args.project_path,
+        "operations": json.loads(args.operations),
+        "worker_id": args.worker_id,
+        "stop_on_error": args.stop_on_error
+    }
+
+    tool = create_mcp_tool()
+    result = tool.execute(arguments)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,7 @@ sys.path.insert(0, project_root)
 from src.task_engine.task_manager import TaskManager, TaskStatus, Task
 from src.task_engine.phase_controller import PhaseController, Phase
 from src.task_engine.state_tracker import StateTracker
+from src.task_engine.task_scheduler import TaskScheduler
 from src.services.file_service import FileService
 from src.templates.document_templates import TemplateService
 from src.logging import get_logger
@@ -33,9 +34,9 @@ try:
     HAS_CONFIG_MANAGER = True
 except ImportError:
     HAS_CONFIG_MANAGER = False
-    get_file_size_limits_config = lambda: None
-    get_tool_config = lambda x: {}
-    get_file_filtering_config = lambda: None
+    get_file_size_limits_config = lambda project_path=None: None
+    get_tool_config = lambda x, project_path=None: {}
+    get_file_filtering_config = lambda project_path=None: None
 
 
 class TaskExecutor:
@@ -50,6 +51,7 @@ class TaskExecutor:
         self.task_manager = TaskManager(str(project_path))
         self.phase_controller = PhaseController(self.task_manager)
         self.state_tracker = StateTracker(str(project_path), self.task_manager, self.phase_controller)
+        self.scheduler = TaskScheduler(self.task_manager)
         self.file_service = FileService(enable_large_file_chunking=True)
         self.template_service = TemplateService()
         
@@ -62,8 +64,8 @@ class TaskExecutor:
         """加载配置"""
         if HAS_CONFIG_MANAGER:
             try:
-                file_size_config = get_file_size_limits_config()
-                tool_config = get_tool_config("task_execute")
+                file_size_config = get_file_size_limits_config(str(self.project_path))
+                tool_config = get_tool_config("task_execute", str(self.project_path))
                 
                 if file_size_config:
                     self.large_file_threshold = file_size_config.large_file_threshold
@@ -287,7 +289,7 @@ class TaskExecutor:
             
             # 获取项目文件列表（限制数量）
             # 从配置获取过滤规则
-            filtering_config = get_file_filtering_config() if HAS_CONFIG_MANAGER else None
+            filtering_config = get_file_filtering_config(str(self.project_path)) if HAS_CONFIG_MANAGER else None
             exclude_patterns = filtering_config.exclude_patterns if filtering_config else ["__pycache__", ".git", "node_modules", "venv", ".venv"]
             extensions = filtering_config.include_extensions if filtering_config else [".py", ".js", ".ts", ".java", ".go", ".rs", ".md"]
             
@@ -554,13 +556,66 @@ graph TD
         
         return doc
 
-    def complete_task(self, task_id: str, success: bool = True, error_message: Optional[str] = None) -> Dict[str, Any]:
-        """完成任务"""
+    def claim_tasks(self, worker_id: str, batch_size: int = 1, phase: Optional[str] = None,
+                    lease_seconds: Optional[int] = None, include_context: bool = True,
+                    context_enhancement: bool = True) -> Dict[str, Any]:
+        """批量领取任务（带租约），供多个文档生成工作进程并行执行"""
+        operation_id = self.logger.log_operation_start("claim_tasks", worker_id=worker_id,
+                                                       batch_size=batch_size, phase=phase)
+
+        claimed = self.scheduler.claim_tasks(worker_id, batch_size, phase, lease_seconds)
+
+        claimed_tasks = []
+        for item in claimed:
+            task = item["task"]
+            self.state_tracker.record_task_event("started", task.id, {"worker_id": worker_id})
+            entry = {
+                "task_info": self._get_task_info(task),
+                "lease": item["lease"]
+            }
+            if include_context:
+                entry["task_execution"] = self.prepare_task_execution(task.id, context_enhancement)
+            claimed_tasks.append(entry)
+
+        self.logger.info("批量领取任务完成", {
+            "worker_id": worker_id,
+            "requested": batch_size,
+            "claimed": len(claimed_tasks)
+        })
+        self.logger.log_operation_end("claim_tasks", operation_id, success=True, claimed=len(claimed_tasks))
+
+        return {
+            "success": True,
+            "worker_id": worker_id,
+            "claimed_count": len(claimed_tasks),
+            "claimed_tasks": claimed_tasks,
+            "lease_instructions": "长时间任务请在租约过期前使用 heartbeat 模式续租；"
+                                  "完成时在 complete 模式中传入 lease_id",
+            "phase_status": self.task_manager.get_phase_progress(phase) if phase else None
+        }
+
+    def heartbeat_task(self, task_id: str, lease_id: str, lease_seconds: Optional[int] = None) -> Dict[str, Any]:
+        """续租任务"""
+        if not self.scheduler.heartbeat(task_id, lease_id, lease_seconds):
+            self.logger.warning("续租失败，租约已失效", {"task_id": task_id, "lease_id": lease_id})
+            return {"error": f"Lease {lease_id} for task {task_id} is no longer valid"}
+
+        task = self.task_manager.get_task(task_id)
+        return {
+            "success": True,
+            "task_id": task_id,
+            "lease": task.metadata.get(TaskScheduler.LEASE_KEY)
+        }
+
+    def complete_task(self, task_id: str, success: bool = True, error_message: Optional[str] = None,
+                      lease_id: Optional[str] = None) -> Dict[str, Any]:
+        """完成任务（提供 lease_id 时凭租约完成，租约失效则拒绝）"""
 
         task = self.task_manager.get_task(task_id)
         if not task:
             return {"error": f"Task {task_id} not found"}
 
+        validation_failed = False
         if success:
             # 验证输出文件是否存在且有效（防止虚假完成）
             output_path = getattr(task, 'output_path', None)
@@ -569,24 +624,32 @@ graph TD
                 if not full_output_path.exists():
                     self.logger.warning(f"任务 {task_id} 声称完成但输出文件不存在: {output_path}")
                     success = False
+                    validation_failed = True
                     error_message = f"验证失败 - 输出文件不存在: {output_path}"
                 elif full_output_path.stat().st_size < 100:  # 少于100字节认为内容不足
                     self.logger.warning(f"任务 {task_id} 输出文件过小: {full_output_path.stat().st_size} bytes")
-                    success = False  
+                    success = False
+                    validation_failed = True
                     error_message = f"验证失败 - 输出文件内容不足: {output_path} ({full_output_path.stat().st_size} bytes)"
                 else:
                     self.logger.info(f"任务输出验证通过: {output_path} ({full_output_path.stat().st_size} bytes)")
             
-            if success:
-                self.task_manager.update_task_status(task_id, TaskStatus.COMPLETED)
-                self.state_tracker.record_task_event("completed", task_id)
-                self.logger.info(f"任务完成: {task_id} - {task.description}")
-            else:
-                self.task_manager.update_task_status(task_id, TaskStatus.FAILED, error_message)
-                self.state_tracker.record_task_event("validation_failed", task_id, {"error": error_message})
-                self.logger.error(f"任务验证失败: {task_id} - {error_message}")
+        final_status = TaskStatus.COMPLETED if success else TaskStatus.FAILED
+        if lease_id:
+            if not self.scheduler.release_task(task_id, lease_id, final_status, error_message):
+                self.logger.warning("凭租约完成任务失败，租约已失效", {"task_id": task_id, "lease_id": lease_id})
+                return {"error": f"Lease {lease_id} for task {task_id} is no longer valid"}
+            task = self.task_manager.get_task(task_id)
+        else:
+            self.task_manager.update_task_status(task_id, final_status, error_message)
+
+        if success:
+            self.state_tracker.record_task_event("completed", task_id)
+            self.logger.info(f"任务完成: {task_id} - {task.description}")
+        elif validation_failed:
+            self.state_tracker.record_task_event("validation_failed", task_id, {"error": error_message})
+            self.logger.error(f"任务验证失败: {task_id} - {error_message}")
         else:
-            self.task_manager.update_task_status(task_id, TaskStatus.FAILED, error_message)
             self.state_tracker.record_task_event("failed", task_id, {"error": error_message})
             self.logger.error(f"任务失败: {task_id} - {error_message}")
 
@@ -607,6 +670,114 @@ graph TD
             "next_task": self._get_task_info(next_task) if next_task else None
         }
 
+    # task_batch 支持的操作：写操作在同一事务内执行，读操作在提交后执行
+    BATCH_WRITE_OPS = {"complete", "claim", "heartbeat"}
+    BATCH_READ_OPS = {"context", "status"}
+
+    def execute_batch(self, operations: List[Dict[str, Any]], worker_id: str,
+                      stop_on_error: bool = False, context_enhancement: bool = True) -> Dict[str, Any]:
+        """在同一份任务状态上依次执行多个操作
+
+        写操作（complete / claim / heartbeat）共用一次加锁加载和一次持久化提交，
+        事件日志也一次性追加；读操作（context / status）在提交后执行，读取文件
+        内容时不持有任务锁。context 未指定 task_ids 时返回本批次领取的任务上下文。
+        """
+        operation_id = self.logger.log_operation_start("execute_batch", worker_id=worker_id,
+                                                       operations=len(operations))
+        results: List[Optional[Dict[str, Any]]] = [None] * len(operations)
+        claimed_ids: List[str] = []
+        stopped_at: Optional[int] = None
+
+        with self.scheduler.transaction(), self.state_tracker.batch_events():
+            for index, operation in enumerate(operations):
+                op = operation.get("op")
+                if op in self.BATCH_READ_OPS:
+                    continue
+                results[index] = self._run_batch_write(operation, worker_id, claimed_ids)
+                if stop_on_error and "error" in results[index]:
+                    stopped_at = index
+                    break
+
+        for index, operation in enumerate(operations):
+            if stopped_at is not None and index > stopped_at:
+                results[index] = {"op": operation.get("op"), "skipped": True}
+            elif operation.get("op") in self.BATCH_READ_OPS:
+                results[index] = self._run_batch_read(operation, claimed_ids, context_enhancement)
+
+        failed = sum(1 for result in results if "error" in result)
+        self.logger.info("批量操作完成", {
+            "worker_id": worker_id,
+            "operations": len(operations),
+            "failed": failed,
+            "claimed": len(claimed_ids)
+        })
+        self.logger.log_operation_end("execute_batch", operation_id, success=failed == 0)
+
+        return {
+            "success": True,
+            "worker_id": worker_id,
+            "operations_count": len(operations),
+            "failed_count": failed,
+            "stopped_at": stopped_at,
+            "claimed_task_ids": claimed_ids,
+            "results": results,
+            "overall_progress": self.task_manager.get_overall_progress()
+        }
+
+    def _run_batch_write(self, operation: Dict[str, Any], worker_id: str,
+                         claimed_ids: List[str]) -> Dict[str, Any]:
+        """执行一个写操作（在调度事务内调用）"""
+        op = operation.get("op")
+        task_id = operation.get("task_id")
+
+        if op == "claim":
+            result = self.claim_tasks(worker_id,
+                                      batch_size=operation.get("count", 1),
+                                      phase=operation.get("phase"),
+                                      lease_seconds=operation.get("lease_seconds"),
+                                      include_context=False)
+            claimed_ids.extend(entry["task_info"]["id"] for entry in result["claimed_tasks"])
+        elif not task_id:
+            result = {"error": f"Task ID is required for {op}"}
+        elif op == "complete":
+            result = self.complete_task(task_id,
+                                        success=operation.get("success", True),
+                                        error_message=operation.get("error_message"),
+                                        lease_id=operation.get("lease_id"))
+        elif op == "heartbeat":
+            if operation.get("lease_id"):
+                result = self.heartbeat_task(task_id, operation["lease_id"], operation.get("lease_seconds"))
+            else:
+                result = {"error": "Lease ID is required for heartbeat"}
+        else:
+            result = {"error": f"Invalid batch operation: {op}"}
+
+        return {"op": op, **result}
+
+    def _run_batch_read(self, operation: Dict[str, Any], claimed_ids: List[str],
+                        context_enhancement: bool) -> Dict[str, Any]:
+        """执行一个读操作（在事务提交后调用）"""
+        op = operation.get("op")
+
+        if op == "status":
+            phase = operation.get("phase")
+            return {
+                "op": op,
+                "phase_status": self.task_manager.get_phase_progress(phase) if phase else None,
+                "overall_progress": self.task_manager.get_overall_progress(),
+                "ready_count": len(self.task_manager.get_ready_tasks(phase))
+            }
+
+        task_ids = operation.get("task_ids") or claimed_ids
+        return {
+            "op": op,
+            "contexts": {
+                task_id: self.prepare_task_execution(task_id, operation.get("context_enhancement",
+                                                                            context_enhancement))
+                for task_id in task_ids
+            }
+        }
+
     def _check_dependencies(self, task: Task) -> Dict[str, Any]:
         """检查任务依赖"""
         missing_dependencies = []
@@ -661,7 +832,7 @@ graph TD
         context = {
             "project_path": str(self.project_path),
             "output_path": task.output_path,
-            "task_metadata": task.metadata or {}
+            "task_metadata": dict(task.metadata or {})
         }
 
         # 文件相关上下文
@@ -748,7 +919,7 @@ graph TD
         """获取阶段上下文"""
         try:
             phase_enum = Phase(phase)
-            progress = self.phase_controller.get_phase_progress_detailed(phase_enum)
+            progress = self.phase_controller.get_phase_summary(phase_enum)
 
             return {
                 "phase": phase,
@@ -823,7 +994,7 @@ graph TD
         return guidance
 
     def _get_task_info(self, task: Optional[Task]) -> Optional[Dict[str, Any]]:
-        """获取任务信息"""
+        """获取任务信息（依赖和元数据为副本，同一批次中后续操作修改任务时不影响已返回的结果）"""
         if not task:
             return None
 
@@ -839,8 +1010,8 @@ graph TD
             "priority": task.priority,
             "status": task.status.value,
             "estimated_time": task.estimated_time,
-            "dependencies": task.dependencies,
-            "metadata": task.metadata
+            "dependencies": list(task.dependencies),
+            "metadata": dict(task.metadata or {})
         }
 
     def _get_next_task(self, current_task: Task) -> Optional[Dict[str, Any]]:
@@ -1235,12 +1406,39 @@ class TaskExecuteTool:
                     },
                     "task_id": {
                         "type": "string",
-                        "description": "要执行的任务ID"
+                        "description": "要执行的任务ID（claim模式不需要）"
                     },
                     "execution_mode": {
                         "type": "string",
-                        "enum": ["prepare", "execute", "complete"],
-                        "description": "执行模式"
+                        "enum": ["prepare", "execute", "complete", "claim", "heartbeat"],
+                        "description": "执行模式：claim领取就绪任务并加租约，heartbeat续租"
+                    },
+                    "worker_id": {
+                        "type": "string",
+                        "description": "工作者标识（claim模式使用，默认按进程号生成）"
+                    },
+                    "batch_size": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "claim模式一次领取的任务数量"
+                    },
+                    "phase": {
+                        "type": "string",
+                        "enum": ["phase_1_files", "phase_2_architecture", "phase_3_project"],
+                        "description": "claim模式只领取指定阶段的任务"
+                    },
+                    "lease_id": {
+                        "type": "string",
+                        "description": "领取任务时返回的租约ID（heartbeat/complete模式使用）"
+                    },
+                    "lease_seconds": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "租约有效期（秒）"
+                    },
+                    "include_context": {
+                        "type": "boolean",
+                        "description": "claim模式是否同时返回每个任务的执行上下文"
                     },
                     "context_enhancement": {
                         "type": "boolean",
@@ -1258,12 +1456,15 @@ class TaskExecuteTool:
                             },
                             "error_message": {
                                 "type": "string"
+                            },
+                            "lease_id": {
+                                "type": "string"
                             }
                         },
                         "description": "任务完成数据（仅在complete模式下使用）"
                     }
                 },
-                "required": ["project_path", "task_id"]
+                "required": ["project_path"]
             }
         }
 
@@ -1289,13 +1490,14 @@ class TaskExecuteTool:
                 self.logger.error(error_msg, {"project_path": project_path})
                 return self._error_response(error_msg)
 
-            if not task_id:
+            # 获取参数
+            execution_mode = arguments.get("execution_mode", "execute")
+
+            if not task_id and execution_mode != "claim":
                 error_msg = "Task ID is required"
                 self.logger.error(error_msg)
                 return self._error_response(error_msg)
 
-            # 获取参数
-            execution_mode = arguments.get("execution_mode", "execute")
             context_enhancement = arguments.get("context_enhancement", True)
             mark_in_progress = arguments.get("mark_in_progress", True)
             completion_data = arguments.get("completion_data", {})
@@ -1315,7 +1517,21 @@ class TaskExecuteTool:
             elif execution_mode == "complete":
                 success = completion_data.get("success", True)
                 error_message = completion_data.get("error_message")
-                result = executor.complete_task(task_id, success, error_message)
+                lease_id = arguments.get("lease_id") or completion_data.get("lease_id")
+                result = executor.complete_task(task_id, success, error_message, lease_id)
+            elif execution_mode == "claim":
+                worker_id = arguments.get("worker_id") or f"worker_{os.getpid()}"
+                result = executor.claim_tasks(worker_id,
+                                              batch_size=arguments.get("batch_size", 1),
+                                              phase=arguments.get("phase"),
+                                              lease_seconds=arguments.get("lease_seconds"),
+                                              include_context=arguments.get("include_context", True),
+                                              context_enhancement=context_enhancement)
+            elif execution_mode == "heartbeat":
+                lease_id = arguments.get("lease_id")
+                if not lease_id:
+                    return self._error_response("Lease ID is required for heartbeat")
+                result = executor.heartbeat_task(task_id, lease_id, arguments.get("lease_seconds"))
             else:
                 return self._error_response(f"Invalid execution mode: {execution_mode}")
 
@@ -1361,9 +1577,12 @@ def main():
 
     parser = argparse.ArgumentParser(description="MCP task_execute tool")
     parser.add_argument("project_path", help="Project path")
-    parser.add_argument("--task-id", required=True, help="Task ID to execute")
-    parser.add_argument("--mode", choices=["prepare", "execute", "complete"],
+    parser.add_argument("--task-id", help="Task ID to execute")
+    parser.add_argument("--mode", choices=["prepare", "execute", "complete", "claim", "heartbeat"],
                         default="execute", help="Execution mode")
+    parser.add_argument("--worker-id", help="Worker ID for claim mode")
+    parser.add_argument("--batch-size", type=int, default=1, help="Number of tasks to claim")
+    parser.add_argument("--lease-id", help="Lease ID for heartbeat/complete mode")
     parser.add_argument("--no-context-enhancement", action="store_true",
                         help="Disable context enhancement")
     parser.add_argument("--no-mark-progress", action="store_true",
@@ -1377,7 +1596,10 @@ def main():
         "task_id": args.task_id,
         "execution_mode": args.mode,
         "context_enhancement": not args.no_context_enhancement,
-        "mark_in_progress": not args.no_mark_progress
+        "mark_in_progress": not args.no_mark_progress,
+        "worker_id": args.worker_id,
+        "batch_size": args.batch_size,
+        "lease_id": args.lease_id
     }
 
     # 执行工具
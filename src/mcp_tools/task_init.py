@@ -7,7 +7,8 @@ import os
 import json
 import time
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
 
 # 添加项目根目录到path以导入其他模块
 project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
@@ -24,9 +25,17 @@ try:
     HAS_CONFIG_MANAGER = True
 except ImportError:
     HAS_CONFIG_MANAGER = False
-    get_file_filtering_config = lambda: None
-    get_file_size_limits_config = lambda: None
-    get_tool_config = lambda x: {}
+    get_file_filtering_config = lambda project_path=None: None
+    get_file_size_limits_config = lambda project_path=None: None
+    get_tool_config = lambda x, project_path=None: {}
+
+
+@dataclass(frozen=True)
+class PlanConfig:
+    """一次任务生成使用的配置（按目标项目解析，调用期间不变）"""
+    file_filters: Dict[str, Any]
+    priority_mapping: Dict[str, List[str]]
+    include_extensions: List[str]
 
 
 class TaskPlanGenerator:
@@ -48,8 +57,10 @@ class TaskPlanGenerator:
             TaskType.PROJECT_README: "project_readme"
         }
 
-        # 加载配置
-        self._load_config()
+        # 加载默认配置（不对应具体项目；初始化后不再修改，每次调用按项目解析自己的配置）
+        self.default_config = self._resolve_config()
+        self.file_filters = self.default_config.file_filters
+        self.priority_mapping = self.default_config.priority_mapping
 
         self.logger.info("TaskPlanGenerator 初始化完成", {
             "template_mapping_count": len(self.template_mapping),
@@ -58,19 +69,21 @@ class TaskPlanGenerator:
             "config_manager_available": HAS_CONFIG_MANAGER
         })
 
-    def _load_config(self):
-        """加载配置"""
+    def _resolve_config(self, project_path: str = None) -> "PlanConfig":
+        """解析配置（提供 project_path 时使用该项目 .codelens/config.json 覆盖后的配置）
+
+        返回新的 PlanConfig，不修改生成器自身的状态，并发调用之间互不影响。
+        """
         if HAS_CONFIG_MANAGER:
             try:
                 # 从配置管理器获取配置
-                filtering_config = get_file_filtering_config()
-                file_size_config = get_file_size_limits_config()
-                tool_config = get_tool_config("task_init")
+                filtering_config = get_file_filtering_config(project_path)
+                file_size_config = get_file_size_limits_config(project_path)
 
                 # 优先级映射（使用配置中的smart_filtering.priority_patterns或默认值）
                 if filtering_config and hasattr(filtering_config, 'smart_filtering'):
                     priority_patterns = filtering_config.smart_filtering.get('priority_patterns', {})
-                    self.priority_mapping = {
+                    priority_mapping = {
                         "high": priority_patterns.get("high", ["main.py", "app.py", "index.js", "server.js", "main.go",
                                                                "main.rs"]),
                         "normal": priority_patterns.get("normal",
@@ -78,11 +91,11 @@ class TaskPlanGenerator:
                         "low": priority_patterns.get("low", ["util", "helper", "test", "spec"])
                     }
                 else:
-                    self._use_default_priority_mapping()
+                    priority_mapping = self._default_priority_mapping()
 
                 # 文件过滤规则（从配置获取）
                 if filtering_config:
-                    self.file_filters = {
+                    file_filters = {
                         "exclude_patterns": filtering_config.exclude_patterns,
                         "exclude_directories": filtering_config.exclude_directories,
                         "min_file_size": file_size_config.min_file_size if file_size_config else 50,
@@ -91,45 +104,49 @@ class TaskPlanGenerator:
                                                                                                      'smart_filtering') else 25
                     }
                 else:
-                    self._use_default_file_filters()
+                    file_filters = self._default_file_filters(project_path)
 
-                self.logger.info("配置加载成功", {
-                    "exclude_patterns_count": len(self.file_filters["exclude_patterns"]),
-                    "exclude_directories_count": len(self.file_filters["exclude_directories"]),
-                    "min_file_size": self.file_filters["min_file_size"],
-                    "max_files_per_project": self.file_filters["max_files_per_project"]
+                self.logger.debug("配置加载成功", {
+                    "project_path": project_path,
+                    "exclude_patterns_count": len(file_filters["exclude_patterns"]),
+                    "exclude_directories_count": len(file_filters["exclude_directories"]),
+                    "min_file_size": file_filters["min_file_size"],
+                    "max_files_per_project": file_filters["max_files_per_project"]
                 })
+                return PlanConfig(file_filters=file_filters, priority_mapping=priority_mapping,
+                                  include_extensions=self._get_include_extensions(project_path))
 
             except Exception as e:
                 self.logger.warning(f"配置加载失败，使用默认值: {e}")
-                self._use_default_config()
         else:
             self.logger.warning("配置管理器不可用，使用默认值")
-            self._use_default_config()
+        return self._default_config(project_path)
 
-    def _use_default_config(self):
+    def _default_config(self, project_path: str = None) -> "PlanConfig":
         """使用默认配置（向后兼容）"""
-        self._use_default_priority_mapping()
-        self._use_default_file_filters()
+        return PlanConfig(file_filters=self._default_file_filters(project_path),
+                          priority_mapping=self._default_priority_mapping(),
+                          include_extensions=self._get_include_extensions(project_path))
 
-    def _use_default_priority_mapping(self):
-        """使用默认优先级映射"""
-        self.priority_mapping = {
+    @staticmethod
+    def _default_priority_mapping() -> Dict[str, List[str]]:
+        """默认优先级映射"""
+        return {
             "high": ["main.py", "app.py", "index.js", "server.js", "main.go", "main.rs"],
             "normal": ["config", "model", "service", "controller", "handler"],
             "low": ["util", "helper", "test", "spec"]
         }
 
-    def _use_default_file_filters(self):
-        """使用默认文件过滤规则 - 优先使用配置系统"""
+    def _default_file_filters(self, project_path: str = None) -> Dict[str, Any]:
+        """默认文件过滤规则 - 优先使用配置系统"""
         # 首先尝试使用配置系统
         if HAS_CONFIG_MANAGER:
             try:
-                filtering_config = get_file_filtering_config()
-                file_size_config = get_file_size_limits_config()
+                filtering_config = get_file_filtering_config(project_path)
+                file_size_config = get_file_size_limits_config(project_path)
                 
                 if filtering_config and file_size_config:
-                    self.file_filters = {
+                    file_filters = {
                         "exclude_patterns": filtering_config.exclude_patterns,
                         "exclude_directories": filtering_config.exclude_directories,
                         "min_file_size": file_size_config.min_file_size,
@@ -137,12 +154,12 @@ class TaskPlanGenerator:
                     }
                     
                     self.logger.info("使用配置系统的过滤规则", {
-                        "exclude_patterns_count": len(self.file_filters["exclude_patterns"]),
-                        "exclude_directories_count": len(self.file_filters["exclude_directories"]),
-                        "min_file_size": self.file_filters["min_file_size"],
-                        "max_files_per_project": self.file_filters["max_files_per_project"]
+                        "exclude_patterns_count": len(file_filters["exclude_patterns"]),
+                        "exclude_directories_count": len(file_filters["exclude_directories"]),
+                        "min_file_size": file_filters["min_file_size"],
+                        "max_files_per_project": file_filters["max_files_per_project"]
                     })
-                    return
+                    return file_filters
                 else:
                     self.logger.warning("配置系统返回空配置，使用默认规则")
             except Exception as e:
@@ -151,7 +168,7 @@ class TaskPlanGenerator:
             self.logger.debug("配置系统不可用，使用默认屏蔽规则")
         
         # 使用默认规则作为后备
-        self.file_filters = {
+        file_filters = {
             "exclude_patterns": [
                 "__init__.py",  # 空的初始化文件
                 "__pycache__",
@@ -196,15 +213,16 @@ class TaskPlanGenerator:
         }
         
         self.logger.info("使用默认过滤规则", {
-            "exclude_patterns_count": len(self.file_filters["exclude_patterns"]),
-            "exclude_directories_count": len(self.file_filters["exclude_directories"])
+            "exclude_patterns_count": len(file_filters["exclude_patterns"]),
+            "exclude_directories_count": len(file_filters["exclude_directories"])
         })
+        return file_filters
 
-    def _get_include_extensions(self) -> List[str]:
+    def _get_include_extensions(self, project_path: str = None) -> List[str]:
         """获取要包含的文件扩展名"""
         if HAS_CONFIG_MANAGER:
             try:
-                filtering_config = get_file_filtering_config()
+                filtering_config = get_file_filtering_config(project_path)
                 if filtering_config and hasattr(filtering_config, 'include_extensions'):
                     return filtering_config.include_extensions
             except Exception as e:
@@ -240,9 +258,10 @@ class TaskPlanGenerator:
             if not analysis_result:
                 raise ValueError("无法加载项目分析数据，请先运行 doc_guide")
 
-            # 2. 智能过滤文件
+            # 2. 智能过滤文件（使用目标项目的过滤规则）
+            config = self._resolve_config(project_path)
             self.logger.info("开始智能文件过滤")
-            filtered_files = self._smart_filter_files(project_path, analysis_result, max_files or 999999)
+            filtered_files = self._smart_filter_files(project_path, analysis_result, max_files or 999999, config)
             self.logger.info(f"文件过滤完成，从原始文件中筛选出 {len(filtered_files)} 个重要文件")
 
             # 3. 更新分析结果中的文件列表
@@ -251,7 +270,7 @@ class TaskPlanGenerator:
             analysis_result["generation_plan"]["phase_1_files"] = filtered_files
 
             # 4. 调用原始的generate_tasks方法
-            return self.generate_tasks(project_path, analysis_result, task_granularity, False, None)
+            return self.generate_tasks(project_path, analysis_result, task_granularity, False, None, config=config)
 
         except Exception as e:
             self.logger.log_operation_end("generate_tasks_auto", operation_id, success=False, error=str(e))
@@ -276,14 +295,16 @@ class TaskPlanGenerator:
             self.logger.error("加载分析数据失败", {"error": str(e), "file_path": str(analysis_file)})
             return None
 
-    def _smart_filter_files(self, project_path: str, analysis_result: Dict[str, Any], max_files: int = 20) -> List[str]:
-        """智能过滤文件"""
+    def _smart_filter_files(self, project_path: str, analysis_result: Dict[str, Any], max_files: int = 20,
+                            config: Optional[PlanConfig] = None) -> List[str]:
+        """智能过滤文件（config 为目标项目的配置，未提供时按 project_path 解析）"""
+        config = config or self._resolve_config(project_path)
         # 获取配置中的包含文件扩展名
         all_files = []
         project_root = Path(project_path)
 
         # 从配置获取要包含的文件扩展名
-        include_extensions = self._get_include_extensions()
+        include_extensions = config.include_extensions
 
         # 按扩展名扫描所有目标文件
         for extension in include_extensions:
@@ -302,7 +323,7 @@ class TaskPlanGenerator:
         # 应用过滤规则
         filtered_files = []
         for file_path in all_files:
-            if self._should_include_file(file_path, project_root):
+            if self._should_include_file(file_path, project_root, config.file_filters):
                 filtered_files.append(file_path)
 
         self.logger.info(f"过滤后剩余 {len(filtered_files)} 个文件")
@@ -315,24 +336,24 @@ class TaskPlanGenerator:
 
         return prioritized_files
 
-    def _should_include_file(self, file_path: str, project_root: Path) -> bool:
+    def _should_include_file(self, file_path: str, project_root: Path, file_filters: Dict[str, Any]) -> bool:
         """判断是否应该包含某个文件"""
         file_path_lower = file_path.lower()
 
         # 检查排除模式
-        for pattern in self.file_filters["exclude_patterns"]:
+        for pattern in file_filters["exclude_patterns"]:
             if pattern in file_path_lower:
                 return False
 
         # 检查排除目录
-        for exclude_dir in self.file_filters["exclude_directories"]:
+        for exclude_dir in file_filters["exclude_directories"]:
             if exclude_dir in file_path_lower:
                 return False
 
         # 检查文件大小
         full_path = project_root / file_path
         try:
-            if full_path.stat().st_size < self.file_filters["min_file_size"]:
+            if full_path.stat().st_size < file_filters["min_file_size"]:
                 return False
         except:
             return False
@@ -405,13 +426,17 @@ class TaskPlanGenerator:
 
     def generate_tasks(self, project_path: str, analysis_result: Dict[str, Any],
                        task_granularity: str = "file", parallel_tasks: bool = False,
-                       custom_priorities: Dict[str, Any] = None) -> Dict[str, Any]:
-        """生成完整的任务计划"""
+                       custom_priorities: Dict[str, Any] = None,
+                       config: Optional[PlanConfig] = None) -> Dict[str, Any]:
+        """生成完整的任务计划（config 为目标项目的配置，未提供时按 project_path 解析）"""
         operation_id = self.logger.log_operation_start("generate_tasks",
                                                        project_path=project_path,
                                                        task_granularity=task_granularity,
                                                        parallel_tasks=parallel_tasks)
 
+        # 过滤和优先级规则以目标项目的配置为准
+        config = config or self._resolve_config(project_path)
+
         self.logger.info("开始生成任务计划", {
             "project_path": project_path,
             "task_granularity": task_granularity,
@@ -436,7 +461,8 @@ class TaskPlanGenerator:
         self.logger.info("开始生成各阶段任务")
 
         self.logger.debug("生成Phase 1任务（文件层）")
-        phase_1_tasks = self._generate_phase_1_tasks(project_path, plan, custom_priorities)
+        phase_1_tasks = self._generate_phase_1_tasks(project_path, plan, custom_priorities,
+                                                     config.priority_mapping)
         self.logger.info("Phase 1任务生成完成", {"task_count": len(phase_1_tasks)})
 
         self.logger.debug("生成Phase 2任务（架构层）")
@@ -497,7 +523,8 @@ class TaskPlanGenerator:
         return result
 
     def _generate_phase_1_tasks(self, project_path: str, plan: Dict[str, Any],
-                                custom_priorities: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+                                custom_priorities: Dict[str, Any] = None,
+                                priority_mapping: Optional[Dict[str, List[str]]] = None) -> List[Dict[str, Any]]:
         """生成第一阶段任务（文件层）"""
         tasks = []
         files_to_process = plan.get("phase_1_files", [])
@@ -506,7 +533,7 @@ class TaskPlanGenerator:
             task_id = f"file_summary_{int(time.time() * 1000)}_{i}"
 
             # 确定优先级
-            priority = self._get_file_priority(file_path, custom_priorities)
+            priority = self._get_file_priority(file_path, custom_priorities, priority_mapping)
 
             # 生成输出路径
             output_path = f"docs/files/summaries/{file_path}.md"
@@ -693,25 +720,28 @@ class TaskPlanGenerator:
 
         return tasks
 
-    def _get_file_priority(self, file_path: str, custom_priorities: Dict[str, Any] = None) -> str:
-        """确定文件优先级"""
+    def _get_file_priority(self, file_path: str, custom_priorities: Dict[str, Any] = None,
+                           priority_mapping: Optional[Dict[str, List[str]]] = None) -> str:
+        """确定文件优先级（priority_mapping 默认为不对应具体项目的默认配置）"""
         if custom_priorities and file_path in custom_priorities:
             return custom_priorities[file_path]
 
+        priority_mapping = priority_mapping or self.priority_mapping
+
         file_lower = file_path.lower()
 
         # 检查高优先级模式
-        for pattern in self.priority_mapping["high"]:
+        for pattern in priority_mapping["high"]:
             if pattern in file_lower:
                 return "high"
 
         # 检查普通优先级模式
-        for pattern in self.priority_mapping["normal"]:
+        for pattern in priority_mapping["normal"]:
             if pattern in file_lower:
                 return "normal"
 
         # 检查低优先级模式
-        for pattern in self.priority_mapping["low"]:
+        for pattern in priority_mapping["low"]:
             if pattern in file_lower:
                 return "low"
 
@@ -728,27 +758,38 @@ class TaskPlanGenerator:
 
         return graph
 
-    def create_tasks_in_manager(self, task_manager: TaskManager, task_plan: Dict[str, Any]) -> int:
-        """在任务管理器中创建所有任务"""
+    def create_tasks_in_manager(self, task_manager: TaskManager, task_plan: Dict[str, Any]) -> Dict[str, Any]:
+        """在任务管理器中创建所有任务
+
+        依赖无法解析的任务（以及依赖它们的任务）在创建前被剔除并记录在 errors 中，
+        其余任务照常创建；持久化失败时异常直接抛给调用方。
+
+        Returns:
+            {"created_count", "existing_count", "expected_count", "skipped_count", "error_count", "errors"}
+            已存在的任务（重复运行 task_init 时）计入 existing_count，不计入 created_count
+        """
         operation_id = self.logger.log_operation_start("create_tasks_in_manager")
+        result = {"created_count": 0, "existing_count": 0, "expected_count": 0, "skipped_count": 0,
+                  "error_count": 0, "errors": []}
 
         # 检查task_plan是否有效
         if task_plan is None:
             self.logger.error("task_plan为None，无法创建任务")
             self.logger.log_operation_end("create_tasks_in_manager", operation_id, success=False,
                                           error="task_plan is None")
-            return 0
+            result["errors"].append({"error": "task_plan is None"})
+            result["error_count"] = 1
+            return result
 
         self.logger.info("开始在任务管理器中创建任务", {
             "operation_id": operation_id,
             "total_phases": len([p for p in task_plan.keys() if p.startswith("phase_")])
         })
 
-        created_count = 0
         skipped_count = 0
-        error_count = 0
+        task_specs = []
 
-        # 按阶段顺序创建任务
+        # 按阶段顺序收集任务
         phases = ["phase_1_files", "phase_2_architecture", "phase_3_project"]
 
         for phase in phases:
@@ -760,7 +801,6 @@ class TaskPlanGenerator:
                 for task_data in tasks:
                     # 转换任务类型
                     task_type_str = task_data["type"]
-                    self.logger.debug("处理任务", {"task_type": task_type_str, "task_id": task_data.get("id")})
 
                     try:
                         task_type = TaskType(task_type_str)
@@ -768,49 +808,88 @@ class TaskPlanGenerator:
                         # 如果无法转换，跳过此任务
                         self.logger.warning(f"跳过无效任务类型: {task_type_str}", {"error": str(e)})
                         skipped_count += 1
+                        result["errors"].append({"task_id": task_data.get("id"),
+                                                 "error": f"Invalid task type: {task_type_str}"})
                         continue
 
-                    try:
-                        # 传入预定义task_id确保依赖关系一致性
-                        task_id = task_manager.create_task(
-                            task_type=task_type,
-                            description=task_data["description"],
-                            phase=task_data["phase"],
-                            target_file=task_data.get("target_file"),
-                            target_module=task_data.get("target_module"),
-                            template_name=task_data.get("template"),
-                            output_path=task_data.get("output_path"),
-                            dependencies=task_data.get("dependencies", []),
-                            priority=task_data.get("priority", "normal"),
-                            estimated_time=task_data.get("estimated_time"),
-                            metadata=task_data.get("metadata", {}),
-                            task_id=task_data["id"]  # 使用预定义的task_id
-                        )
-
-                        created_count += 1
-                        self.logger.debug("任务创建成功", {"task_id": task_id, "type": task_type_str})
-
-                    except Exception as e:
-                        self.logger.error("创建任务失败", {
-                            "task_description": task_data.get('description', 'Unknown'),
-                            "error": str(e)
-                        })
-                        error_count += 1
-                        continue
+                    # 传入预定义task_id确保依赖关系一致性
+                    task_specs.append({
+                        "task_type": task_type,
+                        "description": task_data["description"],
+                        "phase": task_data["phase"],
+                        "target_file": task_data.get("target_file"),
+                        "target_module": task_data.get("target_module"),
+                        "template_name": task_data.get("template"),
+                        "output_path": task_data.get("output_path"),
+                        "dependencies": task_data.get("dependencies", []),
+                        "priority": task_data.get("priority", "normal"),
+                        "estimated_time": task_data.get("estimated_time"),
+                        "metadata": task_data.get("metadata", {}),
+                        "task_id": task_data["id"]  # 使用预定义的task_id
+                    })
+
+        expected_count = len(task_specs) + skipped_count
+
+        # 依赖无法解析的任务单独剔除，不影响其余任务
+        task_specs, dependency_errors = self._drop_unresolved_dependencies(task_manager, task_specs)
+        for error in dependency_errors:
+            self.logger.warning("跳过依赖无法解析的任务", error)
+        result["errors"].extend(dependency_errors)
+        error_count = len(result["errors"])
+
+        # 一次性批量创建并持久化
+        try:
+            bulk_result = task_manager.create_tasks_bulk(task_specs)
+        except Exception as e:
+            self.logger.error("批量创建任务失败", {
+                "task_count": len(task_specs),
+                "error": str(e)
+            })
+            self.logger.log_operation_end("create_tasks_in_manager", operation_id, success=False, error=str(e))
+            raise
+        created_count = len(bulk_result["created_ids"])
+        existing_count = len(bulk_result["existing_ids"])
+        self.logger.debug("批量任务创建成功", {"created": created_count, "existing": existing_count})
 
-        self.logger.log_operation_end("create_tasks_in_manager", operation_id, success=True,
+        self.logger.log_operation_end("create_tasks_in_manager", operation_id, success=error_count == 0,
                                       created_count=created_count,
+                                      existing_count=existing_count,
                                       skipped_count=skipped_count,
                                       error_count=error_count)
 
         self.logger.info("任务创建完成", {
             "created": created_count,
+            "existing": existing_count,
             "skipped": skipped_count,
             "errors": error_count,
-            "total_processed": created_count + skipped_count + error_count
+            "expected": expected_count
         })
 
-        return created_count
+        result.update(created_count=created_count, existing_count=existing_count, expected_count=expected_count,
+                      skipped_count=skipped_count, error_count=error_count)
+        return result
+
+    @staticmethod
+    def _drop_unresolved_dependencies(task_manager: TaskManager,
+                                      task_specs: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """剔除依赖既不在管理器中、也不在本批有效任务中的任务（传递剔除），返回 (有效任务, 错误列表)"""
+        valid_ids = {spec["task_id"] for spec in task_specs}
+        errors = []
+        changed = True
+        while changed:
+            changed = False
+            for spec in task_specs:
+                task_id = spec["task_id"]
+                if task_id not in valid_ids:
+                    continue
+                missing = [dep_id for dep_id in spec.get("dependencies") or []
+                           if dep_id not in valid_ids and task_manager.get_task(dep_id) is None]
+                if missing:
+                    valid_ids.discard(task_id)
+                    errors.append({"task_id": task_id, "error": "Unresolved dependencies",
+                                   "missing_dependencies": missing})
+                    changed = True
+        return [spec for spec in task_specs if spec["task_id"] in valid_ids], errors
 
 
 class TaskInitTool:
@@ -950,10 +1029,12 @@ class TaskInitTool:
 
             # 如果需要，在任务管理器中创建任务
             created_count = 0
+            creation_result = None
             if create_in_manager:
                 self.logger.info("开始在任务管理器中创建任务")
                 task_manager = TaskManager(project_path)
-                created_count = self.generator.create_tasks_in_manager(task_manager, task_plan)
+                creation_result = self.generator.create_tasks_in_manager(task_manager, task_plan)
+                created_count = creation_result["created_count"]
                 self.logger.info("任务已创建在管理器中", {"created_count": created_count})
 
             # 安全地访问task_plan数据
@@ -971,7 +1052,12 @@ class TaskInitTool:
             if create_in_manager:
                 response_data["manager_info"] = {
                     "tasks_created": created_count,
-                    "creation_successful": True
+                    "tasks_existing": creation_result["existing_count"],
+                    "tasks_expected": creation_result["expected_count"],
+                    "creation_successful": (creation_result["error_count"] == 0
+                                            and created_count + creation_result["existing_count"]
+                                            == creation_result["expected_count"]),
+                    "errors": creation_result["errors"][:20]
                 }
 
             return self._success_response(response_data)
@@ -55,6 +55,28 @@ class TaskStatusTool:
                     "task_id": {
                         "type": "string",
                         "description": "特定任务ID（用于查询特定任务状态）"
+                    },
+                    "include_tasks": {
+                        "type": "boolean",
+                        "description": "phase_progress 是否返回任务列表（默认true，false时只返回计数摘要）"
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "任务列表分页游标（使用上一页返回的 next_cursor）"
+                    },
+                    "page_size": {
+                        "type": "number",
+                        "description": "任务列表每页数量（默认50，超出 1-500 时取边界值）"
+                    },
+                    "fields": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "任务列表返回的字段（默认 id/type/description/status/target_file/target_module/priority）"
+                    },
+                    "concurrency": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "并行执行任务的工作者数量，用于预测剩余时间（默认1）"
                     }
                 },
                 "required": []
@@ -109,9 +131,19 @@ class TaskStatusTool:
             if check_type == "current_task":
                 result = self._check_current_task(task_manager, phase_controller, phase_filter)
             elif check_type == "phase_progress":
-                result = self._check_phase_progress(phase_controller, phase_filter, detailed_analysis)
+                pagination_error = self._validate_pagination(arguments.get("cursor"), arguments.get("page_size"))
+                if pagination_error:
+                    self.logger.log_operation_end("execute_task_status", operation_id, success=False,
+                                                  error=pagination_error)
+                    return self._error_response(pagination_error)
+                result = self._check_phase_progress(phase_controller, phase_filter, detailed_analysis,
+                                                    include_tasks=arguments.get("include_tasks", True),
+                                                    cursor=arguments.get("cursor"),
+                                                    page_size=arguments.get("page_size"),
+                                                    fields=arguments.get("fields"))
             elif check_type == "overall_status":
-                result = self._check_overall_status(task_manager, phase_controller, state_tracker, detailed_analysis)
+                result = self._check_overall_status(task_manager, phase_controller, state_tracker, detailed_analysis,
+                                                    concurrency=arguments.get("concurrency", 1))
             elif check_type == "next_actions":
                 result = self._get_next_actions(task_manager, phase_controller)
             elif check_type == "health_check":
@@ -137,6 +169,18 @@ class TaskStatusTool:
             self.logger.error(f"状态检查失败: {str(e)}", exc_info=e)
             return self._error_response(f"Status check failed: {str(e)}")
 
+    @staticmethod
+    def _validate_pagination(cursor: Any, page_size: Any) -> Optional[str]:
+        """校验分页参数，返回错误信息（合法时为 None）"""
+        try:
+            PhaseController.parse_cursor(cursor)
+        except ValueError:
+            return f"Invalid cursor: {cursor}"
+        if page_size is not None and (isinstance(page_size, bool) or not isinstance(page_size, (int, float))
+                                      or page_size != int(page_size)):
+            return f"Invalid page_size: {page_size}"
+        return None
+
     def _check_current_task(self, task_manager: TaskManager, phase_controller: PhaseController,
                             phase_filter: Optional[str]) -> Dict[str, Any]:
         """检查当前任务"""
@@ -160,8 +204,8 @@ class TaskStatusTool:
         if not current_task:
             # 检查是否有进行中的任务
             self.logger.debug("未找到待执行任务，检查进行中的任务")
-            in_progress_tasks = [t for t in task_manager.tasks.values()
-                                 if t.status == TaskStatus.IN_PROGRESS and t.phase == target_phase]
+            in_progress_tasks = [t for t in task_manager.get_tasks_by_status(TaskStatus.IN_PROGRESS)
+                                 if t.phase == target_phase]
             self.logger.debug("进行中任务检查结果", {"in_progress_count": len(in_progress_tasks)})
 
             if in_progress_tasks:
@@ -210,24 +254,33 @@ class TaskStatusTool:
         }
 
     def _check_phase_progress(self, phase_controller: PhaseController, phase_filter: Optional[str],
-                              detailed: bool) -> Dict[str, Any]:
+                              detailed: bool, include_tasks: bool = True, cursor: Optional[str] = None,
+                              page_size: Optional[int] = None,
+                              fields: Optional[List[str]] = None) -> Dict[str, Any]:
         """检查阶段进度"""
         self.logger.debug("开始检查阶段进度", {"phase_filter": phase_filter, "detailed": detailed})
         
         if phase_filter:
             try:
-                self.logger.debug("检查特定阶段进度", {"phase_filter": phase_filter})
+                self.logger.debug("检查特定阶段进度", {"phase_filter": phase_filter, "cursor": cursor})
                 phase = Phase(phase_filter)
-                progress = phase_controller.get_phase_progress_detailed(phase)
-                self.logger.debug("特定阶段进度检查完成")
-                return {
-                    "phase_filter": phase_filter,
-                    "phase_progress": progress
-                }
             except ValueError:
                 error_msg = f"Invalid phase: {phase_filter}"
                 self.logger.error(error_msg)
                 return {"error": error_msg}
+
+            progress = phase_controller.get_phase_progress_detailed(
+                phase,
+                include_tasks=include_tasks,
+                cursor=cursor,
+                limit=page_size,
+                fields=fields
+            )
+            self.logger.debug("特定阶段进度检查完成")
+            return {
+                "phase_filter": phase_filter,
+                "phase_progress": progress
+            }
         else:
             # 获取所有阶段概览
             self.logger.debug("获取所有阶段概览")
@@ -254,7 +307,7 @@ class TaskStatusTool:
                 return simplified
 
     def _check_overall_status(self, task_manager: TaskManager, phase_controller: PhaseController,
-                              state_tracker: StateTracker, detailed: bool) -> Dict[str, Any]:
+                              state_tracker: StateTracker, detailed: bool, concurrency: int = 1) -> Dict[str, Any]:
         """检查总体状态"""
         self.logger.debug("开始检查总体状态", {"detailed": detailed})
         
@@ -265,22 +318,23 @@ class TaskStatusTool:
 
         # 获取任务统计
         self.logger.debug("计算任务统计信息")
-        all_tasks = list(task_manager.tasks.values())
+        status_counts = task_manager.get_status_counts()
         task_stats = {
-            "total": len(all_tasks),
-            "completed": len([t for t in all_tasks if t.status == TaskStatus.COMPLETED]),
-            "in_progress": len([t for t in all_tasks if t.status == TaskStatus.IN_PROGRESS]),
-            "pending": len([t for t in all_tasks if t.status == TaskStatus.PENDING]),
-            "failed": len([t for t in all_tasks if t.status == TaskStatus.FAILED]),
-            "blocked": len([t for t in all_tasks if t.status == TaskStatus.BLOCKED])
+            "total": len(task_manager.tasks),
+            "completed": status_counts[TaskStatus.COMPLETED.value],
+            "in_progress": status_counts[TaskStatus.IN_PROGRESS.value],
+            "pending": status_counts[TaskStatus.PENDING.value],
+            "failed": status_counts[TaskStatus.FAILED.value],
+            "blocked": status_counts[TaskStatus.BLOCKED.value]
         }
         self.logger.debug("任务统计计算完成", task_stats)
 
+        eta_forecast = state_tracker.get_eta_forecast(concurrency)
         result = {
             "overall_progress": overall_progress,
             "current_phase": current_phase.value if current_phase else None,
             "task_statistics": task_stats,
-            "estimated_remaining": self._estimate_remaining_time(task_manager, current_phase)
+            "estimated_remaining": eta_forecast["eta"]
         }
 
         if detailed:
@@ -288,6 +342,7 @@ class TaskStatusTool:
             self.logger.debug("获取详细状态信息")
             current_status = state_tracker.get_current_status()
             result.update({
+                "eta_forecast": eta_forecast,
                 "phase_overview": current_status["phase_overview"],
                 "execution_statistics": current_status["execution_statistics"],
                 "health_status": current_status["health_check"]
@@ -461,26 +516,6 @@ class TaskStatusTool:
             "can_execute": dependencies_satisfied and task.status == TaskStatus.PENDING
         }
 
-    def _estimate_remaining_time(self, task_manager: TaskManager, current_phase: Optional[Phase]) -> str:
-        """估计剩余时间"""
-        remaining_tasks = [t for t in task_manager.tasks.values()
-                           if t.status in [TaskStatus.PENDING, TaskStatus.IN_PROGRESS]]
-
-        if not remaining_tasks:
-            return "0 minutes"
-
-        # 简单估算：每个任务平均5分钟
-        estimated_minutes = len(remaining_tasks) * 5
-
-        hours = estimated_minutes // 60
-        minutes = estimated_minutes % 60
-
-        if hours > 0:
-            return f"{hours} hours {minutes} minutes"
-        else:
-            return f"{minutes} minutes"
-
-
     def _success_response(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """成功响应"""
         self.logger.debug("生成成功响应", {"data_keys": list(data.keys()) if data else []})
@@ -0,0 +1,269 @@
+"""
+MCP 工具注册表：延迟导入工具模块并按需创建实例
+
+- 工具定义来自静态清单 tool_manifest.json，list_tools 无需导入任何工具模块
+- 清单记录每个工具模块源文件的内容摘要，由开发脚本生成并随代码提交：
+    python -m src.mcp_tools.tool_registry           # 重新生成清单
+    python -m src.mcp_tools.tool_registry --check   # 清单过期时以非零状态退出（CI）
+- 运行时只读取清单，定义在首次读取后缓存在内存中；某个工具的摘要与源文件
+  不一致时记录警告，并在内存中由工具实例生成该工具的定义，不写回安装目录
+- 工具模块在首次调用时才导入，实例在首次调用时才创建
+- 记录每个工具的导入耗时和实例化耗时，供启动性能分析使用
+- 热重载后只重建受影响的工具，并把旧实例中仍然有效的状态迁移到新实例
+"""
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# 工具名 -> (模块, 类名)，顺序即 list_tools 返回的顺序
+TOOL_MODULES: Dict[str, Tuple[str, str]] = {
+    # 原有的文档模式工具
+    "init_tools": ("src.mcp_tools.init_tools", "InitTools"),
+    "doc_guide": ("src.mcp_tools.doc_guide", "DocGuideTool"),
+    "task_init": ("src.mcp_tools.task_init", "TaskInitTool"),
+    "task_execute": ("src.mcp_tools.task_execute", "TaskExecuteTool"),
+    "task_batch": ("src.mcp_tools.task_batch", "TaskBatchTool"),
+    "task_status": ("src.mcp_tools.task_status", "TaskStatusTool"),
+    "task_complete": ("src.mcp_tools.task_complete", "TaskCompleteTool"),
+    "project_overview": ("src.mcp_tools.project_overview", "ProjectOverviewTool"),
+    "doc_sync": ("src.mcp_tools.doc_sync", "DocSyncTool"),
+    "response_continue": ("src.mcp_tools.response_continue", "ResponseContinueTool"),
+    "server_metrics": ("src.mcp_tools.server_metrics", "ServerMetricsTool"),
+
+    # 创造模式工具
+    "create_guide": ("src.mcp_tools.create_guide", "CreateGuideTool"),
+    "create_requirement": ("src.mcp_tools.create_requirement", "CreateRequirementTool"),
+    "create_analysis": ("src.mcp_tools.create_analysis", "CreateAnalysisTool"),
+    "create_todo": ("src.mcp_tools.create_todo", "CreateTodoTool")
+}
+
+MANIFEST_FILE = Path(__file__).parent / "tool_manifest.json"
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+
+
+class ToolRegistry:
+    """延迟加载的工具注册表（支持 in / [] / len，与原来的工具字典用法一致）"""
+
+    def __init__(self, tool_modules: Optional[Dict[str, Tuple[str, str]]] = None,
+                 manifest_file: Path = MANIFEST_FILE):
+        self.tool_modules = dict(tool_modules or TOOL_MODULES)
+        self.manifest_file = Path(manifest_file)
+        self.instances: Dict[str, Any] = {}
+        self.timings: Dict[str, Dict[str, float]] = {}  # 工具名 -> 导入/实例化耗时（毫秒）
+        self.instance_callbacks: List[Callable[[str, Any], None]] = []
+        self._manifest: Optional[Dict[str, Any]] = None
+        self._definitions: Dict[str, Dict[str, Any]] = {}  # 工具名 -> 已确认的定义
+        self._lock = threading.RLock()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.tool_modules
+
+    def __getitem__(self, name: str) -> Any:
+        return self.get(name)
+
+    def __len__(self) -> int:
+        return len(self.tool_modules)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.tool_modules)
+
+    def names(self) -> List[str]:
+        """所有已注册的工具名"""
+        return list(self.tool_modules)
+
+    def get(self, name: str) -> Any:
+        """获取工具实例，首次调用时导入模块并创建实例"""
+        instance = self.instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            instance = self.instances.get(name)
+            if instance is not None:
+                return instance
+            instance = self._create_instance(name)
+            self.instances[name] = instance
+        for callback in self.instance_callbacks:
+            callback(name, instance)
+        return instance
+
+    def loaded_items(self) -> List[Tuple[str, Any]]:
+        """已创建的工具实例"""
+        return list(self.instances.items())
+
+    def add_instance_callback(self, callback: Callable[[str, Any], None]):
+        """注册实例创建回调（例如注册到热重载管理器）"""
+        self.instance_callbacks.append(callback)
+
+    def reset_instances(self, names: Optional[List[str]] = None):
+        """丢弃工具实例，下次调用时重新创建（names 为空表示全部）"""
+        with self._lock:
+            for name in (names if names is not None else list(self.instances)):
+                self.instances.pop(name, None)
+                self._definitions.pop(name, None)
+
+    def swap_instances(self, names: List[str], reloaded_modules: List[str] = ()) -> List[str]:
+        """用重载后的类重建指定工具的实例并迁移旧实例的状态，返回已重建的工具名
+
+        尚未创建实例的工具不需要处理，首次调用时自然使用新模块。
+        """
+        swapped = []
+        for name in names:
+            with self._lock:
+                # 模块已重载，缓存的定义可能过期，下次读取时重新确认
+                self._definitions.pop(name, None)
+                old_instance = self.instances.get(name)
+                if old_instance is None:
+                    continue
+                new_instance = self._create_instance(name)
+                self.migrate_state(old_instance, new_instance, reloaded_modules)
+                self.instances[name] = new_instance
+            for callback in self.instance_callbacks:
+                callback(name, new_instance)
+            swapped.append(name)
+        return swapped
+
+    @staticmethod
+    def migrate_state(old_instance: Any, new_instance: Any, reloaded_modules: List[str] = ()):
+        """把旧实例的状态迁移到新实例
+
+        新实例中同名属性的类型与旧值完全相同（同一个类对象，即定义它的模块未被重载）
+        时沿用旧值，保留已加载的服务、配置和缓存；基础类型和被重载模块中的对象以新
+        构造的为准。工具类可以定义 migrate_state(old_instance) 做额外的迁移。
+        """
+        reloaded = set(reloaded_modules)
+        new_state = vars(new_instance)
+        for attr, old_value in vars(old_instance).items():
+            if attr not in new_state:
+                continue
+            value_type = type(old_value)
+            if (value_type.__module__ == "builtins" or value_type.__module__ in reloaded
+                    or type(new_state[attr]) is not value_type):
+                continue
+            new_state[attr] = old_value
+
+        hook = getattr(new_instance, "migrate_state", None)
+        if callable(hook):
+            hook(old_instance)
+
+    def get_definitions(self) -> List[Dict[str, Any]]:
+        """按注册顺序返回所有工具定义（首次读取后缓存，热重载时失效）
+
+        清单中摘要与源文件一致的工具直接使用清单中的定义；不一致时（开发中修改了
+        工具模块但未重新生成清单）记录警告并由工具实例生成定义，只保存在内存中。
+        """
+        with self._lock:
+            for name in self.tool_modules:
+                if name not in self._definitions:
+                    self._definitions[name] = self._resolve_definition(name)
+            return [self._definitions[name] for name in self.tool_modules]
+
+    def build_manifest(self) -> Dict[str, Any]:
+        """导入全部工具并生成清单内容（开发脚本使用）"""
+        return {
+            "tools": {
+                name: {
+                    "source": self._source_stamp(name),
+                    "definition": self.get(name).get_tool_definition()
+                }
+                for name in self.tool_modules
+            }
+        }
+
+    def stale_tools(self) -> List[str]:
+        """清单中缺失或摘要与源文件不一致的工具"""
+        tools = self._load_manifest().get("tools", {})
+        return [name for name in self.tool_modules
+                if tools.get(name, {}).get("source") != self._source_stamp(name)]
+
+    def load_all(self) -> Dict[str, Any]:
+        """导入并实例化全部工具"""
+        for name in self.tool_modules:
+            self.get(name)
+        return dict(self.instances)
+
+    def _create_instance(self, name: str) -> Any:
+        module_name, class_name = self.tool_modules[name]
+
+        start = time.perf_counter()
+        # 已导入的模块直接使用 sys.modules 中的对象（热重载后即为新版本）
+        module = sys.modules.get(module_name) or importlib.import_module(module_name)
+        imported = time.perf_counter()
+        instance = getattr(module, class_name)()
+        created = time.perf_counter()
+
+        self.timings[name] = {
+            "import_ms": round((imported - start) * 1000, 2),
+            "instantiate_ms": round((created - imported) * 1000, 2)
+        }
+
+        from ..services.metrics_registry import get_metrics_registry
+        metrics = get_metrics_registry()
+        metrics.set_gauge("tool_import_seconds", imported - start, {"tool": name},
+                          help="Time to import a tool module on first use")
+        metrics.set_gauge("tool_instantiate_seconds", created - imported, {"tool": name},
+                          help="Time to create a tool instance on first use")
+        return instance
+
+    def _source_stamp(self, name: str) -> Optional[str]:
+        """工具模块源文件的内容摘要（不受检出时间影响）"""
+        module_path = PROJECT_ROOT / (self.tool_modules[name][0].replace(".", os.sep) + ".py")
+        try:
+            return hashlib.sha1(module_path.read_bytes()).hexdigest()
+        except FileNotFoundError:
+            return None
+
+    def _resolve_definition(self, name: str) -> Dict[str, Any]:
+        entry = self._load_manifest().get("tools", {}).get(name)
+        if entry is not None and entry.get("source") == self._source_stamp(name):
+            return entry["definition"]
+
+        from ..logging import get_logger
+        get_logger(component="ToolRegistry").warning(
+            f"工具清单已过期，在内存中生成定义: {name}（运行 python -m src.mcp_tools.tool_registry 重新生成清单）")
+        return self.get(name).get_tool_definition()
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        if self._manifest is None:
+            try:
+                with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                    self._manifest = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._manifest = {"tools": {}}
+        return self._manifest
+
+
+
+def main():
+    """命令行入口：生成或检查工具清单（开发和 CI 使用，运行时不写清单）"""
+    parser = argparse.ArgumentParser(description="CodeLens 工具清单生成")
+    parser.add_argument("--check", action="store_true",
+                        help="只检查清单是否与工具源文件一致，不一致时以状态码 1 退出")
+    args = parser.parse_args()
+
+    registry = ToolRegistry()
+    if args.check:
+        stale = registry.stale_tools()
+        if stale:
+            print(f"工具清单已过期: {', '.join(stale)}")
+            print("运行 python -m src.mcp_tools.tool_registry 重新生成")
+            sys.exit(1)
+        print("工具清单是最新的")
+        return
+
+    from ..services.state_store import StateStore
+    StateStore.atomic_write_text(registry.manifest_file,
+                                 json.dumps(registry.build_manifest(), indent=2, ensure_ascii=False),
+                                 durable=False)
+    print(f"已生成工具清单: {registry.manifest_file}")
+
+
+if __name__ == "__main__":
+    main()
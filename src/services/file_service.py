@@ -9,6 +9,8 @@ from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Optional, Any, Union, Tuple
 
+from .metrics_registry import get_metrics_registry
+
 # 导入日志系统、大文件处理器和配置管理器
 try:
     from ..logging import get_logger
@@ -39,8 +41,8 @@ except ImportError:
 
 
     get_logger = lambda **kwargs: DummyLogger()
-    get_file_filtering_config = lambda: None
-    get_file_size_limits_config = lambda: None
+    get_file_filtering_config = lambda project_path=None: None
+    get_file_size_limits_config = lambda project_path=None: None
 
 
 class FileService:
@@ -142,31 +144,47 @@ class FileService:
             self.logger.warning(f"无法读取配置文件，使用默认扩展名: {e}")
         return [".py"]
 
-    def scan_source_files(self, project_path: str, extensions: List[str] = None,
-                          exclude_patterns: List[str] = None) -> List[str]:
-        """扫描项目中的源代码文件"""
-        if extensions is None:
-            extensions = self.default_extensions
-
-        if exclude_patterns is None:
-            exclude_patterns = self.default_excludes
-
-        source_files = []
-        project_path = Path(project_path)
-
-        # 扫描指定扩展名的文件
-        for ext in extensions:
-            pattern = f"**/*{ext}"
-            files = list(project_path.glob(pattern))
-            source_files.extend(files)
+    def project_filters(self, project_path: str, filtering_config=None) -> Tuple[List[str], List[str]]:
+        """项目的 (扩展名, 排除模式)：使用传入的或该项目的过滤配置，不可用时使用默认值"""
+        if filtering_config is None and HAS_CONFIG_MANAGER:
+            try:
+                filtering_config = get_file_filtering_config(project_path)
+            except Exception as e:
+                self.logger.warning(f"项目配置加载失败，使用默认值: {e}")
+        if filtering_config is None:
+            return self.default_extensions, self.default_excludes
+        return filtering_config.include_extensions, filtering_config.exclude_patterns
 
-        # 过滤排除的文件和目录
-        filtered_files = []
-        for file_path in source_files:
-            if self._should_exclude(file_path, exclude_patterns):
-                continue
-            filtered_files.append(str(file_path))
+    def scan_source_files(self, project_path: str, extensions: List[str] = None,
+                          exclude_patterns: List[str] = None, filtering_config=None) -> List[str]:
+        """扫描项目中的源代码文件（未指定的规则取自该项目的过滤配置）"""
+        if extensions is None or exclude_patterns is None:
+            project_extensions, project_excludes = self.project_filters(project_path, filtering_config)
+            if extensions is None:
+                extensions = project_extensions
+            if exclude_patterns is None:
+                exclude_patterns = project_excludes
+
+        metrics = get_metrics_registry()
+        with metrics.timer("scan_source_files_seconds", help="FileService.scan_source_files duration"):
+            source_files = []
+            project_path = Path(project_path)
+
+            # 扫描指定扩展名的文件
+            for ext in extensions:
+                pattern = f"**/*{ext}"
+                files = list(project_path.glob(pattern))
+                source_files.extend(files)
+
+            # 过滤排除的文件和目录
+            filtered_files = []
+            for file_path in source_files:
+                if self._should_exclude(file_path, exclude_patterns):
+                    continue
+                filtered_files.append(str(file_path))
 
+        metrics.inc("scanned_paths_total", len(source_files), help="Paths matched by extension globs before filtering")
+        metrics.set_gauge("last_scan_source_files", len(filtered_files), help="Source files returned by the last scan")
         return sorted(filtered_files)
 
     def read_file_safe(self, file_path: str, max_size: int = 122880) -> Optional[str]:
@@ -268,6 +286,7 @@ class FileService:
 
     def scan_directory_structure(self, project_path: str, max_depth: int = 3) -> Dict:
         """扫描目录结构，返回层次化的目录信息"""
+        exclude_patterns = self.project_filters(project_path)[1]
         project_path = Path(project_path)
 
         def _scan_dir(path: Path, current_depth: int = 0) -> Dict:
@@ -283,7 +302,7 @@ class FileService:
             try:
                 items = sorted(path.iterdir(), key=lambda x: (x.is_file(), x.name.lower()))
                 for item in items:
-                    if self._should_exclude(item, self.default_excludes):
+                    if self._should_exclude(item, exclude_patterns):
                         continue
 
                     if item.is_dir():
@@ -390,6 +409,7 @@ class FileService:
 
     def get_directory_tree(self, project_path: str, max_depth: int = 3) -> Dict[str, Any]:
         """获取优化的目录树结构，专为Claude Code设计"""
+        exclude_patterns = self.project_filters(project_path)[1]
         project_path = Path(project_path)
 
         def _build_tree(path: Path, current_depth: int = 0) -> Dict[str, Any]:
@@ -419,7 +439,7 @@ class FileService:
                 try:
                     items = sorted(path.iterdir(), key=lambda x: (x.is_file(), x.name.lower()))
                     for item in items:
-                        if self._should_exclude(item, self.default_excludes):
+                        if self._should_exclude(item, exclude_patterns):
                             continue
 
                         child = _build_tree(item, current_depth + 1)
@@ -438,7 +458,7 @@ class FileService:
 
     def get_project_files_info(self, project_path: str, include_content: bool = True,
                                extensions: List[str] = None, exclude_patterns: List[str] = None,
-                               max_file_size: int = 122880) -> Dict[str, Any]:
+                               max_file_size: int = 122880, filtering_config=None) -> Dict[str, Any]:
         """获取项目文件的完整信息，为Claude Code提供结构化数据"""
 
         # 开始操作日志记录
@@ -454,9 +474,12 @@ class FileService:
             project_info = self.get_project_info(project_path)
 
             # 扫描源代码文件
+            project_extensions, project_excludes = self.project_filters(project_path, filtering_config)
+            extensions = extensions or project_extensions
+            exclude_patterns = exclude_patterns or project_excludes
             self.logger.debug("扫描项目源代码文件", {
-                "extensions": extensions or self.default_extensions,
-                "exclude_patterns": exclude_patterns or self.default_excludes
+                "extensions": extensions,
+                "exclude_patterns": exclude_patterns
             })
             source_files = self.scan_source_files(project_path, extensions, exclude_patterns)
 
@@ -514,8 +537,8 @@ class FileService:
                 'directory_tree': directory_tree,
                 'statistics': statistics,
                 'scan_config': {
-                    'extensions': extensions or self.default_extensions,
-                    'exclude_patterns': exclude_patterns or self.default_excludes,
+                    'extensions': extensions,
+                    'exclude_patterns': exclude_patterns,
                     'max_file_size': max_file_size,
                     'include_content': include_content
                 }
@@ -19,6 +19,8 @@ try:
 except ImportError:
     HAS_PSUTIL = False
 
+from .metrics_registry import get_metrics_registry
+
 # 导入日志系统
 try:
     from ..logging import get_logger
@@ -628,7 +630,19 @@ class LargeFileHandler:
         
         # 检测语言
         language = self.detect_language(file_path)
-        
+        result = self._chunk_with_language(file_path, content, language, start_time)
+
+        metrics = get_metrics_registry()
+        labels = {"language": language}
+        metrics.observe("process_large_file_seconds", time.time() - start_time, labels,
+                        help="LargeFileHandler.process_large_file duration")
+        metrics.inc("large_file_chunks_total", result.total_chunks, labels,
+                    help="Chunks produced from large files")
+        return result
+
+    def _chunk_with_language(self, file_path: str, content: str, language: str,
+                             start_time: float) -> ChunkingResult:
+        """使用语言对应的分片器分片，失败时降级为按大小分片"""
         # 获取对应的分片器
         chunker = self.chunkers.get(language)
         if not chunker:
@@ -653,6 +667,8 @@ class LargeFileHandler:
             
         except Exception as e:
             self.logger.error(f"Error processing large file {file_path}: {e}")
+            get_metrics_registry().inc("large_file_chunking_errors_total",
+                                       help="AST chunking failures that fell back to size-based chunking")
             return self._fallback_size_based_chunking(content, file_path, start_time)
     
     def _fallback_size_based_chunking(self, content: str, file_path: str, start_time: float) -> ChunkingResult:
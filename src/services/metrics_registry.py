@@ -0,0 +1,302 @@
+"""
+进程内指标注册表：计数器、仪表和延迟直方图
+
+- Counter：单调递增计数（调用次数、错误次数、处理文件数等）
+- Gauge：可增可减的瞬时值（进行中的调用数、最近一次扫描的文件数等）
+- HdrHistogram：HDR 风格的对数-线性分桶直方图，按整数微秒记录，
+  每个 2 的幂区间再细分为固定数量的子桶，相对误差恒定（默认约 0.8%），
+  分桶稀疏存储，记录为常数时间
+- 每个指标可带标签（如 tool="task_status"），同名指标的不同标签组合为不同序列
+- snapshot() 导出 JSON 结构，to_prometheus() 导出 Prometheus 文本格式，
+  dump_prometheus() 原子写入 .codelens/metrics.prom
+"""
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class HdrHistogram:
+    """HDR 风格的延迟直方图（秒输入，内部按整数微秒分桶）
+
+    取值 v 的数量级 m = max(0, bit_length(v) - SIGNIFICANT_BITS)，
+    桶号 = m * 半区子桶数 + (v >> m)，同一数量级内的桶宽度相同。
+    """
+
+    SIGNIFICANT_BITS = 7  # 每个数量级 128 个子桶，相对误差 < 1/64
+    UNIT_SECONDS = 1e-6  # 记录精度：微秒
+
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    _sub_bucket_count = 1 << SIGNIFICANT_BITS
+    _sub_bucket_half = _sub_bucket_count >> 1
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0  # 秒
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def record(self, seconds: float):
+        """记录一个耗时（秒）"""
+        seconds = max(0.0, seconds)
+        index = self._bucket_index(int(seconds / self.UNIT_SECONDS))
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def percentile(self, q: float) -> float:
+        """估算分位数（q 取值 0-100），返回所在桶的上边界（秒）"""
+        if self.count == 0:
+            return 0.0
+
+        rank = max(1, math.ceil(self.count * q / 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                upper = self._bucket_bounds(index)[1] * self.UNIT_SECONDS
+                return min(upper, self.max)
+        return self.max
+
+    def cumulative_counts(self, bounds: List[float]) -> List[int]:
+        """每个上界（秒）以内的累计记录数，用于导出 Prometheus 分桶"""
+        results = [0] * len(bounds)
+        for index, bucket_count in self.counts.items():
+            lower = self._bucket_bounds(index)[0] * self.UNIT_SECONDS
+            for position, bound in enumerate(bounds):
+                if lower <= bound:
+                    results[position] += bucket_count
+        return results
+
+    def to_dict(self) -> Dict[str, Any]:
+        """导出统计结果（毫秒）"""
+        def ms(value: Optional[float]) -> float:
+            return round((value or 0.0) * 1000, 3)
+
+        return {
+            "count": self.count,
+            "sum_ms": ms(self.total),
+            "mean_ms": ms(self.total / self.count if self.count else 0.0),
+            "min_ms": ms(self.min),
+            "max_ms": ms(self.max),
+            "p50_ms": ms(self.percentile(50)),
+            "p90_ms": ms(self.percentile(90)),
+            "p99_ms": ms(self.percentile(99)),
+            "p999_ms": ms(self.percentile(99.9))
+        }
+
+    @classmethod
+    def _bucket_index(cls, value: int) -> int:
+        magnitude = max(0, value.bit_length() - cls.SIGNIFICANT_BITS)
+        return magnitude * cls._sub_bucket_half + (value >> magnitude)
+
+    @classmethod
+    def _bucket_bounds(cls, index: int) -> Tuple[int, int]:
+        """桶覆盖的整数取值范围 [lower, upper]"""
+        if index < cls._sub_bucket_count:
+            return index, index
+        magnitude = index // cls._sub_bucket_half - 1
+        sub_bucket = index - magnitude * cls._sub_bucket_half
+        return sub_bucket << magnitude, ((sub_bucket + 1) << magnitude) - 1
+
+
+class MetricsRegistry:
+    """进程内指标注册表（线程安全）"""
+
+    COUNTER = "counter"
+    GAUGE = "gauge"
+    HISTOGRAM = "histogram"
+
+    # 导出 Prometheus 直方图时使用的分桶上界（秒）
+    PROMETHEUS_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                          1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0]
+
+    def __init__(self, namespace: str = "codelens"):
+        self.namespace = namespace
+        self.started_at = time.time()
+        # 指标名 -> {"type", "help", "series": {标签键: 值或直方图}}
+        self._families: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, labels: Optional[Dict[str, Any]] = None, help: str = ""):
+        """计数器加 value"""
+        with self._lock:
+            series = self._series(name, self.COUNTER, help)
+            key = self._label_key(labels)
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, labels: Optional[Dict[str, Any]] = None, help: str = ""):
+        """设置仪表值"""
+        with self._lock:
+            self._series(name, self.GAUGE, help)[self._label_key(labels)] = value
+
+    def add_gauge(self, name: str, delta: float, labels: Optional[Dict[str, Any]] = None, help: str = ""):
+        """仪表值加 delta（可为负）"""
+        with self._lock:
+            series = self._series(name, self.GAUGE, help)
+            key = self._label_key(labels)
+            series[key] = series.get(key, 0) + delta
+
+    def observe(self, name: str, seconds: float, labels: Optional[Dict[str, Any]] = None, help: str = ""):
+        """记录一个耗时到直方图"""
+        with self._lock:
+            series = self._series(name, self.HISTOGRAM, help)
+            key = self._label_key(labels)
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = HdrHistogram()
+            histogram.record(seconds)
+
+    @contextmanager
+    def timer(self, name: str, labels: Optional[Dict[str, Any]] = None, help: str = ""):
+        """计时上下文：退出时（包括异常退出）记录耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, labels, help)
+
+    def timed(self, name: str, labels: Optional[Dict[str, Any]] = None, help: str = "") -> Callable:
+        """计时装饰器"""
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, labels, help):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self, prefix: Optional[str] = None) -> Dict[str, Any]:
+        """导出所有指标（prefix 为不含命名空间的指标名前缀过滤）"""
+        with self._lock:
+            metrics = {}
+            for name, family in sorted(self._families.items()):
+                if prefix and not name.startswith(prefix):
+                    continue
+                metrics[name] = {
+                    "type": family["type"],
+                    "help": family["help"],
+                    "series": [
+                        {
+                            "labels": dict(key),
+                            **({"histogram": value.to_dict()} if family["type"] == self.HISTOGRAM
+                               else {"value": value})
+                        }
+                        for key, value in sorted(family["series"].items())
+                    ]
+                }
+        return {
+            "namespace": self.namespace,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "metrics": metrics
+        }
+
+    def to_prometheus(self) -> str:
+        """导出 Prometheus 文本格式（0.0.4）"""
+        lines = [
+            f"# HELP {self.namespace}_uptime_seconds Seconds since the metrics registry was created.",
+            f"# TYPE {self.namespace}_uptime_seconds gauge",
+            f"{self.namespace}_uptime_seconds {time.time() - self.started_at:.3f}"
+        ]
+        with self._lock:
+            for name, family in sorted(self._families.items()):
+                full_name = f"{self.namespace}_{name}"
+                if family["help"]:
+                    lines.append(f"# HELP {full_name} {self._escape_help(family['help'])}")
+                lines.append(f"# TYPE {full_name} {family['type']}")
+                for key, value in sorted(family["series"].items()):
+                    if family["type"] == self.HISTOGRAM:
+                        lines.extend(self._histogram_lines(full_name, key, value))
+                    else:
+                        lines.append(f"{full_name}{self._format_labels(key)} {self._format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def dump_prometheus(self, file_path: Path) -> Path:
+        """原子写入 Prometheus 文本格式文件"""
+        from .state_store import StateStore
+
+        file_path = Path(file_path)
+        StateStore.atomic_write_text(file_path, self.to_prometheus(), durable=False)
+        return file_path
+
+    def dump_to_project(self, project_path: str) -> Path:
+        """写入项目的 .codelens/metrics.prom"""
+        return self.dump_prometheus(Path(project_path) / ".codelens" / "metrics.prom")
+
+    def reset(self):
+        """清空所有指标"""
+        with self._lock:
+            self._families.clear()
+            self.started_at = time.time()
+
+    def _series(self, name: str, metric_type: str, help: str) -> Dict[LabelKey, Any]:
+        """获取指标的序列表（需持有锁），首次使用时登记类型和说明"""
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = {"type": metric_type, "help": help, "series": {}}
+        elif family["type"] != metric_type:
+            raise ValueError(f"Metric {name} is a {family['type']}, not a {metric_type}")
+        elif help and not family["help"]:
+            family["help"] = help
+        return family["series"]
+
+    def _histogram_lines(self, full_name: str, key: LabelKey, histogram: HdrHistogram) -> List[str]:
+        lines = []
+        for bound, cumulative in zip(self.PROMETHEUS_BUCKETS,
+                                     histogram.cumulative_counts(self.PROMETHEUS_BUCKETS)):
+            labels = self._format_labels(key + (("le", self._format_value(bound)),))
+            lines.append(f"{full_name}_bucket{labels} {cumulative}")
+        lines.append(f"{full_name}_bucket{self._format_labels(key + (('le', '+Inf'),))} {histogram.count}")
+        lines.append(f"{full_name}_sum{self._format_labels(key)} {histogram.total:.6f}")
+        lines.append(f"{full_name}_count{self._format_labels(key)} {histogram.count}")
+        return lines
+
+    @staticmethod
+    def _label_key(labels: Optional[Dict[str, Any]]) -> LabelKey:
+        if not labels:
+            return ()
+        return tuple(sorted((str(key), str(value)) for key, value in labels.items()))
+
+    @staticmethod
+    def _format_labels(key: LabelKey) -> str:
+        if not key:
+            return ""
+        pairs = ",".join(
+            '{}="{}"'.format(name, value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+            for name, value in key
+        )
+        return "{" + pairs + "}"
+
+    @staticmethod
+    def _escape_help(text: str) -> str:
+        return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+    @staticmethod
+    def _format_value(value: float) -> str:
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value)) if abs(value) < 1e15 else repr(value)
+        return repr(value) if isinstance(value, float) else str(value)
+
+
+# 全局指标注册表
+_global_registry: Optional[MetricsRegistry] = None
+_global_registry_lock = threading.Lock()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """获取全局指标注册表"""
+    global _global_registry
+    if _global_registry is None:
+        with _global_registry_lock:
+            if _global_registry is None:
+                _global_registry = MetricsRegistry()
+    return _global_registry
@@ -0,0 +1,148 @@
+"""
+目标项目文件变化跟踪
+
+为被分析的项目建立文件监控（过滤规则来自 FileFilteringConfig），并为每个使用方
+累积"自上次同步以来变化过的文件"：
+- track(consumer) 从当前时刻开始为使用方记录变化（调用方随后做一次全量扫描作为基点）
+- drain_changes(consumer) 取出并清空累积的变化；未跟踪或变化过多（溢出）时返回 None，
+  调用方应回退到全量扫描
+- 同步版本（例如写入的指纹文件版本戳）用来确认基点仍然有效：状态文件被其他进程
+  改写过时，累积的变化不再对应该文件
+- add_listener 注册的监听器实时接收 (事件类型, 文件路径)
+
+监控器按项目根目录复用，最多同时监控 MAX_WATCHED_PROJECTS 个项目，超出时停止最久未使用的。
+"""
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from src.hot_reload.file_watcher import FileWatcher, WatchFilter
+from src.logging import get_logger
+
+
+class ProjectWatcher:
+    """单个项目的文件变化跟踪器"""
+
+    MAX_PENDING_CHANGES = 10000  # 单个使用方累积的变化上限，超过后视为溢出
+
+    def __init__(self, project_path: str, path_filter: Optional[WatchFilter] = None):
+        self.project_path = Path(project_path).resolve()
+        self.path_filter = path_filter or WatchFilter.from_config()
+        self.file_watcher = FileWatcher(debounce_seconds=0, path_filter=self.path_filter)
+        self.file_watcher.add_path(str(self.project_path))
+        self.file_watcher.add_listener(self._record_change)
+        self.running = False
+        self._changes: Dict[str, Dict[str, str]] = {}  # 使用方 -> {文件路径: 最后事件类型}
+        self._overflowed: Dict[str, bool] = {}
+        self._synced_versions: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+        self.logger = get_logger("ProjectWatcher", "project_watch")
+
+    def start(self):
+        """启动监控（建立初始快照后返回）"""
+        if not self.running:
+            self.file_watcher.start()
+            self.running = True
+            self.logger.info(f"开始监控项目: {self.project_path}")
+
+    def stop(self):
+        """停止监控并丢弃所有累积的变化"""
+        if self.running:
+            self.file_watcher.stop()
+            self.running = False
+        with self._lock:
+            self._changes.clear()
+            self._overflowed.clear()
+            self._synced_versions.clear()
+
+    def add_listener(self, listener: Callable[[str, str], None]):
+        """注册变化监听器：listener(事件类型, 文件路径)，事件类型为 changed 或 deleted"""
+        self.file_watcher.add_listener(listener)
+
+    def remove_listener(self, listener: Callable[[str, str], None]):
+        """注销变化监听器"""
+        self.file_watcher.remove_listener(listener)
+
+    def track(self, consumer: str):
+        """从现在开始为使用方记录变化（清空之前累积的变化和同步版本）"""
+        with self._lock:
+            self._changes[consumer] = {}
+            self._overflowed[consumer] = False
+            self._synced_versions.pop(consumer, None)
+
+    def is_tracking(self, consumer: str) -> bool:
+        return consumer in self._changes
+
+    def drain_changes(self, consumer: str) -> Optional[Dict[str, str]]:
+        """取出使用方累积的变化 {文件路径: changed|deleted}；未跟踪或已溢出时返回 None"""
+        self.file_watcher.flush()
+        with self._lock:
+            if consumer not in self._changes:
+                return None
+            changes = self._changes[consumer]
+            self._changes[consumer] = {}
+            if self._overflowed[consumer]:
+                self._overflowed[consumer] = False
+                return None
+            return changes
+
+    def set_synced_version(self, consumer: str, version: Optional[str]):
+        """记录使用方完成同步时的状态文件版本"""
+        with self._lock:
+            self._synced_versions[consumer] = version
+
+    def synced_version(self, consumer: str) -> Optional[str]:
+        return self._synced_versions.get(consumer)
+
+    def _record_change(self, event_type: str, file_path: str):
+        with self._lock:
+            for consumer, changes in self._changes.items():
+                if self._overflowed[consumer]:
+                    continue
+                changes[file_path] = event_type
+                if len(changes) > self.MAX_PENDING_CHANGES:
+                    changes.clear()
+                    self._overflowed[consumer] = True
+
+
+MAX_WATCHED_PROJECTS = 8
+
+_project_watchers: "OrderedDict[str, ProjectWatcher]" = OrderedDict()
+_project_watchers_lock = threading.Lock()
+
+
+def watch_project(project_path: str, path_filter: Optional[WatchFilter] = None) -> ProjectWatcher:
+    """获取项目的监控器，不存在时创建并启动"""
+    key = str(Path(project_path).resolve())
+    evicted = []
+    with _project_watchers_lock:
+        watcher = _project_watchers.get(key)
+        if watcher is not None:
+            _project_watchers.move_to_end(key)
+            return watcher
+
+        watcher = ProjectWatcher(key, path_filter)
+        watcher.start()
+        _project_watchers[key] = watcher
+        while len(_project_watchers) > MAX_WATCHED_PROJECTS:
+            evicted.append(_project_watchers.popitem(last=False)[1])
+
+    for old_watcher in evicted:
+        old_watcher.stop()
+    return watcher
+
+
+def get_project_watcher(project_path: str) -> Optional[ProjectWatcher]:
+    """获取项目已有的监控器（不会创建）"""
+    with _project_watchers_lock:
+        return _project_watchers.get(str(Path(project_path).resolve()))
+
+
+def stop_project_watchers():
+    """停止所有项目监控器（服务器退出时调用）"""
+    with _project_watchers_lock:
+        watchers = list(_project_watchers.values())
+        _project_watchers.clear()
+    for watcher in watchers:
+        watcher.stop()
@@ -0,0 +1,227 @@
+"""
+响应治理器：统一控制 MCP 工具响应的序列化方式和大小
+
+- 所有响应使用紧凑分隔符序列化（无缩进）
+- 每个工具有字节预算（PerformanceConfig.response_limits，可按工具名覆盖）
+- 超出预算时按层级逐步截断过长的列表、字典和字符串，响应中附带
+  truncation 说明和 continuation 句柄；完整响应保存在内存中，
+  通过 response_continue 工具按字节偏移分段取回
+- 记录每个工具的调用次数、发送字节数、截断次数等指标
+"""
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class ResponseGovernor:
+    """MCP 响应大小治理器"""
+
+    DEFAULT_LIMITS = {
+        "max_bytes": 80000,  # 单次响应的默认字节预算（约20000 token）
+        "handle_ttl_seconds": 600,  # 续取句柄的有效期
+        "max_handles": 32  # 同时保存的完整响应数量
+    }
+    BYTES_PER_TOKEN = 4  # token 估算：每4字节约1个token
+    ENVELOPE_RESERVE = 1024  # 续取分段为响应外层结构预留的字节数
+    # 逐级收紧的截断参数：(列表保留项数, 字符串保留字符数)
+    TRUNCATION_LEVELS = [(100, 4000), (50, 2000), (20, 1000), (10, 400), (5, 200), (3, 80)]
+    MIN_DICT_KEYS = 20  # 字典至少保留的键数，避免截掉响应的结构字段
+    EXEMPT_TOOLS = {"response_continue"}  # 续取分段本身不再截断
+
+    def __init__(self, limits: Optional[Dict[str, Any]] = None):
+        self.limits = {**self.DEFAULT_LIMITS, **(limits or {})}
+        self._handles: "OrderedDict[str, Tuple[float, str, bytes]]" = OrderedDict()
+        self._metrics: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def budget_for(self, tool_name: str) -> int:
+        """工具的响应字节预算"""
+        return int(self.limits.get(tool_name, self.limits["max_bytes"]))
+
+    @staticmethod
+    def serialize(data: Any) -> str:
+        """紧凑JSON序列化"""
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def estimate_tokens(cls, data: Any) -> int:
+        """估算数据序列化后的token数"""
+        return len(cls.serialize(data).encode('utf-8')) // cls.BYTES_PER_TOKEN
+
+    def render(self, tool_name: str, result: Any) -> str:
+        """序列化工具结果，超出预算时截断并附带续取句柄"""
+        text = self.serialize(result)
+        encoded = text.encode('utf-8')
+        budget = self.budget_for(tool_name)
+
+        if len(encoded) <= budget or tool_name in self.EXEMPT_TOOLS:
+            self._record(tool_name, len(encoded), len(encoded), truncated=False)
+            return text
+
+        handle = self._store(tool_name, encoded)
+        truncated_text = self._truncate(result, budget, handle, len(encoded))
+        self._record(tool_name, len(truncated_text.encode('utf-8')), len(encoded), truncated=True)
+        return truncated_text
+
+    def fetch(self, handle: str, offset: int = 0, max_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """按字节偏移读取完整响应的一段；按顺序拼接所有 fragment 即得到完整JSON
+
+        读到最后一段后句柄即被释放。
+        """
+        with self._lock:
+            self._expire_handles()
+            entry = self._handles.get(handle)
+            if entry is None:
+                raise KeyError(f"Unknown or expired continuation handle: {handle}")
+            self._handles.move_to_end(handle)
+            encoded = entry[2]
+
+        chunk = max(1, (max_bytes or self.budget_for("response_continue")) - self.ENVELOPE_RESERVE)
+        offset = max(0, min(int(offset), len(encoded)))
+        end = min(offset + chunk, len(encoded))
+        # 回退到UTF-8字符边界，保证每段都能独立解码
+        while end < len(encoded) and end > offset and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+
+        complete = end >= len(encoded)
+        if complete:
+            with self._lock:
+                self._handles.pop(handle, None)
+
+        return {
+            "handle": handle,
+            "offset": offset,
+            "next_offset": None if complete else end,
+            "total_bytes": len(encoded),
+            "remaining_bytes": len(encoded) - end,
+            "complete": complete,
+            "fragment": encoded[offset:end].decode('utf-8')
+        }
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """每个工具的响应字节指标"""
+        with self._lock:
+            metrics = {}
+            for tool_name, stats in self._metrics.items():
+                metrics[tool_name] = {
+                    **stats,
+                    "avg_bytes": stats["bytes_sent"] // stats["calls"] if stats["calls"] else 0,
+                    "estimated_tokens_sent": stats["bytes_sent"] // self.BYTES_PER_TOKEN
+                }
+            return {
+                "tools": metrics,
+                "open_handles": len(self._handles)
+            }
+
+    def _truncate(self, result: Any, budget: int, handle: str, total_bytes: int) -> str:
+        """逐级截断直到序列化结果落入预算"""
+        for max_items, max_chars in self.TRUNCATION_LEVELS:
+            truncated_paths: Dict[str, Any] = {}
+            shrunk = self._shrink(result, max_items, max_chars, "$", truncated_paths)
+            payload = self._with_truncation_info(shrunk, handle, total_bytes, truncated_paths)
+            text = self.serialize(payload)
+            if len(text.encode('utf-8')) <= budget:
+                return text
+
+        # 结构本身过大，只返回续取说明
+        fallback = {"success": True} if isinstance(result, dict) and result.get("success") else {}
+        if isinstance(result, dict) and "tool" in result:
+            fallback["tool"] = result["tool"]
+        return self.serialize(self._with_truncation_info(fallback, handle, total_bytes, {"$": "omitted"}))
+
+    def _with_truncation_info(self, payload: Any, handle: str, total_bytes: int,
+                              truncated_paths: Dict[str, Any]) -> Any:
+        info = {
+            "truncated": True,
+            "continuation": handle,
+            "total_bytes": total_bytes,
+            "truncated_paths": truncated_paths,
+            "hint": "调用 response_continue 工具并传入 continuation 句柄，按 next_offset 分段取回完整响应"
+        }
+        if isinstance(payload, dict):
+            return {**payload, "_response": info}
+        return {"result": payload, "_response": info}
+
+    def _shrink(self, value: Any, max_items: int, max_chars: int, path: str,
+                truncated_paths: Dict[str, Any]) -> Any:
+        """递归截断过长的列表、字典和字符串，并记录被截断的路径"""
+        if isinstance(value, str):
+            if len(value) > max_chars:
+                truncated_paths[path] = {"kept_chars": max_chars, "total_chars": len(value)}
+                return value[:max_chars] + f"…[truncated {len(value) - max_chars} chars]"
+            return value
+
+        if isinstance(value, list):
+            if len(value) > max_items:
+                truncated_paths[path] = {"kept_items": max_items, "total_items": len(value)}
+            return [
+                self._shrink(item, max_items, max_chars, f"{path}[{index}]", truncated_paths)
+                for index, item in enumerate(value[:max_items])
+            ]
+
+        if isinstance(value, dict):
+            key_limit = max(max_items, self.MIN_DICT_KEYS)
+            if len(value) > key_limit:
+                truncated_paths[path] = {"kept_keys": key_limit, "total_keys": len(value)}
+            items: List[Tuple[Any, Any]] = list(value.items())[:key_limit]
+            return {
+                key: self._shrink(item, max_items, max_chars, f"{path}.{key}", truncated_paths)
+                for key, item in items
+            }
+
+        return value
+
+    def _store(self, tool_name: str, encoded: bytes) -> str:
+        """保存完整响应，返回续取句柄"""
+        handle = f"{tool_name}-{uuid.uuid4().hex[:12]}"
+        with self._lock:
+            self._expire_handles()
+            self._handles[handle] = (time.time(), tool_name, encoded)
+            while len(self._handles) > self.limits["max_handles"]:
+                self._handles.popitem(last=False)
+        return handle
+
+    def _expire_handles(self):
+        """清理过期句柄（需持有锁）"""
+        cutoff = time.time() - self.limits["handle_ttl_seconds"]
+        while self._handles:
+            handle, (created_at, _, _) = next(iter(self._handles.items()))
+            if created_at >= cutoff:
+                break
+            self._handles.popitem(last=False)
+
+    def _record(self, tool_name: str, bytes_sent: int, full_bytes: int, truncated: bool):
+        with self._lock:
+            stats = self._metrics.setdefault(tool_name, {
+                "calls": 0, "bytes_sent": 0, "max_bytes": 0, "truncated": 0, "bytes_withheld": 0
+            })
+            stats["calls"] += 1
+            stats["bytes_sent"] += bytes_sent
+            stats["max_bytes"] = max(stats["max_bytes"], bytes_sent)
+            if truncated:
+                stats["truncated"] += 1
+                stats["bytes_withheld"] += full_bytes - bytes_sent
+
+
+# 全局响应治理器
+_global_governor: Optional[ResponseGovernor] = None
+_global_governor_lock = threading.Lock()
+
+
+def get_response_governor() -> ResponseGovernor:
+    """获取全局响应治理器（预算读取自 PerformanceConfig.response_limits）"""
+    global _global_governor
+    if _global_governor is None:
+        with _global_governor_lock:
+            if _global_governor is None:
+                limits = None
+                try:
+                    from ..config import get_config
+                    limits = get_config().performance.response_limits
+                except Exception:
+                    pass
+                _global_governor = ResponseGovernor(limits)
+    return _global_governor
@@ -0,0 +1,195 @@
+"""
+.codelens 状态存储：跨进程安全地读写项目状态文件
+
+- lock(key)：.codelens/<key>.lock 上的 fcntl 建议锁，同一进程内可重入
+- 所有整文件写入都先写同目录临时文件，fsync 后 os.replace 原子替换
+- 版本戳由文件的 inode / 修改时间 / 大小组成，原子替换总会产生新的版本，
+  配合 write_json(expected_version=...) 实现乐观并发（比较并交换）
+- update_json 在排他锁内完成 读取-修改-写入，适合短小的追加类更新
+"""
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+
+class VersionConflictError(Exception):
+    """写入时文件版本与预期不符（其他进程已修改）"""
+
+    def __init__(self, path: Path, expected: Optional[str], actual: Optional[str]):
+        super().__init__(f"{path} was modified concurrently (expected version {expected}, found {actual})")
+        self.path = path
+        self.expected = expected
+        self.actual = actual
+
+
+class _HeldLock:
+    """进程内的锁状态：线程锁 + 重入深度 + 持有的锁文件句柄"""
+
+    __slots__ = ("thread_lock", "depth", "handle")
+
+    def __init__(self):
+        self.thread_lock = threading.RLock()
+        self.depth = 0
+        self.handle = None
+
+
+class StateStore:
+    """.codelens 目录下状态文件的读写入口"""
+
+    ANY_VERSION = "*"  # write_json 不做版本检查
+
+    _locks: Dict[str, _HeldLock] = {}
+    _locks_guard = threading.Lock()
+
+    def __init__(self, state_dir: Path, durable: bool = True):
+        self.state_dir = Path(state_dir)
+        self.durable = durable  # 原子写入前是否fsync
+
+    @classmethod
+    def for_project(cls, project_path, durable: bool = True) -> 'StateStore':
+        """项目的 .codelens 存储"""
+        return cls(Path(project_path) / ".codelens", durable)
+
+    def path(self, name: str) -> Path:
+        """状态文件路径"""
+        return self.state_dir / name
+
+    @contextmanager
+    def lock(self, key: str):
+        """持有 .codelens/<key>.lock 的排他锁（同一线程内可嵌套）"""
+        lock_file = self.state_dir / f"{key}.lock"
+        held = self._get_held_lock(str(lock_file))
+
+        with held.thread_lock:
+            if held.depth == 0 and HAS_FCNTL:
+                self.state_dir.mkdir(parents=True, exist_ok=True)
+                held.handle = open(lock_file, 'a')
+                fcntl.flock(held.handle.fileno(), fcntl.LOCK_EX)
+            held.depth += 1
+            try:
+                yield
+            finally:
+                held.depth -= 1
+                if held.depth == 0 and held.handle is not None:
+                    fcntl.flock(held.handle.fileno(), fcntl.LOCK_UN)
+                    held.handle.close()
+                    held.handle = None
+
+    def version(self, name: str) -> Optional[str]:
+        """文件当前的版本戳，文件不存在时为 None"""
+        return self.file_version(self.path(name))
+
+    def read_json(self, name: str, default: Any = None) -> Any:
+        """读取JSON文件，不存在时返回 default"""
+        return self.read_json_versioned(name, default)[0]
+
+    def read_json_versioned(self, name: str, default: Any = None) -> Tuple[Any, Optional[str]]:
+        """读取JSON文件及其版本戳"""
+        file_path = self.path(name)
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                version = self._stat_version(os.fstat(f.fileno()))
+                return json.load(f), version
+        except FileNotFoundError:
+            return default, None
+
+    def write_json(self, name: str, data: Any, expected_version: Optional[str] = ANY_VERSION,
+                   indent: Optional[int] = 2) -> str:
+        """原子写入JSON文件，返回新版本戳
+
+        指定 expected_version 时做比较并交换：None 表示期望文件不存在，
+        其他值必须与当前版本一致，否则抛出 VersionConflictError。
+        """
+        file_path = self.path(name)
+        with self.lock(Path(name).stem):
+            if expected_version != self.ANY_VERSION:
+                actual = self.file_version(file_path)
+                if actual != expected_version:
+                    raise VersionConflictError(file_path, expected_version, actual)
+            self.atomic_write_text(file_path, json.dumps(data, indent=indent, ensure_ascii=False),
+                                   self.durable)
+            return self.file_version(file_path)
+
+    def update_json(self, name: str, updater: Callable[[Any], Any],
+                    default_factory: Callable[[], Any] = dict) -> Any:
+        """在排他锁内读取、修改并原子写回JSON文件，返回写入的数据
+
+        updater 接收当前数据（文件不存在或损坏时为 default_factory()），
+        可以原地修改并返回 None，也可以返回新数据。
+        """
+        file_path = self.path(name)
+        with self.lock(Path(name).stem):
+            try:
+                data = self.read_json(name)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                data = None
+            if data is None:
+                data = default_factory()
+
+            result = updater(data)
+            if result is not None:
+                data = result
+            self.atomic_write_text(file_path, json.dumps(data, indent=2, ensure_ascii=False), self.durable)
+            return data
+
+    def append_lines(self, name: str, records: Iterable[Dict[str, Any]], lock_key: Optional[str] = None):
+        """在锁内向NDJSON文件追加记录（一次write）"""
+        payload = "".join(
+            json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+            for record in records
+        )
+        if not payload:
+            return
+
+        with self.lock(lock_key or Path(name).stem):
+            self.state_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.path(name), 'a', encoding='utf-8') as f:
+                f.write(payload)
+
+    @staticmethod
+    def atomic_write_text(file_path: Path, text: str, durable: bool = True):
+        """写入同目录临时文件后原子替换目标文件"""
+        file_path = Path(file_path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = file_path.with_name(f"{file_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(text)
+                f.flush()
+                if durable:
+                    os.fsync(f.fileno())
+            os.replace(tmp_file, file_path)
+        except BaseException:
+            if tmp_file.exists():
+                tmp_file.unlink()
+            raise
+
+    @classmethod
+    def file_version(cls, file_path: Path) -> Optional[str]:
+        """文件版本戳（inode-修改时间-大小），文件不存在时为 None"""
+        try:
+            return cls._stat_version(os.stat(file_path))
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _stat_version(stat_result: os.stat_result) -> str:
+        return f"{stat_result.st_ino:x}-{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"
+
+    @classmethod
+    def _get_held_lock(cls, lock_path: str) -> _HeldLock:
+        lock_path = os.path.realpath(lock_path)
+        with cls._locks_guard:
+            held = cls._locks.get(lock_path)
+            if held is None:
+                held = cls._locks[lock_path] = _HeldLock()
+            return held
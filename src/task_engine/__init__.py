@@ -8,11 +8,16 @@
 """
 
 from .task_manager import TaskManager, Task, TaskStatus, TaskType
+from .task_journal import TaskJournal
+from .sqlite_store import SQLiteTaskStore
+from .task_scheduler import TaskScheduler
 from .phase_controller import PhaseController, Phase, PhaseStatus
 from .state_tracker import StateTracker
+from .eta_estimator import ETAEstimator
 
 __all__ = [
-    'TaskManager', 'Task', 'TaskStatus', 'TaskType',
+    'TaskManager', 'Task', 'TaskStatus', 'TaskType', 'TaskJournal',
+    'SQLiteTaskStore', 'TaskScheduler',
     'PhaseController', 'Phase', 'PhaseStatus', 
-    'StateTracker'
+    'StateTracker', 'ETAEstimator'
 ]
\ No newline at end of file
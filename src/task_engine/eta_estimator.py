@@ -0,0 +1,225 @@
+"""
+剩余时间估算器：基于任务依赖图的关键路径和实测耗时预测完成时间
+
+- 每种任务类型的耗时 = 默认先验与事件统计均值的加权平均，样本越多越接近实测值
+- 关键路径：未完成任务按依赖关系求最长加权路径
+- 给定并发数 P，完成时间取 max(关键路径, 总工作量 / P)，
+  并给出列表调度的上界 总工作量 / P + (1 - 1/P) × 关键路径
+- 任务状态变化时只沿依赖边向下游传播，不重算整张图
+"""
+import math
+from collections import deque
+from typing import Dict, List, Optional, Any, Set
+
+from .task_manager import TaskManager, TaskStatus, TaskType, Task
+from .event_metrics import EventMetricsAggregator
+
+
+class ETAEstimator:
+    """任务依赖图上的关键路径 / 完成时间估算器"""
+
+    # 没有实测数据时各任务类型的默认耗时（秒）
+    DEFAULT_DURATIONS = {
+        TaskType.FILE_SUMMARY.value: 180,
+        TaskType.ARCHITECTURE.value: 600,
+        TaskType.TECH_STACK.value: 600,
+        TaskType.DATA_FLOW.value: 600,
+        TaskType.SYSTEM_ARCHITECTURE.value: 600,
+        TaskType.COMPONENT_DIAGRAM.value: 600,
+        TaskType.DEPLOYMENT_DIAGRAM.value: 600,
+        TaskType.PROJECT_README.value: 600,
+        TaskType.CHANGELOG.value: 300
+    }
+    FALLBACK_DURATION = 300
+    PRIOR_WEIGHT = 3  # 默认耗时相当于几个观测样本
+    WEIGHT_TOLERANCE = 0.05  # 类型耗时变化超过该比例才重算整张图
+
+    def __init__(self, task_manager: TaskManager, metrics: Optional[EventMetricsAggregator] = None):
+        self.task_manager = task_manager
+        self.metrics = metrics
+
+        self._type_weights: Dict[str, float] = {}  # 当前图使用的类型耗时
+        self._weights: Dict[str, float] = {}  # 任务剩余耗时（已完成为0）
+        self._finish: Dict[str, float] = {}  # 从当前时刻起任务最早完成时间（最长路径）
+        self._cyclic: Set[str] = set()  # 处于依赖环中的任务，不参与传播
+        self._remaining_work = 0.0
+        self._remaining_count = 0
+        self._generation: Optional[int] = None  # 上次重建时任务管理器的结构版本
+
+    def type_duration(self, task_type: str) -> float:
+        """任务类型的预估耗时（秒）"""
+        prior = self.DEFAULT_DURATIONS.get(task_type, self.FALLBACK_DURATION)
+        if self.metrics is None or task_type not in self.metrics.durations_by_type:
+            return float(prior)
+
+        stats = self.metrics.durations_by_type[task_type].stats
+        return (self.PRIOR_WEIGHT * prior + stats.count * stats.mean) / (self.PRIOR_WEIGHT + stats.count)
+
+    def on_task_changed(self, task_id: str):
+        """任务状态变化后增量更新关键路径（只传播到受影响的下游任务）"""
+        if self._needs_rebuild():
+            self.rebuild()
+            return
+
+        task = self.task_manager.get_task(task_id)
+        if task is None or task_id not in self._weights:
+            self.rebuild()
+            return
+
+        weight = self._task_weight(task)
+        old_weight = self._weights[task_id]
+        if weight == old_weight:
+            return
+
+        self._weights[task_id] = weight
+        self._remaining_work += weight - old_weight
+        self._remaining_count += (weight > 0) - (old_weight > 0)
+        if task_id in self._cyclic:
+            self._finish[task_id] = weight
+            return
+
+        queue = deque([task_id])
+        while queue:
+            current = self.task_manager.get_task(queue.popleft())
+            finish = self._weights[current.id] + self._max_dependency_finish(current)
+            if finish == self._finish.get(current.id):
+                continue
+            self._finish[current.id] = finish
+            queue.extend(dep.id for dep in self.task_manager.get_dependent_tasks(current.id)
+                         if dep.id not in self._cyclic)
+
+    def rebuild(self):
+        """按拓扑序重算全部任务的最长路径"""
+        tasks = self.task_manager.tasks
+        self._generation = self.task_manager.generation
+        self._type_weights = {}
+        self._weights = {task_id: self._task_weight(task) for task_id, task in tasks.items()}
+        self._remaining_work = sum(self._weights.values())
+        self._remaining_count = sum(1 for weight in self._weights.values() if weight > 0)
+        self._finish = {}
+
+        # Kahn 拓扑排序，只计算存在于图中的依赖（重复列出的依赖只算一次，与反向依赖边一致）
+        indegree = {
+            task_id: len(set(task.dependencies) & tasks.keys())
+            for task_id, task in tasks.items()
+        }
+        queue = deque(task_id for task_id, degree in indegree.items() if degree == 0)
+        while queue:
+            task = tasks[queue.popleft()]
+            self._finish[task.id] = self._weights[task.id] + self._max_dependency_finish(task)
+            for dependent in self.task_manager.get_dependent_tasks(task.id):
+                indegree[dependent.id] -= 1
+                if indegree[dependent.id] == 0:
+                    queue.append(dependent.id)
+
+        self._cyclic = {task_id for task_id in tasks if task_id not in self._finish}
+        for task_id in self._cyclic:
+            self._finish[task_id] = self._weights[task_id]
+
+    def get_critical_path(self) -> List[str]:
+        """当前关键路径上的未完成任务ID（按执行顺序）"""
+        self._ensure_current()
+        if not self._finish:
+            return []
+
+        task_id = max(self._finish, key=self._finish.get)
+        if self._finish[task_id] <= 0:
+            return []
+
+        path = []
+        while task_id is not None:
+            if self._weights[task_id] > 0:
+                path.append(task_id)
+            task = self.task_manager.get_task(task_id)
+            deps = [dep_id for dep_id in task.dependencies if dep_id in self._finish]
+            task_id = max(deps, key=self._finish.get) if deps and task_id not in self._cyclic else None
+            if task_id is not None and self._finish[task_id] <= 0:
+                task_id = None
+        return path[::-1]
+
+    def forecast(self, concurrency: int = 1) -> Dict[str, Any]:
+        """给定并发数预测剩余时间和吞吐量"""
+        self._ensure_current()
+        concurrency = max(1, int(concurrency))
+
+        critical_path_seconds = max(self._finish.values(), default=0.0)
+        work_seconds = self._remaining_work
+        eta_seconds = max(critical_path_seconds, work_seconds / concurrency)
+        upper_bound_seconds = work_seconds / concurrency + (1 - 1 / concurrency) * critical_path_seconds
+        throughput = self._remaining_count / (eta_seconds / 3600) if eta_seconds > 0 else 0.0
+        critical_path = self.get_critical_path()
+
+        return {
+            "concurrency": concurrency,
+            "remaining_tasks": self._remaining_count,
+            "eta_seconds": round(eta_seconds, 1),
+            "eta": self.format_duration(eta_seconds),
+            "eta_upper_bound_seconds": round(upper_bound_seconds, 1),
+            "critical_path_seconds": round(critical_path_seconds, 1),
+            "critical_path_length": len(critical_path),
+            "critical_path": critical_path,
+            "total_work_seconds": round(work_seconds, 1),
+            "throughput_tasks_per_hour": round(throughput, 2),
+            "max_useful_concurrency": math.ceil(work_seconds / critical_path_seconds) if critical_path_seconds else 0,
+            "type_durations_seconds": {
+                task_type: round(weight, 1) for task_type, weight in sorted(self._type_weights.items())
+            }
+        }
+
+    @classmethod
+    def estimate_layers(cls, layers: List[Dict[str, Any]], concurrency: int = 1) -> float:
+        """估算尚未创建任务的计划耗时（秒）
+
+        layers 为依次执行的层，每层形如 {"type": 任务类型值, "count": 任务数}，
+        同层任务互不依赖、下一层依赖上一层全部完成。
+        """
+        concurrency = max(1, int(concurrency))
+        total = 0.0
+        for layer in layers:
+            count = layer.get("count", 0)
+            if count <= 0:
+                continue
+            duration = cls.DEFAULT_DURATIONS.get(layer["type"], cls.FALLBACK_DURATION)
+            total += math.ceil(count / concurrency) * duration
+        return total
+
+    @staticmethod
+    def format_duration(seconds: float) -> str:
+        """格式化为 "X hours Y minutes" """
+        total_minutes = int(math.ceil(seconds / 60))
+        hours = total_minutes // 60
+        minutes = total_minutes % 60
+
+        if hours > 0:
+            return f"{hours} hours {minutes} minutes"
+        else:
+            return f"{minutes} minutes"
+
+    def _ensure_current(self):
+        """任务集合变化或类型耗时明显漂移时重建"""
+        if self._needs_rebuild() or self._weights_drifted():
+            self.rebuild()
+
+    def _needs_rebuild(self) -> bool:
+        """任务被增删或重新加载过（数量不变时也能发现）"""
+        return self._generation != self.task_manager.generation
+
+    def _weights_drifted(self) -> bool:
+        for task_type, weight in self._type_weights.items():
+            current = self.type_duration(task_type)
+            if abs(current - weight) > weight * self.WEIGHT_TOLERANCE:
+                return True
+        return False
+
+    def _task_weight(self, task: Task) -> float:
+        """任务剩余耗时：已完成为0，其余取所属类型的预估耗时"""
+        if task.status == TaskStatus.COMPLETED:
+            return 0.0
+
+        task_type = task.type.value
+        if task_type not in self._type_weights:
+            self._type_weights[task_type] = self.type_duration(task_type)
+        return self._type_weights[task_type]
+
+    def _max_dependency_finish(self, task: Task) -> float:
+        return max((self._finish.get(dep_id, 0.0) for dep_id in task.dependencies), default=0.0)
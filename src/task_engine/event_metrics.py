@@ -0,0 +1,218 @@
+"""
+事件指标聚合器：在记录任务事件时增量更新性能指标
+
+- RunningStats：Welford 在线算法维护计数、均值、方差、最值
+- DurationHistogram：固定对数分桶直方图，常数时间估算 p50/p95/p99
+- EventMetricsAggregator：按任务类型、阶段、日期、小时滚动汇总
+"""
+import math
+import time
+from typing import Dict, Any, List, Optional
+
+
+class RunningStats:
+    """在线统计（Welford算法）"""
+
+    __slots__ = ("count", "mean", "_m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float):
+        """加入一个观测值"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def variance(self) -> float:
+        """样本方差"""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stddev(self) -> float:
+        """样本标准差"""
+        return math.sqrt(self.variance)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """导出统计结果"""
+        return {
+            "count": self.count,
+            "mean": round(self.mean, 2),
+            "stddev": round(self.stddev, 2),
+            "min": round(self.min, 2) if self.min is not None else 0,
+            "max": round(self.max, 2) if self.max is not None else 0
+        }
+
+
+class DurationHistogram:
+    """对数分桶的耗时直方图（秒）
+
+    桶边界从 MIN_VALUE 开始按 GROWTH 倍增长，相对误差不超过 GROWTH - 1。
+    """
+
+    MIN_VALUE = 0.01
+    MAX_VALUE = 86400.0
+    GROWTH = 1.1
+
+    _log_growth = math.log(GROWTH)
+    BUCKET_COUNT = int(math.ceil(math.log(MAX_VALUE / MIN_VALUE) / _log_growth)) + 2
+
+    __slots__ = ("buckets", "count", "max_value")
+
+    def __init__(self):
+        self.buckets: List[int] = [0] * self.BUCKET_COUNT
+        self.count = 0
+        self.max_value = 0.0
+
+    def add(self, value: float):
+        """记录一个耗时"""
+        self.buckets[self._bucket_index(value)] += 1
+        self.count += 1
+        self.max_value = max(self.max_value, value)
+
+    def percentile(self, q: float) -> float:
+        """估算分位数（q 取值 0-100），返回所在桶的上边界"""
+        if self.count == 0:
+            return 0.0
+
+        rank = max(1, math.ceil(self.count * q / 100))
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= rank:
+                return min(self._bucket_upper(index), self.max_value)
+        return self.max_value
+
+    def percentiles(self) -> Dict[str, float]:
+        """常用分位数"""
+        return {
+            "p50": round(self.percentile(50), 2),
+            "p95": round(self.percentile(95), 2),
+            "p99": round(self.percentile(99), 2)
+        }
+
+    def _bucket_index(self, value: float) -> int:
+        if value <= self.MIN_VALUE:
+            return 0
+        index = int(math.log(value / self.MIN_VALUE) / self._log_growth) + 1
+        return min(index, self.BUCKET_COUNT - 1)
+
+    def _bucket_upper(self, index: int) -> float:
+        if index >= self.BUCKET_COUNT - 1:
+            return self.max_value
+        return self.MIN_VALUE * (self.GROWTH ** index)
+
+
+class DurationMetrics:
+    """一组耗时的统计量 + 直方图"""
+
+    __slots__ = ("stats", "histogram")
+
+    def __init__(self):
+        self.stats = RunningStats()
+        self.histogram = DurationHistogram()
+
+    def add(self, duration: float):
+        self.stats.add(duration)
+        self.histogram.add(duration)
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = self.stats.to_dict()
+        result.update(self.histogram.percentiles())
+        return result
+
+
+class EventMetricsAggregator:
+    """任务事件的增量指标聚合器
+
+    每次 add_event 为常数时间；查询方法只读取已聚合的结果，
+    不再扫描事件列表或解析时间戳。
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """清空所有聚合结果"""
+        self.total_events = 0
+        self.event_counts: Dict[str, int] = {}
+        self.phase_counts: Dict[str, Dict[str, int]] = {}
+        self.daily_counts: Dict[str, Dict[str, int]] = {}
+        self.hourly_completions: Dict[str, int] = {}
+        self.durations = DurationMetrics()
+        self.durations_by_type: Dict[str, DurationMetrics] = {}
+        self.durations_by_phase: Dict[str, DurationMetrics] = {}
+        self.first_event_time: Optional[float] = None
+        self._started_at: Dict[str, float] = {}
+
+    def add_event(self, event_type: str, task_id: str, task_type: str, phase: str, timestamp: float):
+        """聚合一个事件（timestamp 为 epoch 秒）"""
+        if self.first_event_time is None or timestamp < self.first_event_time:
+            self.first_event_time = timestamp
+
+        self.total_events += 1
+        self.event_counts[event_type] = self.event_counts.get(event_type, 0) + 1
+
+        phase_count = self.phase_counts.setdefault(phase, {"total_events": 0, "completions": 0, "failures": 0})
+        phase_count["total_events"] += 1
+
+        local_time = time.localtime(timestamp)
+        day_key = time.strftime("%Y-%m-%d", local_time)
+        day_count = self.daily_counts.setdefault(day_key, {"completed": 0, "failed": 0})
+
+        if event_type == "started":
+            self._started_at[task_id] = timestamp
+        elif event_type == "completed":
+            phase_count["completions"] += 1
+            day_count["completed"] += 1
+            hour_key = time.strftime("%Y-%m-%d %H:00", local_time)
+            self.hourly_completions[hour_key] = self.hourly_completions.get(hour_key, 0) + 1
+
+            started_at = self._started_at.pop(task_id, None)
+            if started_at is not None:
+                duration = timestamp - started_at
+                self.durations.add(duration)
+                self.durations_by_type.setdefault(task_type, DurationMetrics()).add(duration)
+                self.durations_by_phase.setdefault(phase, DurationMetrics()).add(duration)
+        elif event_type == "failed":
+            phase_count["failures"] += 1
+            day_count["failed"] += 1
+
+    def get_success_rate(self) -> float:
+        """成功率（完成 / (完成 + 失败)）"""
+        completed = self.event_counts.get("completed", 0)
+        failed = self.event_counts.get("failed", 0)
+        total = completed + failed
+        if total == 0:
+            return 100.0
+        return round((completed / total) * 100, 2)
+
+    def get_day_counts(self, day_key: str) -> Dict[str, int]:
+        """指定日期（YYYY-MM-DD）的完成/失败数"""
+        return self.daily_counts.get(day_key, {"completed": 0, "failed": 0})
+
+    def get_phase_counts(self, phase: str) -> Dict[str, int]:
+        """指定阶段的事件计数"""
+        return dict(self.phase_counts.get(phase, {"total_events": 0, "completions": 0, "failures": 0}))
+
+    def get_hourly_completions(self) -> List[Dict[str, Any]]:
+        """每小时完成数"""
+        return [
+            {"hour": hour, "completions": count}
+            for hour, count in sorted(self.hourly_completions.items())
+        ]
+
+    def get_duration_breakdown(self) -> Dict[str, Any]:
+        """按任务类型和阶段拆分的耗时统计"""
+        return {
+            "by_task_type": {name: m.to_dict() for name, m in self.durations_by_type.items()},
+            "by_phase": {name: m.to_dict() for name, m in self.durations_by_phase.items()}
+        }
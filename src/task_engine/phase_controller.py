@@ -2,6 +2,7 @@
 阶段控制器：管理文档生成的五个阶段流程控制
 """
 from enum import Enum
+from itertools import islice
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 from dataclasses import dataclass
@@ -37,6 +38,11 @@ class PhaseInfo:
 class PhaseController:
     """阶段控制器"""
 
+    # 任务列表默认返回的字段和分页大小
+    DEFAULT_TASK_FIELDS = ("id", "type", "description", "status", "target_file", "target_module", "priority")
+    DEFAULT_PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 500
+
     def __init__(self, task_manager: TaskManager):
         self.task_manager = task_manager
 
@@ -71,17 +77,17 @@ class PhaseController:
 
     def get_phase_status(self, phase: Phase) -> PhaseStatus:
         """获取阶段状态"""
-        phase_tasks = self.task_manager.get_phase_tasks(phase.value)
+        counts = self.task_manager.get_status_counts(phase.value)
+        total_count = sum(counts.values())
 
-        if not phase_tasks:
+        if not total_count:
             return PhaseStatus.NOT_STARTED
 
-        completed_count = len([t for t in phase_tasks if t.status == TaskStatus.COMPLETED])
-        total_count = len(phase_tasks)
+        completed_count = counts[TaskStatus.COMPLETED.value]
 
         if completed_count == 0:
             # 检查是否有任务在执行中
-            in_progress = any(t.status == TaskStatus.IN_PROGRESS for t in phase_tasks)
+            in_progress = counts[TaskStatus.IN_PROGRESS.value] > 0
             return PhaseStatus.IN_PROGRESS if in_progress else PhaseStatus.NOT_STARTED
         elif completed_count == total_count:
             return PhaseStatus.COMPLETED
@@ -128,20 +134,81 @@ class PhaseController:
             pass
         return None
 
-    def get_phase_progress_detailed(self, phase: Phase) -> Dict[str, Any]:
-        """获取阶段的详细进度信息"""
+    def get_phase_progress_detailed(self, phase: Phase, include_tasks: bool = True,
+                                    cursor: Optional[str] = None, limit: Optional[int] = None,
+                                    fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """获取阶段的详细进度信息（摘要 + 分页的任务列表）"""
+        progress = self.get_phase_summary(phase)
+        if include_tasks:
+            page = self.get_phase_tasks_page(phase, cursor=cursor, limit=limit, fields=fields)
+            progress["tasks"] = page["tasks"]
+            progress["pagination"] = page["pagination"]
+        return progress
+
+    def get_phase_tasks_page(self, phase: Phase, cursor: Optional[str] = None,
+                             limit: Optional[int] = None,
+                             fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """分页获取阶段任务列表
+
+        Args:
+            cursor: 上一页返回的 next_cursor，None 表示从头开始
+            limit: 每页任务数，默认 DEFAULT_PAGE_SIZE，限制在 1..MAX_PAGE_SIZE
+            fields: 返回的任务字段（投影），默认 DEFAULT_TASK_FIELDS
+
+        Raises:
+            ValueError: cursor 不是非负整数
+        """
+        offset = self.parse_cursor(cursor)
+        limit = self.clamp_page_size(limit)
+        fields = list(fields) if fields else list(self.DEFAULT_TASK_FIELDS)
+
+        phase_tasks = self.task_manager.get_phase_task_map(phase.value)
+        total = len(phase_tasks)
+        page_tasks = islice(phase_tasks.values(), offset, offset + limit)
+        next_offset = offset + limit
+
+        return {
+            "tasks": [self._project_task(t, fields) for t in page_tasks],
+            "pagination": {
+                "total": total,
+                "offset": offset,
+                "limit": limit,
+                "next_cursor": str(next_offset) if next_offset < total else None,
+                "fields": fields
+            }
+        }
+
+    @staticmethod
+    def parse_cursor(cursor: Optional[str]) -> int:
+        """解析分页游标（上一页的 next_cursor），None 或空表示从头开始"""
+        if cursor is None or cursor == "":
+            return 0
+        cursor = str(cursor)
+        if not cursor.isdigit():
+            raise ValueError(f"Invalid cursor: {cursor}")
+        return int(cursor)
+
+    @classmethod
+    def clamp_page_size(cls, limit: Optional[int]) -> int:
+        """把每页数量限制在 1..MAX_PAGE_SIZE，未指定时为 DEFAULT_PAGE_SIZE"""
+        if limit is None:
+            return cls.DEFAULT_PAGE_SIZE
+        return max(1, min(int(limit), cls.MAX_PAGE_SIZE))
+
+    def get_phase_summary(self, phase: Phase) -> Dict[str, Any]:
+        """获取阶段进度摘要（只含计数，不含任务列表）"""
         phase_info = self.phases_info[phase]
-        phase_tasks = self.task_manager.get_phase_tasks(phase.value)
+        counts = self.task_manager.get_status_counts(phase.value)
         status = self.get_phase_status(phase)
 
-        # 统计任务状态
+        # 统计任务状态（由 TaskManager 增量维护的计数器）
         task_stats = {
-            "total": len(phase_tasks),
-            "completed": len([t for t in phase_tasks if t.status == TaskStatus.COMPLETED]),
-            "in_progress": len([t for t in phase_tasks if t.status == TaskStatus.IN_PROGRESS]),
-            "pending": len([t for t in phase_tasks if t.status == TaskStatus.PENDING]),
-            "failed": len([t for t in phase_tasks if t.status == TaskStatus.FAILED]),
-            "blocked": len([t for t in phase_tasks if t.status == TaskStatus.BLOCKED])
+            "total": sum(counts.values()),
+            "completed": counts[TaskStatus.COMPLETED.value],
+            "in_progress": counts[TaskStatus.IN_PROGRESS.value],
+            "pending": counts[TaskStatus.PENDING.value],
+            "failed": counts[TaskStatus.FAILED.value],
+            "blocked": counts[TaskStatus.BLOCKED.value]
         }
 
         # 计算完成率
@@ -173,23 +240,22 @@ class PhaseController:
             "min_completion_required": phase_info.min_completion_rate * 100,
             "can_proceed_next": completion_rate >= phase_info.min_completion_rate,
             "dependencies": dependencies_status,
-            "expected_task_types": phase_info.expected_tasks,
-            "tasks": [
-                {
-                    "id": t.id,
-                    "type": t.type.value,
-                    "description": t.description,
-                    "status": t.status.value,
-                    "target_file": t.target_file,
-                    "target_module": t.target_module,
-                    "priority": t.priority
-                }
-                for t in phase_tasks
-            ]
+            "expected_task_types": phase_info.expected_tasks
         }
 
+    @staticmethod
+    def _project_task(task, fields: List[str]) -> Dict[str, Any]:
+        """按字段投影任务"""
+        projected = {}
+        for field_name in fields:
+            if not hasattr(task, field_name):
+                continue
+            value = getattr(task, field_name)
+            projected[field_name] = value.value if isinstance(value, Enum) else value
+        return projected
+
     def get_all_phases_overview(self) -> Dict[str, Any]:
-        """获取所有阶段的概览"""
+        """获取所有阶段的概览（只含摘要，任务列表通过 get_phase_tasks_page 分页获取）"""
         overview = {
             "current_phase": None,
             "overall_progress": 0,
@@ -202,7 +268,7 @@ class PhaseController:
         completed_tasks = 0
 
         for phase in Phase:
-            phase_progress = self.get_phase_progress_detailed(phase)
+            phase_progress = self.get_phase_summary(phase)
             overview["phases"][phase.value] = phase_progress
 
             # 统计总体进度
@@ -228,13 +294,13 @@ class PhaseController:
     def can_proceed_to_next_phase(self, phase: Phase) -> Tuple[bool, str]:
         """检查是否可以进入下一阶段"""
         phase_info = self.phases_info[phase]
-        phase_tasks = self.task_manager.get_phase_tasks(phase.value)
+        counts = self.task_manager.get_status_counts(phase.value)
+        total_count = sum(counts.values())
 
-        if not phase_tasks:
+        if not total_count:
             return False, f"阶段 '{phase_info.name}' 没有任务"
 
-        completed_count = len([t for t in phase_tasks if t.status == TaskStatus.COMPLETED])
-        total_count = len(phase_tasks)
+        completed_count = counts[TaskStatus.COMPLETED.value]
         completion_rate = completed_count / total_count
 
         if completion_rate < phase_info.min_completion_rate:
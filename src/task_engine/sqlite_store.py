@@ -0,0 +1,166 @@
+"""
+SQLite任务存储：面向超大项目的任务持久化后端
+
+与 TaskJournal 提供相同的存储接口 (load / append_many / needs_compaction / compact)，
+由 TaskManager 透明使用：
+- 使用标准库 sqlite3，WAL 模式，允许多个工具进程并发读写
+- phase / status / priority / target_file 作为独立索引列
+- 每批变更在一个事务中提交，单个任务的状态更新只修改对应行
+- 首次打开时自动从 .codelens/tasks.json（及其日志）迁移
+"""
+import json
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from .task_journal import TaskJournal
+
+
+class SQLiteTaskStore:
+    """基于SQLite的任务存储"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT NOT NULL UNIQUE,
+            type TEXT NOT NULL,
+            phase TEXT NOT NULL,
+            status TEXT NOT NULL,
+            priority TEXT NOT NULL,
+            target_file TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_tasks_phase_status ON tasks(phase, status);
+        CREATE INDEX IF NOT EXISTS idx_tasks_status_priority ON tasks(status, priority);
+        CREATE INDEX IF NOT EXISTS idx_tasks_target_file ON tasks(target_file);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    def __init__(self, db_file: Path, legacy_snapshot_file: Optional[Path] = None, timeout: float = 30.0):
+        self.db_file = Path(db_file)
+        self.legacy_snapshot_file = Path(legacy_snapshot_file) if legacy_snapshot_file else None
+        self.pending_records = 0  # 与TaskJournal接口保持一致，SQLite无需压缩
+
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_file), timeout=timeout,
+                                    isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        self._migrate_legacy()
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """按创建顺序加载所有任务数据"""
+        rows = self.conn.execute("SELECT id, data FROM tasks ORDER BY seq").fetchall()
+        return {task_id: json.loads(data) for task_id, data in rows}
+
+    def append(self, record: Dict[str, Any]):
+        """应用单条变更记录"""
+        self.append_many([record])
+
+    def append_many(self, records: List[Dict[str, Any]]):
+        """在一个事务中应用多条变更记录"""
+        if not records:
+            return
+
+        with self._transaction():
+            for record in records:
+                self._apply(record)
+
+    def needs_compaction(self, task_count: int) -> bool:
+        """SQLite按行更新，不需要压缩"""
+        return False
+
+    def compact(self, data: Dict[str, Dict[str, Any]], force: bool = False) -> bool:
+        """把完整任务数据逐行写入（只插入或更新，不删除行）
+
+        删除已经通过变更记录逐行持久化；这里不清空表，其他进程在本进程加载之后
+        添加的任务不会丢失。
+        """
+        with self._transaction():
+            for task_data in data.values():
+                self._upsert(task_data)
+        return True
+
+    def close(self):
+        """关闭数据库连接"""
+        self.conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        """BEGIN IMMEDIATE 写事务，写锁在事务开始时获取"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        else:
+            self.conn.execute("COMMIT")
+
+    def _apply(self, record: Dict[str, Any]):
+        """应用单条变更记录（需在事务中调用）"""
+        op = record.get("op")
+        if op == TaskJournal.OP_PUT:
+            self._upsert(record["task"])
+        elif op == TaskJournal.OP_UPDATE:
+            row = self.conn.execute("SELECT data FROM tasks WHERE id = ?", (record["id"],)).fetchone()
+            if row is None:
+                return
+            task_data = json.loads(row[0])
+            task_data.update(record.get("fields", {}))
+            self._upsert(task_data)
+        elif op == TaskJournal.OP_DELETE:
+            self.conn.execute("DELETE FROM tasks WHERE id = ?", (record["id"],))
+
+    def _upsert(self, task_data: Dict[str, Any]):
+        """插入或更新任务行（更新时保留原有的创建顺序）"""
+        self.conn.execute(
+            """
+            INSERT INTO tasks (id, type, phase, status, priority, target_file, data)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                type = excluded.type,
+                phase = excluded.phase,
+                status = excluded.status,
+                priority = excluded.priority,
+                target_file = excluded.target_file,
+                data = excluded.data
+            """,
+            (
+                task_data["id"],
+                task_data["type"],
+                task_data["phase"],
+                task_data["status"],
+                task_data.get("priority", "normal"),
+                task_data.get("target_file"),
+                json.dumps(task_data, ensure_ascii=False, separators=(",", ":"))
+            )
+        )
+
+    def _migrate_legacy(self):
+        """首次使用时从 tasks.json（含变更日志）迁移任务"""
+        if self.legacy_snapshot_file is None:
+            return
+
+        with self._transaction():
+            migrated = self.conn.execute(
+                "SELECT value FROM meta WHERE key = 'migrated_from'"
+            ).fetchone()
+            if migrated:
+                return
+
+            legacy = TaskJournal(self.legacy_snapshot_file)
+            if legacy.snapshot_file.exists() or legacy.journal_file.exists():
+                for task_data in legacy.load().values():
+                    self._upsert(task_data)
+
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from', ?)",
+                (str(self.legacy_snapshot_file),)
+            )
+
@@ -3,14 +3,20 @@
 """
 import json
 import time
+from bisect import bisect_right
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Deque
 from pathlib import Path
 from dataclasses import dataclass, asdict
 from enum import Enum
 
 from .task_manager import TaskManager, TaskStatus
 from .phase_controller import PhaseController, PhaseStatus
+from .event_metrics import EventMetricsAggregator
+from .eta_estimator import ETAEstimator
+from ..services.state_store import StateStore
 
 
 @dataclass
@@ -38,8 +44,17 @@ class TaskEvent:
 
 
 class StateTracker:
-    """状态跟踪器"""
-    
+    """状态跟踪器
+
+    事件和快照以 NDJSON 形式逐行追加到 .codelens 下的日志文件，
+    内存中保存在固定容量的环形缓冲区里，并维护按时间、任务、阶段的索引。
+    日志文件行数超过保留上限的两倍时由压缩器重写为最近的记录。
+    追加和压缩都持有对应文件的跨进程锁，压缩以文件内容为准，不会丢弃其他进程写入的记录。
+    """
+
+    MAX_EVENTS = 1000  # 保留的事件数
+    MAX_SNAPSHOTS = 100  # 保留的快照数
+
     def __init__(self, project_path: str, task_manager: TaskManager, phase_controller: PhaseController):
         self.project_path = Path(project_path)
         self.task_manager = task_manager
@@ -48,13 +63,33 @@ class StateTracker:
         # 状态文件路径
         self.state_dir = self.project_path / ".codelens"
         self.state_dir.mkdir(parents=True, exist_ok=True)
+        self.state_store = StateStore(self.state_dir)
         
-        self.snapshots_file = self.state_dir / "state_snapshots.json"
-        self.events_file = self.state_dir / "task_events.json"
+        self.snapshots_file = self.state_dir / "state_snapshots.ndjson"
+        self.events_file = self.state_dir / "task_events.ndjson"
+        # 旧版本的整文件JSON格式，首次加载时迁移
+        self.legacy_snapshots_file = self.state_dir / "state_snapshots.json"
+        self.legacy_events_file = self.state_dir / "task_events.json"
         
-        # 状态数据
-        self.snapshots: List[StateSnapshot] = []
-        self.events: List[TaskEvent] = []
+        # 状态数据（环形缓冲区）
+        self.snapshots: Deque[StateSnapshot] = deque(maxlen=self.MAX_SNAPSHOTS)
+        self.events: Deque[TaskEvent] = deque(maxlen=self.MAX_EVENTS)
+
+        # 索引：时间戳（epoch秒，与缓冲区一一对应）、按任务、按阶段
+        self._snapshot_times: Deque[float] = deque(maxlen=self.MAX_SNAPSHOTS)
+        self._event_times: Deque[float] = deque(maxlen=self.MAX_EVENTS)
+        self._task_events: Dict[str, Deque[TaskEvent]] = {}
+        self._phase_events: Dict[str, Deque[TaskEvent]] = {}
+        self._phase_event_times: Dict[str, Deque[float]] = {}
+
+        # 增量性能指标（随事件写入更新，覆盖本次加载以来的全部事件）
+        self.metrics = EventMetricsAggregator()
+        self._eta_estimator: Optional[ETAEstimator] = None  # 首次预测时创建
+
+        # 日志文件中的行数，用于判断何时压缩
+        self._snapshot_lines = 0
+        self._event_lines = 0
+        self._pending_events: Optional[List[Dict[str, Any]]] = None  # batch_events 期间暂存的事件记录
         
         # 加载历史数据
         self.load_state()
@@ -64,28 +99,26 @@ class StateTracker:
         overview = self.phase_controller.get_all_phases_overview()
         task_summary = self.task_manager.export_tasks_summary()
         
-        # 获取最近完成的任务（过去10分钟）
-        recent_completions = []
-        cutoff_time = datetime.now() - timedelta(minutes=10)
-        for task in self.task_manager.tasks.values():
-            if (task.status == TaskStatus.COMPLETED and task.completed_at 
-                and datetime.fromisoformat(task.completed_at) > cutoff_time):
-                recent_completions.append(task.id)
+        # 获取最近完成的任务（过去10分钟）；同格式的ISO时间串可直接按字典序比较
+        cutoff_time = (datetime.now() - timedelta(minutes=10)).isoformat()
+        recent_completions = [
+            task.id for task in self.task_manager.get_tasks_by_status(TaskStatus.COMPLETED)
+            if task.completed_at and task.completed_at > cutoff_time
+        ]
         
         # 获取活跃任务
-        active_tasks = [
-            task.id for task in self.task_manager.tasks.values()
-            if task.status == TaskStatus.IN_PROGRESS
-        ]
+        active_tasks = [task.id for task in self.task_manager.get_tasks_by_status(TaskStatus.IN_PROGRESS)]
         
         # 获取错误信息
-        errors = []
-        for task in self.task_manager.tasks.values():
-            if task.status == TaskStatus.FAILED and task.error_message:
-                errors.append(f"{task.id}: {task.error_message}")
+        errors = [
+            f"{task.id}: {task.error_message}"
+            for task in self.task_manager.get_failed_tasks()
+            if task.error_message
+        ]
         
+        now = datetime.now()
         snapshot = StateSnapshot(
-            timestamp=datetime.now().isoformat(),
+            timestamp=now.isoformat(),
             overall_progress=overview["overall_progress"],
             current_phase=overview["current_phase"],
             phase_states={
@@ -97,13 +130,10 @@ class StateTracker:
             errors=errors[-5:]  # 最近5个错误
         )
         
-        self.snapshots.append(snapshot)
-        
-        # 保持最近100个快照
-        if len(self.snapshots) > 100:
-            self.snapshots = self.snapshots[-100:]
-        
-        self.save_state()
+        self._add_snapshot(snapshot, now.timestamp())
+        self._append_line(self.snapshots_file, asdict(snapshot))
+        self._snapshot_lines += 1
+        self._compact_if_needed()
         return snapshot
 
     def record_task_event(self, event_type: str, task_id: str, details: Optional[Dict] = None):
@@ -112,8 +142,9 @@ class StateTracker:
         if not task:
             return
         
+        now = datetime.now()
         event = TaskEvent(
-            timestamp=datetime.now().isoformat(),
+            timestamp=now.isoformat(),
             event_type=event_type,
             task_id=task_id,
             task_type=task.type.value,
@@ -121,13 +152,36 @@ class StateTracker:
             details=details or {}
         )
         
-        self.events.append(event)
-        
-        # 保持最近1000个事件
-        if len(self.events) > 1000:
-            self.events = self.events[-1000:]
-        
-        self.save_state()
+        self._add_event(event, now.timestamp())
+        if self._pending_events is not None:
+            self._pending_events.append(asdict(event))
+        else:
+            self._append_line(self.events_file, asdict(event))
+            self._event_lines += 1
+            self._compact_if_needed()
+
+        if self._eta_estimator is not None:
+            self._eta_estimator.on_task_changed(task_id)
+
+    @contextmanager
+    def batch_events(self):
+        """合并期间记录的所有事件，退出时一次性追加到事件日志（可嵌套）"""
+        if self._pending_events is not None:
+            yield
+            return
+
+        self._pending_events = []
+        try:
+            yield
+        finally:
+            records, self._pending_events = self._pending_events, None
+            if records:
+                try:
+                    self.state_store.append_lines(self.events_file.name, records)
+                except Exception as e:
+                    print(f"Error appending state: {e}")
+                self._event_lines += len(records)
+                self._compact_if_needed()
 
     def get_current_status(self) -> Dict[str, Any]:
         """获取当前完整状态"""
@@ -146,139 +200,96 @@ class StateTracker:
 
     def get_progress_history(self, hours: int = 24) -> List[Dict[str, Any]]:
         """获取进度历史"""
-        cutoff_time = datetime.now() - timedelta(hours=hours)
-        
-        history = []
-        for snapshot in self.snapshots:
-            snapshot_time = datetime.fromisoformat(snapshot.timestamp)
-            if snapshot_time > cutoff_time:
-                history.append({
-                    "timestamp": snapshot.timestamp,
-                    "progress": snapshot.overall_progress,
-                    "current_phase": snapshot.current_phase,
-                    "active_tasks_count": len(snapshot.active_tasks),
-                    "recent_completions_count": len(snapshot.recent_completions)
-                })
-        
-        return history
+        cutoff = time.time() - hours * 3600
+        start = bisect_right(self._snapshot_times, cutoff)
+
+        return [
+            {
+                "timestamp": snapshot.timestamp,
+                "progress": snapshot.overall_progress,
+                "current_phase": snapshot.current_phase,
+                "active_tasks_count": len(snapshot.active_tasks),
+                "recent_completions_count": len(snapshot.recent_completions)
+            }
+            for snapshot in list(self.snapshots)[start:]
+        ]
 
     def get_task_timeline(self, task_id: str) -> List[TaskEvent]:
         """获取指定任务的事件时间线"""
-        return [event for event in self.events if event.task_id == task_id]
+        return list(self._task_events.get(task_id, ()))
 
     def get_phase_events(self, phase: str, hours: int = 24) -> List[TaskEvent]:
-        """获取指定阶段的事件"""
-        cutoff_time = datetime.now() - timedelta(hours=hours)
-        
-        phase_events = []
-        for event in self.events:
-            event_time = datetime.fromisoformat(event.timestamp)
-            if event.phase == phase and event_time > cutoff_time:
-                phase_events.append(event)
-        
-        return sorted(phase_events, key=lambda e: e.timestamp, reverse=True)
+        """获取指定阶段的事件（按时间倒序）"""
+        events = self._phase_events.get(phase)
+        if not events:
+            return []
+
+        cutoff = time.time() - hours * 3600
+        start = bisect_right(self._phase_event_times[phase], cutoff)
+        return list(events)[start:][::-1]
 
     def get_performance_metrics(self) -> Dict[str, Any]:
-        """获取性能指标"""
+        """获取性能指标（读取增量聚合结果，常数时间）"""
         if not self.events:
             return {"error": "No events recorded"}
         
-        # 计算任务完成时间
-        completion_times = []
-        task_durations = {}
-        
-        for event in self.events:
-            if event.event_type == "started":
-                task_durations[event.task_id] = {"started": event.timestamp}
-            elif event.event_type == "completed" and event.task_id in task_durations:
-                start_time = datetime.fromisoformat(task_durations[event.task_id]["started"])
-                end_time = datetime.fromisoformat(event.timestamp)
-                duration = (end_time - start_time).total_seconds()
-                completion_times.append(duration)
-        
-        # 计算统计信息
-        if completion_times:
-            avg_duration = sum(completion_times) / len(completion_times)
-            min_duration = min(completion_times)
-            max_duration = max(completion_times)
-        else:
-            avg_duration = min_duration = max_duration = 0
-        
-        # 计算每小时完成率
-        hourly_completions = self._calculate_hourly_completions()
+        durations = self.metrics.durations
+        duration_stats = durations.stats
         
         return {
-            "average_task_duration_seconds": round(avg_duration, 2),
-            "min_task_duration_seconds": round(min_duration, 2),
-            "max_task_duration_seconds": round(max_duration, 2),
-            "total_completed_tasks": len(completion_times),
-            "hourly_completion_rate": hourly_completions,
+            "average_task_duration_seconds": round(duration_stats.mean, 2),
+            "min_task_duration_seconds": round(duration_stats.min or 0, 2),
+            "max_task_duration_seconds": round(duration_stats.max or 0, 2),
+            "stddev_task_duration_seconds": round(duration_stats.stddev, 2),
+            "duration_percentiles_seconds": durations.histogram.percentiles(),
+            "duration_breakdown": self.metrics.get_duration_breakdown(),
+            "total_completed_tasks": duration_stats.count,
+            "hourly_completion_rate": self._calculate_hourly_completions(),
             "active_session_duration": self._get_session_duration()
         }
 
+    def get_eta_forecast(self, concurrency: int = 1) -> Dict[str, Any]:
+        """基于依赖图关键路径和实测耗时预测剩余时间"""
+        if self._eta_estimator is None:
+            self._eta_estimator = ETAEstimator(self.task_manager, self.metrics)
+            self._eta_estimator.rebuild()
+        return self._eta_estimator.forecast(concurrency)
+
     def _calculate_execution_stats(self) -> Dict[str, Any]:
         """计算执行统计信息"""
         # 今日统计
-        today = datetime.now().date()
-        today_events = [
-            e for e in self.events 
-            if datetime.fromisoformat(e.timestamp).date() == today
-        ]
-        
-        today_completions = len([e for e in today_events if e.event_type == "completed"])
-        today_failures = len([e for e in today_events if e.event_type == "failed"])
+        today_counts = self.metrics.get_day_counts(datetime.now().strftime("%Y-%m-%d"))
         
         # 阶段统计
-        phase_stats = {}
-        for phase_name in ["phase_1_files", 
-                          "phase_2_architecture", "phase_3_project"]:
-            phase_events = [e for e in self.events if e.phase == phase_name]
-            phase_stats[phase_name] = {
-                "total_events": len(phase_events),
-                "completions": len([e for e in phase_events if e.event_type == "completed"]),
-                "failures": len([e for e in phase_events if e.event_type == "failed"])
-            }
+        phase_stats = {
+            phase_name: self.metrics.get_phase_counts(phase_name)
+            for phase_name in ["phase_1_files", "phase_2_architecture", "phase_3_project"]
+        }
         
         return {
-            "today_completions": today_completions,
-            "today_failures": today_failures,
-            "total_events": len(self.events),
+            "today_completions": today_counts["completed"],
+            "today_failures": today_counts["failed"],
+            # 与成功率、阶段统计同一口径：加载以来的全部事件；内存中只保留最近的事件
+            "total_events": self.metrics.total_events,
+            "recent_events_retained": len(self.events),
             "phase_statistics": phase_stats,
             "success_rate": self._calculate_success_rate()
         }
 
     def _calculate_success_rate(self) -> float:
         """计算成功率"""
-        completed = len([e for e in self.events if e.event_type == "completed"])
-        failed = len([e for e in self.events if e.event_type == "failed"])
-        total = completed + failed
-        
-        if total == 0:
-            return 100.0
-        
-        return round((completed / total) * 100, 2)
+        return self.metrics.get_success_rate()
 
     def _calculate_hourly_completions(self) -> List[Dict[str, Any]]:
         """计算每小时完成数"""
-        hourly_data = {}
-        
-        for event in self.events:
-            if event.event_type == "completed":
-                hour_key = datetime.fromisoformat(event.timestamp).strftime("%Y-%m-%d %H:00")
-                hourly_data[hour_key] = hourly_data.get(hour_key, 0) + 1
-        
-        return [
-            {"hour": hour, "completions": count}
-            for hour, count in sorted(hourly_data.items())
-        ]
+        return self.metrics.get_hourly_completions()
 
     def _get_session_duration(self) -> str:
         """获取会话持续时间"""
-        if not self.events:
+        if self.metrics.first_event_time is None:
             return "0 minutes"
         
-        first_event = min(self.events, key=lambda e: e.timestamp)
-        session_start = datetime.fromisoformat(first_event.timestamp)
+        session_start = datetime.fromtimestamp(self.metrics.first_event_time)
         duration = datetime.now() - session_start
         
         hours = int(duration.total_seconds() // 3600)
@@ -331,42 +342,138 @@ class StateTracker:
 
     def load_state(self):
         """加载状态数据"""
+        self._reset_buffers()
         try:
-            # 加载快照
-            if self.snapshots_file.exists():
-                with open(self.snapshots_file, 'r', encoding='utf-8') as f:
-                    snapshots_data = json.load(f)
-                    self.snapshots = [
-                        StateSnapshot(**data) for data in snapshots_data
-                    ]
-            
-            # 加载事件
-            if self.events_file.exists():
-                with open(self.events_file, 'r', encoding='utf-8') as f:
-                    events_data = json.load(f)
-                    self.events = [
-                        TaskEvent(**data) for data in events_data
-                    ]
+            migrated = self._migrate_legacy_state()
+
+            snapshots_data = self._read_lines(self.snapshots_file)
+            self._snapshot_lines = len(snapshots_data)
+            for data in snapshots_data:
+                snapshot = StateSnapshot(**data)
+                self._add_snapshot(snapshot, datetime.fromisoformat(snapshot.timestamp).timestamp())
+
+            events_data = self._read_lines(self.events_file)
+            self._event_lines = len(events_data)
+            for data in events_data:
+                event = TaskEvent(**data)
+                self._add_event(event, datetime.fromisoformat(event.timestamp).timestamp())
+
+            if migrated:
+                self.save_state()
+            else:
+                self._compact_if_needed()
         except Exception as e:
             print(f"Error loading state: {e}")
-            self.snapshots = []
-            self.events = []
+            self._reset_buffers()
 
     def save_state(self):
-        """保存状态数据"""
+        """压缩日志文件：在锁内保留文件中最近的记录并原子替换"""
         try:
-            # 保存快照
-            with open(self.snapshots_file, 'w', encoding='utf-8') as f:
-                snapshots_data = [asdict(snapshot) for snapshot in self.snapshots]
-                json.dump(snapshots_data, f, indent=2, ensure_ascii=False)
-            
-            # 保存事件
-            with open(self.events_file, 'w', encoding='utf-8') as f:
-                events_data = [asdict(event) for event in self.events]
-                json.dump(events_data, f, indent=2, ensure_ascii=False)
+            self._snapshot_lines = self._compact_file(self.snapshots_file, self.MAX_SNAPSHOTS)
+            self._event_lines = self._compact_file(self.events_file, self.MAX_EVENTS)
         except Exception as e:
             print(f"Error saving state: {e}")
 
+    def _compact_file(self, file_path: Path, keep: int) -> int:
+        """将NDJSON文件截为最后 keep 条记录，返回保留的行数"""
+        with self.state_store.lock(file_path.stem):
+            records = self._read_lines(file_path)[-keep:]
+            self._rewrite_lines(file_path, records)
+            return len(records)
+
+    def _reset_buffers(self):
+        """清空缓冲区和索引"""
+        self.snapshots.clear()
+        self.events.clear()
+        self._snapshot_times.clear()
+        self._event_times.clear()
+        self._task_events = {}
+        self._phase_events = {}
+        self._phase_event_times = {}
+        self.metrics.reset()
+        self._snapshot_lines = 0
+        self._event_lines = 0
+
+    def _add_snapshot(self, snapshot: StateSnapshot, timestamp: float):
+        """将快照写入环形缓冲区"""
+        self.snapshots.append(snapshot)
+        self._snapshot_times.append(timestamp)
+
+    def _add_event(self, event: TaskEvent, timestamp: float):
+        """将事件写入环形缓冲区并维护索引"""
+        # 缓冲区满时最旧的事件会被挤出，它同时也是所在任务/阶段索引中最旧的一条
+        if len(self.events) == self.events.maxlen:
+            evicted = self.events[0]
+            task_events = self._task_events.get(evicted.task_id)
+            if task_events:
+                task_events.popleft()
+                if not task_events:
+                    del self._task_events[evicted.task_id]
+            phase_events = self._phase_events.get(evicted.phase)
+            if phase_events:
+                phase_events.popleft()
+                self._phase_event_times[evicted.phase].popleft()
+
+        self.events.append(event)
+        self._event_times.append(timestamp)
+        self._task_events.setdefault(event.task_id, deque()).append(event)
+        self._phase_events.setdefault(event.phase, deque()).append(event)
+        self._phase_event_times.setdefault(event.phase, deque()).append(timestamp)
+        self.metrics.add_event(event.event_type, event.task_id, event.task_type, event.phase, timestamp)
+
+    def _compact_if_needed(self):
+        """日志文件行数超过保留上限两倍时压缩"""
+        if (self._event_lines > 2 * self.MAX_EVENTS
+                or self._snapshot_lines > 2 * self.MAX_SNAPSHOTS):
+            self.save_state()
+
+    def _migrate_legacy_state(self) -> bool:
+        """将旧版 JSON 数组格式的状态文件迁移为 NDJSON"""
+        migrated = False
+        for legacy_file, ndjson_file in ((self.legacy_snapshots_file, self.snapshots_file),
+                                         (self.legacy_events_file, self.events_file)):
+            with self.state_store.lock(ndjson_file.stem):
+                if legacy_file.exists() and not ndjson_file.exists():
+                    with open(legacy_file, 'r', encoding='utf-8') as f:
+                        records = json.load(f)
+                    self._rewrite_lines(ndjson_file, records)
+                    legacy_file.unlink()
+                    migrated = True
+        return migrated
+
+    def _append_line(self, file_path: Path, record: Dict[str, Any]):
+        """在文件锁内追加一行NDJSON记录（单次write）"""
+        try:
+            self.state_store.append_lines(file_path.name, [record])
+        except Exception as e:
+            print(f"Error appending state: {e}")
+
+    @staticmethod
+    def _read_lines(file_path: Path) -> List[Dict[str, Any]]:
+        """读取NDJSON文件，跳过损坏的行"""
+        if not file_path.exists():
+            return []
+
+        records = []
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return records
+
+    @staticmethod
+    def _rewrite_lines(file_path: Path, records: List[Dict[str, Any]]):
+        """通过临时文件加原子重命名重写NDJSON文件"""
+        StateStore.atomic_write_text(file_path, "".join(
+            json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+            for record in records
+        ))
+
     def export_summary_report(self) -> Dict[str, Any]:
         """导出摘要报告"""
         current_status = self.get_current_status()
@@ -0,0 +1,169 @@
+"""
+任务日志存储：以追加写入的变更记录代替整文件重写
+
+存储由两部分组成：
+- 快照文件 (tasks.json)：与原有格式一致的完整任务字典
+- 日志文件 (tasks.journal)：每行一条JSON变更记录 (NDJSON)
+
+加载时先读取快照再按顺序重放日志；日志记录数超过阈值后
+将当前任务写入临时文件并通过原子重命名替换快照，随后清空日志。
+
+读写都在 .codelens/<快照名>.lock 的跨进程锁内进行。日志文件大小作为版本戳：
+若其他进程在本实例加载之后追加过记录，压缩会被跳过，避免用过期数据覆盖快照。
+"""
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from ..services.state_store import StateStore
+
+
+class TaskJournal:
+    """任务变更日志"""
+
+    # 日志操作类型
+    OP_PUT = "put"  # 写入完整任务
+    OP_UPDATE = "update"  # 更新部分字段
+    OP_DELETE = "delete"  # 删除任务
+
+    def __init__(self, snapshot_file: Path, compact_threshold: int = 500, durable: bool = True):
+        self.snapshot_file = Path(snapshot_file)
+        self.journal_file = self.snapshot_file.with_suffix(".journal")
+        self.compact_threshold = compact_threshold
+        self.durable = durable  # 是否在每次追加后fsync
+        self.pending_records = 0  # 自上次压缩以来的日志记录数
+        self.state_store = StateStore(self.snapshot_file.parent, durable)
+        self.lock_key = self.snapshot_file.stem
+        self._journal_size = 0  # 本实例已知的日志大小（字节）
+        self._stale = False  # 是否有其他进程追加了本实例未加载的记录
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """加载快照并重放日志，返回任务字典数据"""
+        with self.state_store.lock(self.lock_key):
+            return self._load_locked()
+
+    def _load_locked(self) -> Dict[str, Dict[str, Any]]:
+        data: Dict[str, Dict[str, Any]] = {}
+
+        if self.snapshot_file.exists():
+            with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+
+        self.pending_records = 0
+        self._journal_size = 0
+        self._stale = False
+        if not self.journal_file.exists():
+            return data
+
+        with open(self.journal_file, 'rb') as f:
+            raw = f.read()
+
+        # 最后一行没有换行符说明写入时进程崩溃，截掉不完整的尾部
+        valid_length = raw.rfind(b"\n") + 1
+        if valid_length < len(raw):
+            with open(self.journal_file, 'r+b') as f:
+                f.truncate(valid_length)
+        self._journal_size = valid_length
+
+        for line_no, line in enumerate(raw[:valid_length].decode('utf-8').splitlines(), 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Error replaying task journal line {line_no}: invalid record")
+                continue
+            self._apply(data, record)
+            self.pending_records += 1
+
+        return data
+
+    def append(self, record: Dict[str, Any]):
+        """追加单条变更记录"""
+        self.append_many([record])
+
+    def append_many(self, records: List[Dict[str, Any]]):
+        """追加多条变更记录（一次写入）"""
+        if not records:
+            return
+
+        self.journal_file.parent.mkdir(parents=True, exist_ok=True)
+        payload = "".join(
+            json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+            for record in records
+        ).encode('utf-8')
+        with self.state_store.lock(self.lock_key):
+            with open(self.journal_file, 'ab') as f:
+                if f.tell() != self._journal_size:
+                    self._stale = True
+                f.write(payload)
+                f.flush()
+                if self.durable:
+                    os.fsync(f.fileno())
+                self._journal_size = f.tell()
+
+        self.pending_records += len(records)
+
+    def needs_compaction(self, task_count: int) -> bool:
+        """判断是否需要压缩日志
+
+        阈值随任务数增长，保证压缩成本摊销到每次变更上为常数。
+        """
+        return self.pending_records >= max(self.compact_threshold, task_count)
+
+    def compact(self, data: Dict[str, Dict[str, Any]], force: bool = False) -> bool:
+        """将完整任务数据写入快照并清空日志
+
+        force 为 False 时，若日志在本实例加载后被其他进程追加过则放弃压缩并返回 False。
+        """
+        with self.state_store.lock(self.lock_key):
+            if not force and (self._stale or self._current_journal_size() != self._journal_size):
+                self._stale = True
+                return False
+
+            StateStore.atomic_write_text(self.snapshot_file,
+                                         json.dumps(data, indent=2, ensure_ascii=False), self.durable)
+
+            # 快照已包含全部变更，日志可以安全清空
+            if self.journal_file.exists():
+                self.journal_file.unlink()
+            self.pending_records = 0
+            self._journal_size = 0
+            self._stale = False
+            return True
+
+    def _current_journal_size(self) -> int:
+        try:
+            return self.journal_file.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    @classmethod
+    def put_record(cls, task_data: Dict[str, Any]) -> Dict[str, Any]:
+        """构造写入完整任务的记录"""
+        return {"op": cls.OP_PUT, "task": task_data}
+
+    @classmethod
+    def update_record(cls, task_id: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """构造更新字段的记录"""
+        return {"op": cls.OP_UPDATE, "id": task_id, "fields": fields}
+
+    @classmethod
+    def delete_record(cls, task_id: str) -> Dict[str, Any]:
+        """构造删除任务的记录"""
+        return {"op": cls.OP_DELETE, "id": task_id}
+
+    def _apply(self, data: Dict[str, Dict[str, Any]], record: Dict[str, Any]):
+        """将单条记录应用到任务数据"""
+        op: Optional[str] = record.get("op")
+        if op == self.OP_PUT:
+            task_data = record["task"]
+            data[task_data["id"]] = task_data
+        elif op == self.OP_UPDATE:
+            task_data = data.get(record["id"])
+            if task_data is not None:
+                task_data.update(record.get("fields", {}))
+        elif op == self.OP_DELETE:
+            data.pop(record["id"], None)
@@ -1,13 +1,20 @@
 """
 任务管理器：管理文档生成任务的创建、调度和执行
 """
-import json
+import heapq
+import os
 import time
+from collections import defaultdict
+from contextlib import contextmanager
 from dataclasses import dataclass, asdict
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Iterable, Tuple, Set
+
+from .task_journal import TaskJournal
+from ..logging import get_logger
+from ..services.metrics_registry import get_metrics_registry
 
 
 class TaskStatus(Enum):
@@ -78,15 +85,61 @@ class Task:
         return cls(**data)
 
 
+# 优先级排序权重
+PRIORITY_ORDER = {"high": 0, "normal": 1, "low": 2}
+
+
 class TaskManager:
     """任务管理器"""
 
-    def __init__(self, project_path: str):
+    # 支持的存储后端
+    STORAGE_JSON = "json"  # tasks.json 快照 + 追加日志
+    STORAGE_SQLITE = "sqlite"  # .codelens/tasks.db (WAL)
+
+    def __init__(self, project_path: str, storage: Optional[str] = None):
         self.project_path = Path(project_path)
+        self.logger = get_logger(component="TaskManager", operation="task_management")
         self.tasks: Dict[str, Task] = {}
+        # 去重索引: (type, phase, target_file, target_module, description) -> task_id
+        self._dedupe_index: Dict[Tuple, str] = {}
+        # 二级索引（dict保持插入顺序，与self.tasks的遍历顺序一致）
+        self._phase_index: Dict[str, Dict[str, Task]] = defaultdict(dict)
+        self._status_index: Dict[TaskStatus, Dict[str, Task]] = defaultdict(dict)
+        self._file_index: Dict[str, Dict[str, Task]] = defaultdict(dict)
+        self._phase_status_counts: Dict[str, Dict[TaskStatus, int]] = defaultdict(lambda: defaultdict(int))
+        # 依赖关系: 反向边 (dep_id -> 依赖它的任务) 以及每个任务未满足的依赖数
+        self._dependents: Dict[str, Set[str]] = defaultdict(set)
+        self._unmet_dependencies: Dict[str, int] = {}
+        # 就绪队列: 每个阶段一个最小堆，元素为 (优先级, 创建序号, task_id)，惰性删除
+        self._ready_heaps: Dict[str, List[Tuple[int, int, str]]] = defaultdict(list)
+        self._heap_members: Set[str] = set()
+        self._task_seq: Dict[str, int] = {}
+        self._next_seq = 0
+        # batch_changes() 期间缓存的变更记录
+        self._pending_changes: Optional[List[Dict[str, Any]]] = None
+        # 任务集合的结构版本：增删任务或重新加载时递增（状态变化不递增），供派生数据判断是否过期
+        self.generation = 0
         self.task_file = self.project_path / ".codelens" / "tasks.json"
+        self.db_file = self.project_path / ".codelens" / "tasks.db"
+        self.storage = self._resolve_storage(storage)
+        if self.storage == self.STORAGE_SQLITE:
+            from .sqlite_store import SQLiteTaskStore
+            self.store = SQLiteTaskStore(self.db_file, legacy_snapshot_file=self.task_file)
+        else:
+            self.store = TaskJournal(self.task_file)
         self.load_tasks()
 
+    def _resolve_storage(self, storage: Optional[str]) -> str:
+        """确定存储后端：显式参数 > 环境变量 CODELENS_TASK_STORE > 已存在的 tasks.db > json"""
+        storage = storage or os.getenv("CODELENS_TASK_STORE")
+        if not storage:
+            storage = self.STORAGE_SQLITE if self.db_file.exists() else self.STORAGE_JSON
+
+        storage = storage.lower()
+        if storage not in (self.STORAGE_JSON, self.STORAGE_SQLITE):
+            raise ValueError(f"不支持的任务存储后端: {storage}")
+        return storage
+
     def create_task(self, task_type: TaskType, description: str, phase: str,
                     target_file: Optional[str] = None, target_module: Optional[str] = None,
                     template_name: Optional[str] = None, output_path: Optional[str] = None,
@@ -103,13 +156,7 @@ class TaskManager:
         
         # 🔧 根本修复: 统一ID生成逻辑，支持预定义ID
         if task_id is None:
-            # 没有提供预定义ID，生成新的
-            import uuid
-            task_id = f"{task_type.value}_{int(time.time() * 1000)}_{str(uuid.uuid4())[:8]}"
-            
-            # 确保ID不会冲突
-            while task_id in self.tasks:
-                task_id = f"{task_type.value}_{int(time.time() * 1000)}_{str(uuid.uuid4())[:8]}"
+            task_id = self._generate_task_id(task_type)
         else:
             # 使用预定义ID，检查是否已存在
             if task_id in self.tasks:
@@ -131,35 +178,214 @@ class TaskManager:
             metadata=metadata or {}
         )
 
-        self.tasks[task_id] = task
-        self.save_tasks()
+        self._add_task(task)
+        self._record_changes([TaskJournal.put_record(task.to_dict())])
         return task_id
-    
+
+    def create_tasks_bulk(self, task_specs: Iterable[Dict[str, Any]]) -> Dict[str, List[str]]:
+        """批量创建任务，只持久化一次
+
+        每个任务描述是一个字典，键与 create_task 的参数相同
+        （task_type 可以是 TaskType 或其字符串值）。
+        依赖ID会在一次遍历中统一校验，允许引用同一批次中的任务；
+        存在未知依赖时抛出 ValueError，且不会写入任何任务。
+
+        Returns:
+            {"task_ids": 与输入顺序一致的任务ID（重复任务为已存在的ID）,
+             "created_ids": 本次新建的任务ID,
+             "existing_ids": 已存在而未创建的任务ID（去重命中或预定义ID已被占用）}
+        """
+        new_tasks: List[Task] = []
+        result_ids: List[str] = []
+        existing_ids: List[str] = []
+        batch_index: Dict[Tuple, str] = {}
+        batch_ids = set()
+        duplicate_count = 0
+
+        for spec in task_specs:
+            task_type = spec["task_type"]
+            if not isinstance(task_type, TaskType):
+                task_type = TaskType(task_type)
+
+            key = self._task_key(task_type, spec["phase"], spec.get("target_file"),
+                                 spec.get("target_module"), spec["description"])
+            existing_task_id = self._dedupe_index.get(key) or batch_index.get(key)
+            if existing_task_id:
+                duplicate_count += 1
+                result_ids.append(existing_task_id)
+                existing_ids.append(existing_task_id)
+                continue
+
+            task_id = spec.get("task_id")
+            if task_id is None:
+                task_id = self._generate_task_id(task_type, batch_ids)
+            elif task_id in self.tasks or task_id in batch_ids:
+                self.logger.warning(f"任务ID {task_id} 已存在，跳过创建")
+                result_ids.append(task_id)
+                existing_ids.append(task_id)
+                continue
+
+            new_tasks.append(Task(
+                id=task_id,
+                type=task_type,
+                description=spec["description"],
+                phase=spec["phase"],
+                target_file=spec.get("target_file"),
+                target_module=spec.get("target_module"),
+                template_name=spec.get("template_name"),
+                output_path=spec.get("output_path"),
+                dependencies=list(spec.get("dependencies") or []),
+                priority=spec.get("priority", "normal"),
+                estimated_time=spec.get("estimated_time"),
+                metadata=spec.get("metadata") or {}
+            ))
+            batch_index[key] = task_id
+            batch_ids.add(task_id)
+            result_ids.append(task_id)
+
+        # 一次遍历校验所有依赖
+        missing_dependencies = {
+            dep_id
+            for task in new_tasks
+            for dep_id in task.dependencies
+            if dep_id not in self.tasks and dep_id not in batch_ids
+        }
+        if missing_dependencies:
+            raise ValueError(f"未知的依赖任务ID: {sorted(missing_dependencies)}")
+
+        if duplicate_count:
+            self.logger.info(f"跳过 {duplicate_count} 个重复任务")
+
+        for task in new_tasks:
+            self._add_task(task)
+        self._record_changes([TaskJournal.put_record(task.to_dict()) for task in new_tasks])
+        return {
+            "task_ids": result_ids,
+            "created_ids": [task.id for task in new_tasks],
+            "existing_ids": existing_ids
+        }
+
+    def _generate_task_id(self, task_type: TaskType, reserved_ids: Optional[set] = None) -> str:
+        """生成不冲突的任务ID"""
+        import uuid
+        while True:
+            task_id = f"{task_type.value}_{int(time.time() * 1000)}_{str(uuid.uuid4())[:8]}"
+            if task_id not in self.tasks and (reserved_ids is None or task_id not in reserved_ids):
+                return task_id
+
+    @staticmethod
+    def _task_key(task_type: TaskType, phase: str, target_file: Optional[str],
+                  target_module: Optional[str], description: str) -> Tuple:
+        """任务去重键"""
+        return (task_type.value, phase, target_file, target_module, description)
+
+    def _add_task(self, task: Task):
+        """将任务加入内存并更新索引"""
+        self.generation += 1
+        self.tasks[task.id] = task
+        self._dedupe_index.setdefault(self._task_key(task.type, task.phase, task.target_file,
+                                                     task.target_module, task.description), task.id)
+        self._index_task(task)
+
+        # 新任务若已完成（仅在加载时出现），依赖它的任务未满足数减一
+        if task.status == TaskStatus.COMPLETED:
+            for dependent_id in self._dependents.get(task.id, ()):
+                if dependent_id in self._unmet_dependencies:
+                    self._unmet_dependencies[dependent_id] -= 1
+                    self._push_if_ready(dependent_id)
+
+        self._unmet_dependencies[task.id] = self._count_unmet_dependencies(task)
+        self._push_if_ready(task.id)
+
+    def _index_task(self, task: Task):
+        """写入二级索引和反向依赖边"""
+        self._task_seq[task.id] = self._next_seq
+        self._next_seq += 1
+        self._phase_index[task.phase][task.id] = task
+        self._status_index[task.status][task.id] = task
+        self._phase_status_counts[task.phase][task.status] += 1
+        if task.target_file:
+            self._file_index[task.target_file][task.id] = task
+        for dep_id in task.dependencies:
+            self._dependents[dep_id].add(task.id)
+
+    def _remove_task(self, task_id: str):
+        """从内存中移除任务并更新索引"""
+        self.generation += 1
+        task = self.tasks.pop(task_id)
+        key = self._task_key(task.type, task.phase, task.target_file,
+                             task.target_module, task.description)
+        if self._dedupe_index.get(key) == task_id:
+            del self._dedupe_index[key]
+
+        del self._phase_index[task.phase][task_id]
+        del self._status_index[task.status][task_id]
+        self._phase_status_counts[task.phase][task.status] -= 1
+        if task.target_file:
+            self._file_index[task.target_file].pop(task_id, None)
+        for dep_id in task.dependencies:
+            self._dependents[dep_id].discard(task_id)
+        self._unmet_dependencies.pop(task_id, None)
+        self._task_seq.pop(task_id, None)
+        self._heap_members.discard(task_id)
+
+        # 已完成的任务被删除后，依赖它的任务重新变为未满足
+        if task.status == TaskStatus.COMPLETED:
+            for dependent_id in self._dependents.get(task_id, ()):
+                if dependent_id in self._unmet_dependencies:
+                    self._unmet_dependencies[dependent_id] += 1
+
+    def _rebuild_indexes(self):
+        """根据当前任务重建全部索引和就绪队列"""
+        self.generation += 1
+        self._dedupe_index = {}
+        self._phase_index = defaultdict(dict)
+        self._status_index = defaultdict(dict)
+        self._file_index = defaultdict(dict)
+        self._phase_status_counts = defaultdict(lambda: defaultdict(int))
+        self._dependents = defaultdict(set)
+        self._unmet_dependencies = {}
+        self._ready_heaps = defaultdict(list)
+        self._heap_members = set()
+        self._task_seq = {}
+        self._next_seq = 0
+
+        for task in self.tasks.values():
+            self._dedupe_index.setdefault(
+                self._task_key(task.type, task.phase, task.target_file,
+                               task.target_module, task.description),
+                task.id
+            )
+            self._index_task(task)
+
+        for task in self.tasks.values():
+            self._unmet_dependencies[task.id] = self._count_unmet_dependencies(task)
+            self._push_if_ready(task.id)
+
     def _find_existing_task(self, task_type: TaskType, phase: str, target_file: Optional[str], 
                            target_module: Optional[str], description: str) -> Optional[str]:
         """查找现有的相同任务"""
-        for task_id, task in self.tasks.items():
-            if (task.type == task_type and 
-                task.phase == phase and
-                task.target_file == target_file and
-                task.target_module == target_module and
-                task.description == description):
-                return task_id
-        return None
+        return self._dedupe_index.get(self._task_key(task_type, phase, target_file,
+                                                     target_module, description))
 
     def get_task(self, task_id: str) -> Optional[Task]:
         """获取指定任务"""
         return self.tasks.get(task_id)
 
     def update_task_status(self, task_id: str, status: TaskStatus,
-                           error_message: Optional[str] = None) -> bool:
-        """更新任务状态"""
+                           error_message: Optional[str] = None,
+                           metadata_updates: Optional[Dict[str, Any]] = None) -> bool:
+        """更新任务状态
+
+        Args:
+            metadata_updates: 同时合并到任务元数据的字段，值为 None 表示删除该字段
+        """
         if task_id not in self.tasks:
             return False
 
         task = self.tasks[task_id]
         old_status = task.status
-        task.status = status
+        self._set_status(task, status)
 
         # 更新时间戳
         if status == TaskStatus.IN_PROGRESS and old_status != TaskStatus.IN_PROGRESS:
@@ -170,43 +396,87 @@ class TaskManager:
         if error_message:
             task.error_message = error_message
 
-        self.save_tasks()
+        fields = {
+            "status": task.status.value,
+            "started_at": task.started_at,
+            "completed_at": task.completed_at,
+            "error_message": task.error_message
+        }
+        if metadata_updates:
+            for key, value in metadata_updates.items():
+                if value is None:
+                    task.metadata.pop(key, None)
+                else:
+                    task.metadata[key] = value
+            fields["metadata"] = task.metadata
+
+        self._record_changes([TaskJournal.update_record(task_id, fields)])
         return True
 
-    def get_ready_tasks(self, phase: Optional[str] = None) -> List[Task]:
-        """获取可执行的任务（依赖已满足）"""
-        ready_tasks = []
+    def get_ready_tasks(self, phase: Optional[str] = None, limit: Optional[int] = None) -> List[Task]:
+        """获取可执行的任务（依赖已满足），按优先级排序
 
-        for task in self.tasks.values():
-            if phase and task.phase != phase:
-                continue
+        Args:
+            limit: 只返回前 limit 个任务（使用部分排序）
+        """
+        phases = [phase] if phase else list(self._ready_heaps.keys())
 
-            if task.status != TaskStatus.PENDING:
-                continue
+        entries = []
+        for phase_name in phases:
+            heap = self._ready_heaps.get(phase_name)
+            if heap:
+                entries.extend(entry for entry in heap if self._is_ready_entry(entry, phase_name))
 
-            # 检查依赖是否满足
-            if self._are_dependencies_satisfied(task):
-                ready_tasks.append(task)
+        if limit is not None:
+            entries = heapq.nsmallest(limit, entries)
+        else:
+            entries.sort()
+        return [self.tasks[task_id] for _, _, task_id in entries]
 
-        # 按优先级排序
-        priority_order = {"high": 0, "normal": 1, "low": 2}
-        ready_tasks.sort(key=lambda t: priority_order.get(t.priority, 1))
+    def get_next_task(self, phase: Optional[str] = None) -> Optional[Task]:
+        """获取下一个应该执行的任务（查看就绪堆顶）"""
+        phases = [phase] if phase else list(self._ready_heaps.keys())
 
-        return ready_tasks
+        best_entry = None
+        for phase_name in phases:
+            entry = self._peek_ready(phase_name)
+            if entry is not None and (best_entry is None or entry < best_entry):
+                best_entry = entry
 
-    def get_next_task(self, phase: Optional[str] = None) -> Optional[Task]:
-        """获取下一个应该执行的任务"""
-        ready_tasks = self.get_ready_tasks(phase)
-        return ready_tasks[0] if ready_tasks else None
+        return self.tasks[best_entry[2]] if best_entry else None
 
     def get_phase_tasks(self, phase: str) -> List[Task]:
         """获取指定阶段的所有任务"""
-        return [task for task in self.tasks.values() if task.phase == phase]
+        return list(self._phase_index.get(phase, {}).values())
+
+    def get_phase_task_map(self, phase: str) -> Dict[str, Task]:
+        """获取阶段任务索引的只读视图（按创建顺序，不复制）"""
+        return self._phase_index.get(phase, {})
+
+    def get_tasks_by_status(self, status: TaskStatus) -> List[Task]:
+        """获取指定状态的所有任务"""
+        return list(self._status_index.get(status, {}).values())
+
+    def get_tasks_by_file(self, target_file: str) -> List[Task]:
+        """获取指定目标文件的所有任务"""
+        return list(self._file_index.get(target_file, {}).values())
+
+    def get_dependent_tasks(self, task_id: str) -> List[Task]:
+        """获取直接依赖指定任务的任务"""
+        return [self.tasks[dep_id] for dep_id in self._dependents.get(task_id, ()) if dep_id in self.tasks]
+
+    def get_status_counts(self, phase: Optional[str] = None) -> Dict[str, int]:
+        """获取各状态的任务数（O(状态数)）"""
+        if phase is None:
+            return {status.value: len(self._status_index.get(status, {})) for status in TaskStatus}
+
+        counts = self._phase_status_counts.get(phase, {})
+        return {status.value: counts.get(status, 0) for status in TaskStatus}
 
     def get_phase_progress(self, phase: str) -> Dict[str, Any]:
         """获取阶段进度"""
-        phase_tasks = self.get_phase_tasks(phase)
-        if not phase_tasks:
+        total = len(self._phase_index.get(phase, {}))
+        if not total:
             return {
                 "total_tasks": 0,
                 "completed_tasks": 0,
@@ -217,25 +487,23 @@ class TaskManager:
                 "can_proceed": True
             }
 
-        completed = len([t for t in phase_tasks if t.status == TaskStatus.COMPLETED])
-        in_progress = len([t for t in phase_tasks if t.status == TaskStatus.IN_PROGRESS])
-        pending = len([t for t in phase_tasks if t.status == TaskStatus.PENDING])
-        failed = len([t for t in phase_tasks if t.status == TaskStatus.FAILED])
+        counts = self._phase_status_counts[phase]
+        completed = counts[TaskStatus.COMPLETED]
 
         return {
-            "total_tasks": len(phase_tasks),
+            "total_tasks": total,
             "completed_tasks": completed,
-            "in_progress_tasks": in_progress,
-            "pending_tasks": pending,
-            "failed_tasks": failed,
-            "completion_percentage": round((completed / len(phase_tasks)) * 100, 2),
-            "can_proceed": completed == len(phase_tasks)  # 所有任务都完成才能进入下一阶段
+            "in_progress_tasks": counts[TaskStatus.IN_PROGRESS],
+            "pending_tasks": counts[TaskStatus.PENDING],
+            "failed_tasks": counts[TaskStatus.FAILED],
+            "completion_percentage": round((completed / total) * 100, 2),
+            "can_proceed": completed == total  # 所有任务都完成才能进入下一阶段
         }
 
     def get_overall_progress(self) -> Dict[str, Any]:
         """获取总体进度"""
-        all_tasks = list(self.tasks.values())
-        if not all_tasks:
+        total = len(self.tasks)
+        if not total:
             return {
                 "total_tasks": 0,
                 "completed_tasks": 0,
@@ -244,7 +512,7 @@ class TaskManager:
                 "phases_progress": {}
             }
 
-        completed = len([t for t in all_tasks if t.status == TaskStatus.COMPLETED])
+        completed = len(self._status_index.get(TaskStatus.COMPLETED, {}))
         phases = ["phase_1_files", "phase_2_architecture", "phase_3_project"]
 
         phases_progress = {}
@@ -260,24 +528,23 @@ class TaskManager:
                 break
 
         return {
-            "total_tasks": len(all_tasks),
+            "total_tasks": total,
             "completed_tasks": completed,
-            "completion_percentage": round((completed / len(all_tasks)) * 100, 2),
+            "completion_percentage": round((completed / total) * 100, 2),
             "current_phase": current_phase,
             "phases_progress": phases_progress
         }
 
     def get_blocked_tasks(self) -> List[Task]:
         """获取被阻塞的任务"""
-        blocked = []
-        for task in self.tasks.values():
-            if task.status == TaskStatus.PENDING and not self._are_dependencies_satisfied(task):
-                blocked.append(task)
-        return blocked
+        return [
+            task for task in self._status_index.get(TaskStatus.PENDING, {}).values()
+            if self._unmet_dependencies.get(task.id, 0) > 0
+        ]
 
     def get_failed_tasks(self) -> List[Task]:
         """获取失败的任务"""
-        return [task for task in self.tasks.values() if task.status == TaskStatus.FAILED]
+        return self.get_tasks_by_status(TaskStatus.FAILED)
 
     def retry_failed_task(self, task_id: str) -> bool:
         """重试失败的任务"""
@@ -288,65 +555,177 @@ class TaskManager:
         if task.status != TaskStatus.FAILED:
             return False
 
-        task.status = TaskStatus.PENDING
+        self._set_status(task, TaskStatus.PENDING)
         task.error_message = None
         task.started_at = None
         task.completed_at = None
 
-        self.save_tasks()
+        self._record_changes([TaskJournal.update_record(task_id, {
+            "status": task.status.value,
+            "error_message": None,
+            "started_at": None,
+            "completed_at": None
+        })])
         return True
 
     def clear_tasks(self):
-        """清空所有任务"""
+        """清空所有任务（只删除本进程已加载的任务，以删除记录持久化）"""
+        task_ids = list(self.tasks)
         self.tasks.clear()
-        self.save_tasks()
+        self._rebuild_indexes()
+        self._record_changes([TaskJournal.delete_record(task_id) for task_id in task_ids])
 
     def delete_task(self, task_id: str) -> bool:
         """删除指定任务"""
         if task_id in self.tasks:
-            del self.tasks[task_id]
-            self.save_tasks()
+            self._remove_task(task_id)
+            self._record_changes([TaskJournal.delete_record(task_id)])
             return True
         return False
 
     def _are_dependencies_satisfied(self, task: Task) -> bool:
         """检查任务的依赖是否已满足"""
-        for dep_id in task.dependencies:
-            if dep_id not in self.tasks:
-                return False
-            if self.tasks[dep_id].status != TaskStatus.COMPLETED:
-                return False
-        return True
+        if task.id in self._unmet_dependencies:
+            return self._unmet_dependencies[task.id] == 0
+        return self._count_unmet_dependencies(task) == 0
+
+    def _count_unmet_dependencies(self, task: Task) -> int:
+        """统计任务未满足的依赖数（依赖不存在或未完成；重复列出的依赖只算一次，与反向依赖边一致）"""
+        return sum(
+            1 for dep_id in set(task.dependencies)
+            if dep_id not in self.tasks or self.tasks[dep_id].status != TaskStatus.COMPLETED
+        )
+
+    def _set_status(self, task: Task, status: TaskStatus):
+        """修改任务状态并增量维护索引和就绪队列"""
+        old_status = task.status
+        if old_status == status:
+            return
+
+        del self._status_index[old_status][task.id]
+        self._status_index[status][task.id] = task
+        counts = self._phase_status_counts[task.phase]
+        counts[old_status] -= 1
+        counts[status] += 1
+        task.status = status
+
+        # 完成状态变化会影响依赖该任务的其他任务
+        if status == TaskStatus.COMPLETED:
+            for dependent_id in self._dependents.get(task.id, ()):
+                if dependent_id in self._unmet_dependencies:
+                    self._unmet_dependencies[dependent_id] -= 1
+                    self._push_if_ready(dependent_id)
+        elif old_status == TaskStatus.COMPLETED:
+            for dependent_id in self._dependents.get(task.id, ()):
+                if dependent_id in self._unmet_dependencies:
+                    self._unmet_dependencies[dependent_id] += 1
+
+        if status == TaskStatus.PENDING:
+            self._push_if_ready(task.id)
+
+    def _push_if_ready(self, task_id: str):
+        """任务就绪时加入所在阶段的就绪堆"""
+        task = self.tasks.get(task_id)
+        if (task is None or task.status != TaskStatus.PENDING
+                or self._unmet_dependencies.get(task_id, 0) != 0
+                or task_id in self._heap_members):
+            return
+
+        entry = (PRIORITY_ORDER.get(task.priority, 1), self._task_seq[task_id], task_id)
+        heapq.heappush(self._ready_heaps[task.phase], entry)
+        self._heap_members.add(task_id)
+
+    def _is_ready_entry(self, entry: Tuple[int, int, str], phase: str) -> bool:
+        """检查堆元素是否仍然有效（惰性删除）"""
+        task_id = entry[2]
+        task = self.tasks.get(task_id)
+        return (task is not None and task.phase == phase
+                and task.status == TaskStatus.PENDING
+                and self._task_seq.get(task_id) == entry[1]
+                and self._unmet_dependencies.get(task_id, 0) == 0)
+
+    def _peek_ready(self, phase: str) -> Optional[Tuple[int, int, str]]:
+        """查看阶段就绪堆顶，顺带清理失效元素"""
+        heap = self._ready_heaps.get(phase)
+        while heap:
+            entry = heap[0]
+            if self._is_ready_entry(entry, phase):
+                return entry
+            heapq.heappop(heap)
+            if self._task_seq.get(entry[2]) == entry[1]:
+                self._heap_members.discard(entry[2])
+        return None
 
     def load_tasks(self):
-        """从文件加载任务"""
+        """从存储后端加载任务"""
         try:
-            if self.task_file.exists():
-                with open(self.task_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.tasks = {
-                        task_id: Task.from_dict(task_data)
-                        for task_id, task_data in data.items()
-                    }
+            data = self.store.load()
+            self.tasks = {
+                task_id: Task.from_dict(task_data)
+                for task_id, task_data in data.items()
+            }
         except Exception as e:
             print(f"Error loading tasks: {e}")
             self.tasks = {}
+        self._rebuild_indexes()
 
-    def save_tasks(self):
-        """保存任务到文件"""
-        try:
-            # 确保目录存在
-            self.task_file.parent.mkdir(parents=True, exist_ok=True)
+    def save_tasks(self, force: bool = True) -> bool:
+        """保存完整任务快照（JSON后端原子替换快照并清空日志）
 
+        force 为 False 时用于自动压缩：其他进程追加过变更时跳过，保留日志。
+        """
+        metrics = get_metrics_registry()
+        start = time.perf_counter()
+        result = "error"
+        try:
             data = {
                 task_id: task.to_dict()
                 for task_id, task in self.tasks.items()
             }
-
-            with open(self.task_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            saved = self.store.compact(data, force=force)
+            result = "saved" if saved else "skipped"
+            return saved
         except Exception as e:
             print(f"Error saving tasks: {e}")
+            return False
+        finally:
+            metrics.observe("save_tasks_seconds", time.perf_counter() - start,
+                            help="TaskManager.save_tasks duration")
+            metrics.inc("save_tasks_total", labels={"result": result},
+                        help="TaskManager.save_tasks calls by result")
+            metrics.set_gauge("tasks", len(self.tasks), help="Tasks held by the last saved task manager")
+
+    @contextmanager
+    def batch_changes(self):
+        """合并期间产生的所有变更记录，退出时一次性持久化（可嵌套）"""
+        if self._pending_changes is not None:
+            yield
+            return
+
+        self._pending_changes = []
+        try:
+            yield
+        finally:
+            records, self._pending_changes = self._pending_changes, None
+            self._record_changes(records)
+
+    def _record_changes(self, records: List[Dict[str, Any]]):
+        """追加变更记录，日志过长时压缩为快照
+
+        追加失败时直接抛出：用本进程的视图强制重写快照会丢掉其他进程追加的变更。
+        """
+        if self._pending_changes is not None:
+            self._pending_changes.extend(records)
+            return
+
+        try:
+            self.store.append_many(records)
+        except Exception as e:
+            self.logger.error(f"记录任务变更失败: {e}")
+            raise
+
+        if self.store.needs_compaction(len(self.tasks)):
+            self.save_tasks(force=False)
 
     def export_tasks_summary(self) -> Dict[str, Any]:
         """导出任务摘要"""
@@ -354,10 +733,7 @@ class TaskManager:
             "project_path": str(self.project_path),
             "total_tasks": len(self.tasks),
             "overall_progress": self.get_overall_progress(),
-            "task_summary": {
-                status.value: len([t for t in self.tasks.values() if t.status == status])
-                for status in TaskStatus
-            },
+            "task_summary": self.get_status_counts(),
             "phase_summary": {
                 phase: self.get_phase_progress(phase)
                 for phase in ["phase_1_files", "phase_2_architecture",
@@ -0,0 +1,157 @@
+"""
+任务调度器：为并行执行的多个工作进程分配任务租约
+
+多个助手会话或子代理可以同时从同一个项目领取任务：
+- claim_tasks 原子地领取 N 个就绪任务，并为每个任务写入带过期时间的租约
+- heartbeat 延长租约；release_task 凭租约完成或失败任务
+- 租约过期的任务在下一次调度操作时退回 PENDING 状态
+
+每次操作都在 .codelens/tasks.lock 的排他文件锁内重新加载任务状态，
+保证跨进程安全（无 fcntl 的平台退化为进程内锁）。transaction() 内的
+多个操作共用一次加载和一次持久化提交。
+"""
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+
+from .task_manager import TaskManager, TaskStatus, Task
+from ..services.state_store import StateStore
+
+
+class TaskScheduler:
+    """基于租约的并行任务调度器"""
+
+    LEASE_KEY = "lease"  # 租约在任务元数据中的键
+    DEFAULT_LEASE_SECONDS = 600
+
+    def __init__(self, task_manager: TaskManager, lease_seconds: int = DEFAULT_LEASE_SECONDS):
+        self.task_manager = task_manager
+        self.lease_seconds = lease_seconds
+        self.state_store = StateStore.for_project(task_manager.project_path)
+        self._transaction_depth = 0
+
+    def claim_tasks(self, worker_id: str, count: int = 1, phase: Optional[str] = None,
+                    lease_seconds: Optional[int] = None) -> List[Dict[str, Any]]:
+        """原子地领取最多 count 个就绪任务
+
+        Returns:
+            领取结果列表，每项包含任务对象和租约信息
+        """
+        lease_seconds = lease_seconds or self.lease_seconds
+        claimed = []
+
+        with self._locked_state():
+            with self.task_manager.batch_changes():
+                self._reclaim_expired()
+
+                for task in self.task_manager.get_ready_tasks(phase, limit=count):
+                    lease = self._new_lease(worker_id, lease_seconds)
+                    self.task_manager.update_task_status(task.id, TaskStatus.IN_PROGRESS,
+                                                         metadata_updates={self.LEASE_KEY: lease})
+                    claimed.append({"task": task, "lease": lease})
+
+        return claimed
+
+    def heartbeat(self, task_id: str, lease_id: str, lease_seconds: Optional[int] = None) -> bool:
+        """续租：租约仍有效时延长过期时间"""
+        lease_seconds = lease_seconds or self.lease_seconds
+
+        with self._locked_state():
+            task = self._get_leased_task(task_id, lease_id)
+            if task is None:
+                return False
+
+            lease = dict(task.metadata[self.LEASE_KEY])
+            now = time.time()
+            lease["heartbeat_at"] = now
+            lease["expires_at"] = now + lease_seconds
+            lease["expires_at_iso"] = datetime.fromtimestamp(now + lease_seconds).isoformat()
+            self.task_manager.update_task_status(task_id, TaskStatus.IN_PROGRESS,
+                                                 metadata_updates={self.LEASE_KEY: lease})
+            return True
+
+    def release_task(self, task_id: str, lease_id: str, status: TaskStatus = TaskStatus.COMPLETED,
+                     error_message: Optional[str] = None) -> bool:
+        """凭租约结束任务（完成、失败或放回队列），租约失效时返回 False"""
+        with self._locked_state():
+            if self._get_leased_task(task_id, lease_id) is None:
+                return False
+
+            self.task_manager.update_task_status(task_id, status, error_message,
+                                                 metadata_updates={self.LEASE_KEY: None})
+            return True
+
+    def reclaim_expired_leases(self) -> List[str]:
+        """将租约过期的任务退回 PENDING，返回被回收的任务ID"""
+        with self._locked_state():
+            with self.task_manager.batch_changes():
+                return self._reclaim_expired()
+
+    def get_active_leases(self) -> List[Dict[str, Any]]:
+        """列出当前所有有效租约（读取内存状态，不加锁）"""
+        now = time.time()
+        leases = []
+        for task in self.task_manager.get_tasks_by_status(TaskStatus.IN_PROGRESS):
+            lease = task.metadata.get(self.LEASE_KEY)
+            if lease and lease["expires_at"] > now:
+                leases.append({"task_id": task.id, **lease})
+        return leases
+
+    def _reclaim_expired(self) -> List[str]:
+        """回收过期租约（需在锁内调用）"""
+        now = time.time()
+        reclaimed = []
+        for task in self.task_manager.get_tasks_by_status(TaskStatus.IN_PROGRESS):
+            lease = task.metadata.get(self.LEASE_KEY)
+            if lease and lease["expires_at"] <= now:
+                self.task_manager.update_task_status(task.id, TaskStatus.PENDING,
+                                                     metadata_updates={self.LEASE_KEY: None})
+                reclaimed.append(task.id)
+        return reclaimed
+
+    def _get_leased_task(self, task_id: str, lease_id: str) -> Optional[Task]:
+        """返回持有指定有效租约的任务（需在锁内调用）"""
+        task = self.task_manager.get_task(task_id)
+        if not task or task.status != TaskStatus.IN_PROGRESS:
+            return None
+
+        lease = task.metadata.get(self.LEASE_KEY)
+        if not lease or lease["lease_id"] != lease_id or lease["expires_at"] <= time.time():
+            return None
+        return task
+
+    @staticmethod
+    def _new_lease(worker_id: str, lease_seconds: int) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "lease_id": str(uuid.uuid4()),
+            "worker_id": worker_id,
+            "claimed_at": now,
+            "heartbeat_at": now,
+            "expires_at": now + lease_seconds,
+            "expires_at_iso": datetime.fromtimestamp(now + lease_seconds).isoformat()
+        }
+
+    @contextmanager
+    def transaction(self):
+        """在一次加锁和加载内执行多个调度操作，退出时一次性提交全部变更"""
+        with self._locked_state():
+            with self.task_manager.batch_changes():
+                self._transaction_depth += 1
+                try:
+                    yield
+                finally:
+                    self._transaction_depth -= 1
+
+    @contextmanager
+    def _locked_state(self):
+        """持有任务存储的跨进程排他锁，并在锁内重新加载最新任务状态
+
+        事务内已持有锁且状态是最新的（尚未提交的变更也在内存中），不再重新加载。
+        """
+        with self.state_store.lock("tasks"):
+            if self._transaction_depth == 0:
+                self.task_manager.load_tasks()
+            yield
@@ -3,7 +3,10 @@
 CodeLens 四层架构精简文档模板系统
 为Claude Code提供16个核心文档模板，覆盖架构、模块、文件、项目四个层次
 """
-from typing import Dict, List, Any
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, List, Any, Mapping, Optional, Tuple
 
 # 导入日志系统
 try:
@@ -20,6 +23,7 @@ except ImportError:
 
 # 导入三层架构模板
 from .templates import ArchitectureTemplates, FileTemplates, ProjectTemplates
+from .template_compiler import CompiledTemplate, compile_template
 
 
 class DocumentTemplates:
@@ -32,6 +36,184 @@ class DocumentTemplates:
     PROJECT_README_TEMPLATE = ProjectTemplates.README_TEMPLATE
 
 
+# 模板内容 - 12个模板（增加创造模式3个模板）
+TEMPLATE_CONTENTS: Dict[str, str] = {
+    # 架构层模板 (6个)
+    'architecture': ArchitectureTemplates.OVERVIEW_TEMPLATE,
+    'tech_stack': ArchitectureTemplates.TECH_STACK_TEMPLATE,
+    'data_flow': ArchitectureTemplates.DATA_FLOW_TEMPLATE,
+    'system_architecture': ArchitectureTemplates.SYSTEM_ARCH_TEMPLATE,
+    'component_diagram': ArchitectureTemplates.COMPONENT_DIAGRAM_TEMPLATE,
+    'deployment_diagram': ArchitectureTemplates.DEPLOYMENT_DIAGRAM_TEMPLATE,
+
+    # 文件层模板 (1个)
+    'file_summary': FileTemplates.SUMMARY_TEMPLATE,
+
+    # 项目层模板 (5个)
+    'project_readme': ProjectTemplates.README_TEMPLATE,
+    'changelog': ProjectTemplates.CHANGELOG_TEMPLATE,
+
+    # 创造模式模板 (3个)
+    'create_requirement': ProjectTemplates.REQUIREMENT_TEMPLATE,
+    'create_analysis': ProjectTemplates.ANALYSIS_TEMPLATE,
+    'create_todo': ProjectTemplates.TODO_TEMPLATE
+}
+
+# 模板元数据（variables 在构建注册表时由模板内容解析得到）
+TEMPLATE_DEFINITIONS: Tuple[Dict[str, str], ...] = (
+    # ============== 架构层模板 (6个) ==============
+    {
+        'name': 'architecture',
+        'description': '架构概述模板 - 系统整体架构设计',
+        'type': 'architecture_level',
+        'layer': 'architecture',
+        'file_path': '/docs/architecture/overview.md'
+    },
+    {
+        'name': 'tech_stack',
+        'description': '技术栈模板 - 详细技术选型和架构原则',
+        'type': 'architecture_level',
+        'layer': 'architecture',
+        'file_path': '/docs/architecture/tech-stack.md'
+    },
+    {
+        'name': 'data_flow',
+        'description': '数据流模板 - 系统数据流转设计',
+        'type': 'architecture_level',
+        'layer': 'architecture',
+        'file_path': '/docs/architecture/data-flow.md'
+    },
+    {
+        'name': 'system_architecture',
+        'description': '系统架构图模板 - 可视化架构图表',
+        'type': 'architecture_level',
+        'layer': 'architecture',
+        'file_path': '/docs/architecture/diagrams/system-architecture.md'
+    },
+    {
+        'name': 'component_diagram',
+        'description': '组件图模板 - 组件关系和依赖',
+        'type': 'architecture_level',
+        'layer': 'architecture',
+        'file_path': '/docs/architecture/diagrams/component-diagram.md'
+    },
+    {
+        'name': 'deployment_diagram',
+        'description': '部署图模板 - 部署架构和环境配置',
+        'type': 'architecture_level',
+        'layer': 'architecture',
+        'file_path': '/docs/architecture/diagrams/deployment-diagram.md'
+    },
+
+    # ============== 文件层模板 (1个) ==============
+    {
+        'name': 'file_summary',
+        'description': '详细文件分析模板 - 包含流程图、变量作用域、函数依赖的完整文件分析',
+        'type': 'file_level',
+        'layer': 'file',
+        'file_path': '/docs/files/summaries/[file].md'
+    },
+
+    
+    # ============== 项目层模板 (3个) ==============
+    {
+        'name': 'project_readme',
+        'description': '项目README模板 - 项目主文档',
+        'type': 'project_level',
+        'layer': 'project',
+        'file_path': '/docs/project/README.md'
+    },
+    {
+        'name': 'changelog',
+        'description': '变更日志模板 - 变更记录',
+        'type': 'project_level',
+        'layer': 'project',
+        'file_path': '/docs/project/CHANGELOG.md'
+    },
+
+    # ============== 创造模式模板 (3个) ==============
+    {
+        'name': 'create_requirement',
+        'description': '功能需求确认模板 - 创造模式第一阶段：确认功能需求和验收标准',
+        'type': 'create_mode_level',
+        'layer': 'create',
+        'file_path': '/docs/project/create/requirements/[requirement_id].md'
+    },
+    {
+        'name': 'create_analysis',
+        'description': '功能实现分析模板 - 创造模式第二阶段：分析实现方案和影响',
+        'type': 'create_mode_level',
+        'layer': 'create',
+        'file_path': '/docs/project/create/analysis/[analysis_id].md'
+    },
+    {
+        'name': 'create_todo',
+        'description': '功能实现计划模板 - 创造模式第三阶段：生成详细实现计划',
+        'type': 'create_mode_level',
+        'layer': 'create',
+        'file_path': '/docs/project/create/todos/[todo_id].md'
+    }
+)
+
+
+@dataclass(frozen=True)
+class TemplateMetadataRegistry:
+    """静态模板注册表：按名称、类型和层级索引模板（不可变，所有 TemplateService 共享）"""
+    names: Tuple[str, ...]
+    contents: Mapping[str, str]
+    metadata: Mapping[str, Mapping[str, Any]]
+    compiled: Mapping[str, CompiledTemplate]
+    by_type: Mapping[str, Tuple[str, ...]]
+    by_layer: Mapping[str, Tuple[str, ...]]
+
+    @classmethod
+    def build(cls) -> "TemplateMetadataRegistry":
+        compiled = {name: compile_template(content) for name, content in TEMPLATE_CONTENTS.items()}
+        metadata = {}
+        by_type: Dict[str, List[str]] = {}
+        by_layer: Dict[str, List[str]] = {}
+        for definition in TEMPLATE_DEFINITIONS:
+            name = definition['name']
+            info = dict(definition, variables=compiled[name].variables)
+            metadata[name] = MappingProxyType(info)
+            by_type.setdefault(info['type'], []).append(name)
+            by_layer.setdefault(info.get('layer', 'unknown'), []).append(name)
+
+        return cls(
+            names=tuple(metadata),
+            contents=MappingProxyType(dict(TEMPLATE_CONTENTS)),
+            metadata=MappingProxyType(metadata),
+            compiled=MappingProxyType(compiled),
+            by_type=MappingProxyType({key: tuple(names) for key, names in by_type.items()}),
+            by_layer=MappingProxyType({key: tuple(names) for key, names in by_layer.items()})
+        )
+
+    def metadata_copy(self, name: str) -> Dict[str, Any]:
+        """模板元数据的可修改副本（variables 为列表），模板不存在时为空字典"""
+        info = self.metadata.get(name)
+        if info is None:
+            return {}
+        copied = dict(info)
+        copied['variables'] = list(copied['variables'])
+        return copied
+
+
+_template_metadata_registry: Optional[TemplateMetadataRegistry] = None
+_template_metadata_registry_lock = threading.Lock()
+
+
+def get_template_metadata_registry() -> TemplateMetadataRegistry:
+    """获取静态模板注册表（首次调用时构建）"""
+    global _template_metadata_registry
+    registry = _template_metadata_registry
+    if registry is None:
+        with _template_metadata_registry_lock:
+            if _template_metadata_registry is None:
+                _template_metadata_registry = TemplateMetadataRegistry.build()
+            registry = _template_metadata_registry
+    return registry
+
+
 class TemplateService:
     """精简模板服务类 - 为Claude Code提供10个核心文档模板"""
     
@@ -41,216 +223,41 @@ class TemplateService:
         self.file_templates = FileTemplates()
         self.project_templates = ProjectTemplates()
         
-        # 模板注册表 - 12个模板（增加创造模式3个模板）
-        self.template_registry = {
-            # 架构层模板 (6个)
-            'architecture': self.arch_templates.OVERVIEW_TEMPLATE,
-            'tech_stack': self.arch_templates.TECH_STACK_TEMPLATE,
-            'data_flow': self.arch_templates.DATA_FLOW_TEMPLATE,
-            'system_architecture': self.arch_templates.SYSTEM_ARCH_TEMPLATE,
-            'component_diagram': self.arch_templates.COMPONENT_DIAGRAM_TEMPLATE,
-            'deployment_diagram': self.arch_templates.DEPLOYMENT_DIAGRAM_TEMPLATE,
-            
-            # 文件层模板 (1个)
-            'file_summary': self.file_templates.SUMMARY_TEMPLATE,
-            
-            # 项目层模板 (5个)
-            'project_readme': self.project_templates.README_TEMPLATE,
-            'changelog': self.project_templates.CHANGELOG_TEMPLATE,
-            
-            # 创造模式模板 (3个)
-            'create_requirement': self.project_templates.REQUIREMENT_TEMPLATE,
-            'create_analysis': self.project_templates.ANALYSIS_TEMPLATE,
-            'create_todo': self.project_templates.TODO_TEMPLATE
-        }
+        # 模板注册表（静态、不可变，所有实例共享）
+        self.registry = get_template_metadata_registry()
+        self.template_registry = self.registry.contents
         
         # 初始化日志器
         self.logger = get_logger(component="TemplateService", operation="init")
         self.logger.info("TemplateService 初始化完成", {
             "template_count": len(self.template_registry),
-            "architecture_templates": 6,
-            "file_templates": 1,
-            "project_templates": 5,
-            "create_mode_templates": 3
+            "layer_stats": self.get_layer_stats()
         })
 
     def get_template_list(self) -> List[Dict[str, Any]]:
-        """获取模板列表 - 12个核心模板（包含3个创造模式模板）"""
-        return [
-            # ============== 架构层模板 (6个) ==============
-            {
-                'name': 'architecture',
-                'description': '架构概述模板 - 系统整体架构设计',
-                'type': 'architecture_level',
-                'layer': 'architecture',
-                'file_path': '/docs/architecture/overview.md',
-                'variables': ['project_name', 'project_overview', 'tech_stack', 'architecture_pattern',
-                              'services_layer', 'mcp_interface_layer', 'collaboration_layer',
-                              'core_components', 'data_flow', 'system_boundaries', 'deployment_architecture']
-            },
-            {
-                'name': 'tech_stack',
-                'description': '技术栈模板 - 详细技术选型和架构原则',
-                'type': 'architecture_level',
-                'layer': 'architecture',
-                'file_path': '/docs/architecture/tech-stack.md',
-                'variables': ['project_name', 'programming_languages', 'architecture_patterns',
-                              'data_formats', 'filesystem_operations', 'dependency_strategy',
-                              'performance_optimization', 'reliability_guarantee', 'observability',
-                              'configuration_management', 'version_compatibility', 'deployment_architecture']
-            },
-            {
-                'name': 'data_flow',
-                'description': '数据流模板 - 系统数据流转设计',
-                'type': 'architecture_level',
-                'layer': 'architecture',
-                'file_path': '/docs/architecture/data-flow.md',
-                'variables': ['project_name', 'flow_1_name', 'flow_1_diagram', 'flow_2_name', 'flow_2_diagram',
-                              'flow_3_name', 'flow_3_diagram', 'flow_4_name', 'flow_4_diagram',
-                              'detailed_flows', 'data_formats', 'performance_considerations']
-            },
-            {
-                'name': 'system_architecture',
-                'description': '系统架构图模板 - 可视化架构图表',
-                'type': 'architecture_level',
-                'layer': 'architecture',
-                'file_path': '/docs/architecture/diagrams/system-architecture.md',
-                'variables': ['project_name', 'overall_architecture_diagram', 'layer_1_name', 'layer_1_diagram',
-                              'layer_2_name', 'layer_2_diagram', 'layer_3_name', 'layer_3_diagram',
-                              'tech_stack_diagram', 'additional_diagrams']
-            },
-            {
-                'name': 'component_diagram',
-                'description': '组件图模板 - 组件关系和依赖',
-                'type': 'architecture_level',
-                'layer': 'architecture',
-                'file_path': '/docs/architecture/diagrams/component-diagram.md',
-                'variables': ['project_name', 'component_hierarchy', 'component_1_name', 'component_1_desc',
-                              'component_1_details', 'component_2_name', 'component_2_desc', 'component_2_details',
-                              'component_3_name', 'component_3_desc', 'component_3_details',
-                              'component_4_name', 'component_4_desc', 'component_4_details',
-                              'dependency_diagram', 'dependency_details', 'data_flow_components']
-            },
-            {
-                'name': 'deployment_diagram',
-                'description': '部署图模板 - 部署架构和环境配置',
-                'type': 'architecture_level',
-                'layer': 'architecture',
-                'file_path': '/docs/architecture/diagrams/deployment-diagram.md',
-                'variables': ['project_name', 'deployment_overview', 'env_1_name', 'env_1_diagram',
-                              'env_2_name', 'env_2_diagram', 'env_3_name', 'env_3_diagram',
-                              'configuration_management', 'monitoring_logging', 'scalability_design']
-            },
-
-            # ============== 文件层模板 (1个) ==============
-            {
-                'name': 'file_summary',
-                'description': '详细文件分析模板 - 包含流程图、变量作用域、函数依赖的完整文件分析',
-                'type': 'file_level',
-                'layer': 'file',
-                'file_path': '/docs/files/summaries/[file].md',
-                'variables': ['filename', 'function_overview', 'imports', 'global_variables', 'constants',
-                              'function_summary_table', 'detailed_function_analysis', 'class_summary_table',
-                              'detailed_class_analysis', 'function_call_flowchart', 'variable_scope_analysis',
-                              'function_dependencies', 'data_flow_analysis', 'error_handling', 'performance_analysis',
-                              'algorithm_complexity', 'extensibility_assessment', 'code_quality_assessment',
-                              'documentation_completeness', 'notes']
-            },
-
-            
-            # ============== 项目层模板 (3个) ==============
-            {
-                'name': 'project_readme',
-                'description': '项目README模板 - 项目主文档',
-                'type': 'project_level',
-                'layer': 'project',
-                'file_path': '/docs/project/README.md',
-                'variables': ['project_name', 'project_subtitle', 'project_overview', 'core_features',
-                              'environment_requirements', 'step_2_name', 'step_2_content', 'step_3_name',
-                              'step_3_content', 'current_version', 'project_status', 'tech_architecture',
-                              'usage_examples', 'roadmap', 'contribution_guide', 'license']
-            },
-            {
-                'name': 'changelog',
-                'description': '变更日志模板 - 变更记录',
-                'type': 'project_level',
-                'layer': 'project',
-                'file_path': '/docs/project/CHANGELOG.md',
-                'variables': ['project_name', 'version_entries']
-            },
-
-            # ============== 创造模式模板 (3个) ==============
-            {
-                'name': 'create_requirement',
-                'description': '功能需求确认模板 - 创造模式第一阶段：确认功能需求和验收标准',
-                'type': 'create_mode_level',
-                'layer': 'create',
-                'file_path': '/docs/project/create/requirements/[requirement_id].md',
-                'variables': ['feature_name', 'requirement_id', 'created_time', 'creator', 'project_name',
-                              'feature_overview', 'business_background', 'user_scenarios', 'core_requirements',
-                              'feature_boundaries', 'performance_requirements', 'compatibility_requirements',
-                              'acceptance_criteria', 'testing_requirements', 'quality_standards',
-                              'technical_constraints', 'dependencies', 'risk_assessment', 'priority_level',
-                              'urgency_level', 'estimated_effort', 'notes']
-            },
-            {
-                'name': 'create_analysis',
-                'description': '功能实现分析模板 - 创造模式第二阶段：分析实现方案和影响',
-                'type': 'create_mode_level',
-                'layer': 'create',
-                'file_path': '/docs/project/create/analysis/[analysis_id].md',
-                'variables': ['feature_name', 'requirement_id', 'analysis_id', 'analysis_time', 'analyzer',
-                              'architecture_impact', 'existing_components', 'new_components', 'main_files_to_modify',
-                              'core_functions_classes', 'data_structure_changes', 'directly_affected_files',
-                              'indirectly_affected_files', 'dependency_changes', 'interface_impact',
-                              'technology_choices', 'implementation_steps', 'key_technical_points', 'potential_risks',
-                              'unit_test_strategy', 'integration_test_strategy', 'regression_test_strategy',
-                              'performance_impact', 'optimization_suggestions', 'backward_compatibility',
-                              'api_compatibility', 'deployment_impact', 'configuration_changes', 'data_migration',
-                              'implementation_recommendations', 'risk_mitigation', 'next_actions', 'pending_confirmations']
-            },
-            {
-                'name': 'create_todo',
-                'description': '功能实现计划模板 - 创造模式第三阶段：生成详细实现计划',
-                'type': 'create_mode_level',
-                'layer': 'create',
-                'file_path': '/docs/project/create/todos/[todo_id].md',
-                'variables': ['feature_name', 'requirement_id', 'analysis_id', 'todo_id', 'plan_time', 'planner',
-                              'overall_strategy', 'implementation_phases', 'estimated_time', 'phase_1_preparation',
-                              'phase_2_core_implementation', 'phase_3_integration_testing', 'phase_4_documentation',
-                              'new_files', 'modified_files', 'deleted_files', 'new_functions_classes',
-                              'modified_functions_classes', 'deleted_functions_classes', 'unit_test_tasks',
-                              'integration_test_tasks', 'manual_test_tasks', 'function_verification',
-                              'performance_verification', 'compatibility_verification', 'critical_risks',
-                              'risk_responses', 'rollback_plan', 'external_dependencies', 'internal_dependencies',
-                              'resource_requirements', 'completion_criteria', 'quality_gates', 'deliverables',
-                              'milestone_schedule', 'key_milestones', 'delivery_timeline', 'implementation_notes']
-            },
-
-        ]
+        """获取模板列表 - 12个核心模板（包含3个创造模式模板）
+
+        variables 由模板内容解析得到，与模板文本始终一致。
+        """
+        registry = self.registry
+        return [registry.metadata_copy(name) for name in registry.names]
+
+    def get_compiled_template(self, template_name: str) -> Optional[CompiledTemplate]:
+        """获取模板的编译结果，模板不存在时返回 None"""
+        return self.registry.compiled.get(template_name)
     
     def get_templates_by_layer(self, layer: str) -> List[Dict[str, Any]]:
         """根据文档层级获取模板列表"""
-        return [
-            template for template in self.get_template_list()
-            if template.get('layer') == layer
-        ]
+        registry = self.registry
+        return [registry.metadata_copy(name) for name in registry.by_layer.get(layer, ())]
     
     def get_layer_stats(self) -> Dict[str, int]:
         """获取各层级模板统计"""
-        templates = self.get_template_list()
-        stats = {}
-        for template in templates:
-            layer = template.get('layer', 'unknown')
-            stats[layer] = stats.get(layer, 0) + 1
-        return stats
+        return {layer: len(names) for layer, names in self.registry.by_layer.items()}
 
     def get_template_content(self, template_name: str) -> Dict[str, Any]:
         """获取指定模板的内容和元数据"""
-        self.logger.debug("获取模板内容", {
-            "template_name": template_name,
-            "available_templates": list(self.template_registry.keys())
-        })
+        self.logger.debug("获取模板内容", {"template_name": template_name})
 
         if template_name not in self.template_registry:
             self.logger.warning("模板不存在", {
@@ -262,10 +269,7 @@ class TemplateService:
                 'error': f'Template "{template_name}" not found'
             }
 
-        template_info = next(
-            (t for t in self.get_template_list() if t['name'] == template_name),
-            {}
-        )
+        template_info = self.registry.metadata_copy(template_name)
 
         self.logger.info("模板获取成功", {
             "template_name": template_name,
@@ -283,18 +287,19 @@ class TemplateService:
 
     def get_template_by_type(self, template_type: str) -> List[Dict[str, Any]]:
         """根据类型获取模板列表"""
-        return [
-            template for template in self.get_template_list()
-            if template['type'] == template_type
-        ]
+        registry = self.registry
+        return [registry.metadata_copy(name) for name in registry.by_type.get(template_type, ())]
 
     def validate_template_variables(self, template_name: str, variables: Dict[str, str]) -> Dict[str, Any]:
-        """验证模板变量是否完整"""
-        template_info = self.get_template_content(template_name)
-        if not template_info['success']:
-            return template_info
+        """验证模板变量是否完整（所需变量由模板内容解析得到）"""
+        compiled = self.get_compiled_template(template_name)
+        if compiled is None:
+            return {
+                'success': False,
+                'error': f'Template "{template_name}" not found'
+            }
 
-        required_vars = template_info['metadata'].get('variables', [])
+        required_vars = list(compiled.variables)
         provided_vars = set(variables.keys())
         required_vars_set = set(required_vars)
 
@@ -314,12 +319,14 @@ class TemplateService:
 
     def format_template(self, template_name: str, **kwargs) -> Dict[str, Any]:
         """格式化模板内容"""
-        template_info = self.get_template_content(template_name)
-        if not template_info['success']:
-            return template_info
-
         try:
-            formatted_content = template_info['content'].format(**kwargs)
+            compiled = self.get_compiled_template(template_name)
+            if compiled is None:
+                return {
+                    'success': False,
+                    'error': f'Template "{template_name}" not found'
+                }
+            formatted_content = compiled.render(kwargs)
             return {
                 'success': True,
                 'template_name': template_name,
@@ -339,6 +346,74 @@ class TemplateService:
                 'template_name': template_name
             }
 
+    def format_template_partial(self, template_name: str, values: Mapping[str, Any]) -> Dict[str, Any]:
+        """部分格式化模板：只填充 values 中已提供的变量，其余占位符保留
+
+        变量通过映射传入，模板变量可以使用任意名称（包括 template_name）。
+        仍有变量未提供时，返回的 formatted_content 是合法模板，可以再用
+        format_template_content 分批填充剩余变量（适用于分段生成的大型文档）；
+        变量齐全时直接返回最终文本。
+        """
+        try:
+            compiled = self.get_compiled_template(template_name)
+            if compiled is None:
+                return {
+                    'success': False,
+                    'error': f'Template "{template_name}" not found'
+                }
+            return self._partial_response(template_name, compiled, values)
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f'Template formatting error: {str(e)}',
+                'template_name': template_name
+            }
+
+    def format_template_content(self, content: str, values: Mapping[str, Any],
+                                partial: bool = False) -> Dict[str, Any]:
+        """格式化任意模板文本（例如部分格式化的结果），编译结果同样按内容摘要缓存
+
+        变量通过 values 映射传入，模板变量可以使用任意名称（包括 content、partial）。
+        """
+        try:
+            compiled = compile_template(content)
+            if partial:
+                return self._partial_response(None, compiled, values)
+            return {
+                'success': True,
+                'formatted_content': compiled.render(values),
+                'variables_used': dict(values)
+            }
+        except KeyError as e:
+            return {
+                'success': False,
+                'error': f'Missing template variable: {str(e)}'
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f'Template formatting error: {str(e)}'
+            }
+
+    @staticmethod
+    def _partial_response(template_name: Optional[str], compiled: CompiledTemplate,
+                          values: Mapping[str, Any]) -> Dict[str, Any]:
+        missing_vars = compiled.missing_variables(values)
+        if missing_vars:
+            formatted_content, missing_vars = compiled.render_partial(values)
+        else:
+            formatted_content = compiled.render(values)
+        result = {
+            'success': True,
+            'formatted_content': formatted_content,
+            'variables_used': dict(values),
+            'missing_variables': missing_vars,
+            'is_complete': not missing_vars
+        }
+        if template_name is not None:
+            result['template_name'] = template_name
+        return result
+
 
 # 兼容性方法，保持向后兼容
 def get_file_summary_template() -> str:
@@ -0,0 +1,171 @@
+"""
+模板编译器：把 str.format 风格的模板预先解析为字面量片段和字段片段
+
+- 使用 string.Formatter().parse 解析一次，字段名即模板所需变量（按首次出现顺序）
+- 编译结果按模板内容摘要缓存，同一模板文本只解析一次
+- 渲染时逐个字段取值，最后一次 join 生成结果
+- 部分渲染：缺少的变量保留原占位符，结果仍是合法模板，可以分多次填充大型文档
+"""
+import hashlib
+import string
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, List, Mapping, Optional, Tuple
+
+_FORMATTER = string.Formatter()
+
+# (字面量前缀, 字段表达式, 顶层变量名, 转换符, 格式说明, 是否为简单字段, 该字段所需的全部变量)
+Segment = Tuple[str, str, str, Optional[str], str, bool, Tuple[str, ...]]
+
+
+def _escape(text: str) -> str:
+    """把文本转义为模板字面量"""
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """编译后的模板（不可变，可在线程间共享）"""
+    source_hash: str
+    segments: Tuple[Segment, ...]
+    tail: str
+    variables: Tuple[str, ...]
+    literals: Tuple[str, ...]  # 全部为简单字段时：字面量与字段空位交替的渲染骨架，否则为空
+    fields: Tuple[str, ...]
+
+    def render(self, values: Mapping[str, Any]) -> str:
+        """渲染完整模板，缺少变量时抛出 KeyError（与 str.format 一致）"""
+        if self.literals:
+            parts = list(self.literals)
+            parts[1::2] = [value if type(value) is str else format(value)
+                           for value in map(values.__getitem__, self.fields)]
+            return "".join(parts)
+
+        parts = []
+        for literal, field, name, conversion, format_spec, simple, _ in self.segments:
+            parts.append(literal)
+            parts.append(self._format_field(values, field, name, conversion, format_spec, simple))
+        parts.append(self.tail)
+        return "".join(parts)
+
+    def render_partial(self, values: Mapping[str, Any]) -> Tuple[str, List[str]]:
+        """部分渲染：返回 (仍为模板格式的结果, 结果模板仍需要的变量)
+
+        字段所需的变量（包括格式说明中引用的变量）全部提供时替换为转义后的值，
+        否则保留原占位符；保留的占位符所引用的变量在下一次填充时都需要再次提供。
+        """
+        parts = []
+        missing = []
+        for literal, field, name, conversion, format_spec, simple, required in self.segments:
+            parts.append(_escape(literal))
+            if all(var in values for var in required):
+                parts.append(_escape(self._format_field(values, field, name, conversion, format_spec, simple)))
+                continue
+            missing.extend(var for var in required if var not in missing)
+            parts.append(self._placeholder(field, conversion, format_spec))
+        parts.append(_escape(self.tail))
+        return "".join(parts), missing
+
+    def missing_variables(self, values: Mapping[str, Any]) -> List[str]:
+        """values 中缺少的变量"""
+        return [name for name in self.variables if name not in values]
+
+    @staticmethod
+    def _format_field(values: Mapping[str, Any], field: str, name: str,
+                      conversion: Optional[str], format_spec: str, simple: bool) -> str:
+        if simple:
+            value = values[name]
+            if type(value) is str:
+                return value
+        else:
+            value, _ = _FORMATTER.get_field(field, (), values)
+            value = _FORMATTER.convert_field(value, conversion)
+            if "{" in format_spec:
+                format_spec = _FORMATTER.vformat(format_spec, (), values)
+        return format(value, format_spec)
+
+    @staticmethod
+    def _placeholder(field: str, conversion: Optional[str], format_spec: str) -> str:
+        placeholder = "{" + field
+        if conversion:
+            placeholder += "!" + conversion
+        if format_spec:
+            placeholder += ":" + format_spec
+        return placeholder + "}"
+
+
+def compile_source(source: str, source_hash: Optional[str] = None) -> CompiledTemplate:
+    """解析模板文本（不使用缓存）
+
+    Raises:
+        ValueError: 模板语法错误，或使用了位置参数字段（模板只支持按名称传参）
+    """
+    segments = []
+    variables = {}
+    pending = []  # 转义的花括号会把字面量拆成多段，合并到下一个字段之前
+    for literal, field, format_spec, conversion in _FORMATTER.parse(source):
+        pending.append(literal)
+        if field is None:
+            continue
+        literal = "".join(pending)
+        pending = []
+        name = field.partition(".")[0].partition("[")[0]
+        if not name or name.isdigit():
+            raise ValueError(f"Positional template field is not supported: {{{field}}}")
+        format_spec = format_spec or ""
+        required = {name: None}
+        nested = "{" in format_spec
+        if nested:
+            for _, spec_field, _, _ in _FORMATTER.parse(format_spec):
+                if spec_field:
+                    required.setdefault(spec_field.partition(".")[0].partition("[")[0], None)
+        simple = field == name and not conversion and not nested
+        for var in required:
+            variables.setdefault(var, None)
+        segments.append((literal, field, name, conversion, format_spec, simple, tuple(required)))
+
+    tail = "".join(pending)
+    literals, fields = (), ()
+    if all(segment[5] for segment in segments):
+        # 快速路径：字面量与字段值交替排列，渲染时一次 join
+        literals = []
+        for segment in segments:
+            literals += [segment[0], ""]
+        literals = tuple(literals + [tail])
+        fields = tuple(segment[2] for segment in segments)
+
+    return CompiledTemplate(
+        source_hash=source_hash or template_hash(source),
+        segments=tuple(segments),
+        tail=tail,
+        variables=tuple(variables),
+        literals=literals,
+        fields=fields
+    )
+
+
+def template_hash(source: str) -> str:
+    """模板内容摘要"""
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+
+MAX_COMPILED_TEMPLATES = 256
+
+_compiled_cache: "OrderedDict[str, CompiledTemplate]" = OrderedDict()
+_compiled_cache_lock = threading.Lock()
+
+
+def compile_template(source: str) -> CompiledTemplate:
+    """获取模板的编译结果（按内容摘要缓存，最多保留 MAX_COMPILED_TEMPLATES 个）"""
+    source_hash = template_hash(source)
+    compiled = _compiled_cache.get(source_hash)
+    if compiled is not None:
+        return compiled
+
+    compiled = compile_source(source, source_hash)
+    with _compiled_cache_lock:
+        _compiled_cache[source_hash] = compiled
+        while len(_compiled_cache) > MAX_COMPILED_TEMPLATES:
+            _compiled_cache.popitem(last=False)
+    return compiled